@@ -1,28 +1,92 @@
 """
 FastAPI backend aplikacija za kreditni kalkulator
 """
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional
+import hmac
+import multiprocessing
+import os
+import tempfile
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import orjson
 
 from app.models.credit import (
-    CreditInput, CreditCalculationResult, CreditSummary,
+    CreditInput, CreditCalculationResult, CreditSummary, ScheduleWindowResult,
     PrepaymentInput, InterestRateChangeInput, ComparisonInput,
-    PaymentScheduleItem
+    PaymentScheduleItem, BatchCreditInput, RateSensitivityInput, BulkExportInput,
+    SolveAmountInput, SolveTermInput, SolveRateInput, ProfilingInput, TracemallocInput,
+    VariableRateInput, VariableRateResult, RateStressInput, PortfolioInput
 )
+from app.services.bulk_export import report_entry, stream_zip
 from app.services.credit_calculator import CreditCalculator
-from app.services.pdf_generator import PDFGenerator
+from app.services.metrics import MetricsMiddleware, metrics
+from app.services.payment_dates import DateRule
+from app.services.pdf_cache import PDFCache
+from app.services.pdf_generator import TEMPLATE_VERSION
+from app.services.pdf_pool import PDFRenderPool, PoolSaturatedError, PoolUnavailableError
+from app.services.profiling import ProfiledRoute, ProfilingMiddleware, profiler
+from app.services.result_cache import ResultCache, make_key
+from app.services.schedule import Schedule
+from app.services.simulation import RateModel
+
+
+# Pool procesa za PDF izvještaje (ReportLab ne blokira event loop)
+pdf_pool = PDFRenderPool(
+    max_workers=int(os.getenv("PDF_POOL_WORKERS", str(os.cpu_count() or 1))),
+    max_pending=int(os.getenv("PDF_POOL_MAX_PENDING", str(4 * (os.cpu_count() or 1))))
+)
+
+
+# Pool procesa za Monte Carlo simulacije (kreira se pri prvom zahtjevu;
+# sa jednim workerom simulacija radi u procesu servera)
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", str(os.cpu_count() or 1)))
+simulation_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_simulation_executor() -> Optional[ProcessPoolExecutor]:
+    global simulation_executor
+    if SIMULATION_WORKERS > 1 and simulation_executor is None:
+        simulation_executor = ProcessPoolExecutor(
+            max_workers=SIMULATION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return simulation_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    pdf_pool.shutdown()
+    if simulation_executor is not None:
+        simulation_executor.shutdown(wait=False, cancel_futures=True)
 
 
 # Inicijalizacija FastAPI aplikacije
 app = FastAPI(
     title="Kreditni Kalkulator API",
     description="REST API za izračun i analizu kredita",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Sinhroni endpointi (threadpool) su vidljivi profileru uzorkovanjem
+app.router.route_class = ProfiledRoute
+
+# Metrike latencije (Prometheus /metrics); isključene ako METRICS_ENABLED nije 1
+metrics.enable(os.getenv("METRICS_ENABLED", "0") == "1")
+app.add_middleware(MetricsMiddleware)
+
+# Profilisanje na zahtjev (/admin/profiling); bez ADMIN_TOKEN je isključeno
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+app.add_middleware(ProfilingMiddleware)
+
 # CORS konfiguracija za React frontend
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +96,185 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keš rezultata za ponovljene identične izračune (standardne ponude)
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+)
+
+
+# Keš PDF izvještaja na disku
+pdf_cache = PDFCache(
+    os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kreditni_kalkulator_pdf")),
+    TEMPLATE_VERSION,
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+)
+
+
+def resolve_start_date(credit: CreditInput) -> datetime:
+    """
+    Datum početka otplate; bez start_date kalkulator koristi datetime.now(),
+    pa se datum razrješava unaprijed da bi ključevi keša i izračun koristili isti dan
+    """
+    if credit.start_date:
+        return datetime.strptime(credit.start_date, "%Y-%m-%d")
+    return datetime.now()
+
+
+def date_rule(credit: CreditInput) -> DateRule:
+    """Pravilo za datume plaćanja iz unosa"""
+    return DateRule(credit.date_rule, credit.business_day)
+
+
+def credit_key(credit: CreditInput, start_date: datetime):
+    """Normalizovan ključ keša za kredit"""
+    return make_key(
+        credit.amount,
+        credit.annual_interest_rate,
+        credit.term_months,
+        credit.payment_type,
+        start_date,
+        credit.rounding,
+        date_rule(credit)
+    )
+
+
+def calculate_cached(credit: CreditInput):
+    """
+    Izračun plana (Schedule) i sažetka kroz keš rezultata
+    """
+    start_date = resolve_start_date(credit)
+    key = credit_key(credit, start_date)
+    
+    return result_cache.get_or_compute(
+        key,
+        lambda: CreditCalculator.calculate_schedule(
+            credit.amount,
+            credit.annual_interest_rate,
+            credit.term_months,
+            credit.payment_type,
+            start_date,
+            credit.rounding,
+            date_rule(credit)
+        )
+    )
+
+
+def with_effective_rate(summary: dict, credit: CreditInput) -> dict:
+    """
+    Sažetak dopunjen efektivnom kamatnom stopom (EKS) uz naknade iz unosa
+    
+    Vraća se kopija, pa sažetak u kešu rezultata ostaje nepromijenjen.
+    """
+    return dict(summary, effective_annual_rate=CreditCalculator.effective_annual_rate(
+        credit.amount,
+        credit.annual_interest_rate,
+        credit.term_months,
+        credit.payment_type,
+        credit.upfront_fee,
+        credit.monthly_fee
+    ))
+
+
+def effective_rates(credits: List[CreditInput]) -> List[float]:
+    """EKS za više kredita u jednom vektorizovanom prolazu"""
+    return CreditCalculator.effective_annual_rates(
+        [credit.amount for credit in credits],
+        [credit.annual_interest_rate for credit in credits],
+        [credit.term_months for credit in credits],
+        [credit.payment_type for credit in credits],
+        [credit.upfront_fee for credit in credits],
+        [credit.monthly_fee for credit in credits]
+    )
+
+
+def require_float_engine(credits: List[CreditInput], operation: str) -> None:
+    """Grupni i prijevremeni obračun rade samo u realnim brojevima"""
+    if any(credit.rounding for credit in credits):
+        raise ValueError(f"Obračun u centima (rounding) nije podržan za {operation}")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Pristup administratorskim endpointima samo uz ispravan X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Administratorski endpointi nisu uključeni (ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Neispravan administratorski token")
+
+
+# Polja u odgovoru (kao u modelima; dodatna polja se ne šalju)
+SUMMARY_FIELDS = tuple(CreditSummary.model_fields)
+SCHEDULE_FIELDS = tuple(PaymentScheduleItem.model_fields)
+
+
+def result_response(schedule, summary: dict) -> ORJSONResponse:
+    """
+    Odgovor u obliku CreditCalculationResult, serijalizovan direktno (orjson)
+    
+    Ulaz je validiran, a redovi plana dolaze iz kalkulatora sa tipovima iz
+    PaymentScheduleItem, pa se ne prave Pydantic modeli po redu. Endpointi
+    zadržavaju response_model zbog OpenAPI šeme.
+    """
+    if isinstance(schedule, Schedule):
+        schedule = schedule.to_rows()
+    else:
+        schedule = [{field: row[field] for field in SCHEDULE_FIELDS} for row in schedule]
+    
+    return ORJSONResponse({
+        "summary": {field: summary[field] for field in SUMMARY_FIELDS},
+        "schedule": schedule
+    })
+
+
+# Kolone otplatnog plana u redoslijedu za CSV izvoz
+SCHEDULE_COLUMNS = ["month", "payment_date", "monthly_payment", "principal", "interest", "remaining_balance"]
+
+
+def stream_schedule(credit: CreditInput, output_format: str) -> StreamingResponse:
+    """
+    Otplatni plan kao NDJSON ili CSV stream
+    
+    Redovi dolaze iz generatora CreditCalculator.iter_schedule, pa memorija
+    po zahtjevu ne zavisi od roka otplate. NDJSON počinje linijom sa
+    sažetkom (CreditCalculator.schedule_summary - isti zbirovi kao u JSON
+    odgovoru), a zatim slijedi po jedan red plana u liniji.
+    """
+    start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
+    
+    rows = CreditCalculator.iter_schedule(
+        credit.amount,
+        credit.annual_interest_rate,
+        credit.term_months,
+        credit.payment_type,
+        start_date,
+        credit.rounding,
+        date_rule(credit)
+    )
+    
+    if output_format == "csv":
+        def generate():
+            yield ",".join(SCHEDULE_COLUMNS) + "\n"
+            for row in rows:
+                yield ",".join(str(row[column]) for column in SCHEDULE_COLUMNS) + "\n"
+        
+        return StreamingResponse(generate(), media_type="text/csv")
+    
+    summary = with_effective_rate(CreditCalculator.schedule_summary(
+        credit.amount,
+        credit.annual_interest_rate,
+        credit.term_months,
+        credit.payment_type,
+        credit.rounding
+    ), credit)
+    
+    def generate():
+        yield orjson.dumps({"summary": summary}) + b"\n"
+        for row in rows:
+            yield orjson.dumps(row) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 
 @app.get("/")
 async def root():
@@ -41,84 +284,274 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/calculate",
+            "/calculate/window",
+            "/calculate/batch",
             "/calculate/prepayment",
             "/calculate/rate-change",
+            "/calculate/rate-sensitivity",
+            "/calculate/variable-rate",
+            "/simulate/rate-stress",
+            "/portfolio/cash-flows",
             "/compare",
-            "/export/pdf"
+            "/solve/amount",
+            "/solve/term",
+            "/solve/rate",
+            "/export/pdf",
+            "/export/pdf/bulk",
+            "/cache/stats",
+            "/cache/pdf",
+            "/export/stats",
+            "/metrics",
+            "/admin/profiling"
         ]
     }
 
 
 @app.post("/calculate", response_model=CreditCalculationResult)
-async def calculate_credit(credit: CreditInput):
+async def calculate_credit(
+    credit: CreditInput,
+    summary_only: bool = False,
+    output_format: Literal["json", "ndjson", "csv"] = Query("json", alias="format")
+):
     """
     Izračunaj kredit (anuitetni ili linearni model)
+    
+    Uz summary_only=true vraća se samo sažetak (prazan plan), bez generisanja rata.
+    Uz format=ndjson ili format=csv plan se šalje kao stream, red po red
+    (summary_only se tada ne može koristiti).
     """
+    if summary_only and output_format != "json":
+        raise HTTPException(status_code=422, detail="summary_only se ne može kombinovati sa format=ndjson ili format=csv")
+    
     try:
-        start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
+        if output_format != "json":
+            return stream_schedule(credit, output_format)
         
-        if credit.payment_type == "annuity":
-            schedule, summary = CreditCalculator.calculate_annuity(
+        if summary_only:
+            with metrics.stage("/calculate", "calculate"):
+                summary = CreditCalculator.calculate_summary(
+                    credit.amount,
+                    credit.annual_interest_rate,
+                    credit.term_months,
+                    credit.payment_type,
+                    credit.rounding
+                )
+                summary = with_effective_rate(summary, credit)
+            return result_response([], summary)
+        
+        with metrics.stage("/calculate", "calculate"):
+            schedule, summary = calculate_cached(credit)
+            summary = with_effective_rate(summary, credit)
+        
+        with metrics.stage("/calculate", "serialize"):
+            return result_response(schedule, summary)
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/calculate/window", response_model=ScheduleWindowResult)
+async def calculate_schedule_window(
+    credit: CreditInput,
+    start_month: int = Query(1, ge=1),
+    end_month: Optional[int] = Query(None, ge=1)
+):
+    """
+    Dio otplatnog plana - mjeseci start_month..end_month (podrazumijevano 12 mjeseci)
+    
+    Prave se samo traženi redovi (dug prethodnih mjeseci se samo provlači
+    kroz rekurenciju), pa veličina odgovora ne zavisi od ukupnog roka otplate.
+    """
+    try:
+        if end_month is None:
+            end_month = start_month + 11
+        end_month = min(end_month, credit.term_months)
+        
+        with metrics.stage("/calculate/window", "calculate"):
+            schedule = CreditCalculator.calculate_schedule_window(
                 credit.amount,
                 credit.annual_interest_rate,
                 credit.term_months,
-                start_date
+                credit.payment_type,
+                start_month,
+                end_month,
+                resolve_start_date(credit),
+                credit.rounding,
+                date_rule(credit)
             )
-        else:
-            schedule, summary = CreditCalculator.calculate_linear(
+            summary = with_effective_rate(CreditCalculator.calculate_summary(
                 credit.amount,
                 credit.annual_interest_rate,
                 credit.term_months,
-                start_date
-            )
+                credit.payment_type,
+                credit.rounding
+            ), credit)
+        
+        with metrics.stage("/calculate/window", "serialize"):
+            return ORJSONResponse({
+                "summary": {field: summary[field] for field in SUMMARY_FIELDS},
+                "schedule": schedule.to_rows(),
+                "start_month": start_month,
+                "end_month": end_month,
+                "term_months": credit.term_months
+            })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/calculate/batch")
+async def calculate_batch(batch: BatchCreditInput):
+    """
+    Grupni izračun većeg broja kredita
+    
+    Rezultati se šalju kao NDJSON (jedan kredit po liniji) čim budu izračunati.
+    """
+    try:
+        if batch.credits is not None:
+            require_float_engine(batch.credits, "grupni izračun")
+            amounts = [credit.amount for credit in batch.credits]
+            rates = [credit.annual_interest_rate for credit in batch.credits]
+            terms = [credit.term_months for credit in batch.credits]
+            payment_types = [credit.payment_type for credit in batch.credits]
+            raw_dates = [credit.start_date for credit in batch.credits]
+            date_rules = [date_rule(credit) for credit in batch.credits]
+            upfront_fees = [credit.upfront_fee for credit in batch.credits]
+            monthly_fees = [credit.monthly_fee for credit in batch.credits]
+        else:
+            columns = batch.columns
+            amounts = columns.amounts
+            rates = columns.annual_interest_rates
+            terms = columns.term_months
+            payment_types = columns.payment_types
+            raw_dates = columns.start_dates or [None] * len(amounts)
+            date_rules = [DateRule(columns.date_rule, columns.business_day)] * len(amounts)
+            upfront_fees = columns.upfront_fees
+            monthly_fees = columns.monthly_fees
+        
+        start_dates = [datetime.strptime(value, "%Y-%m-%d") if value else None for value in raw_dates]
         
-        return CreditCalculationResult(
-            summary=CreditSummary(**summary),
-            schedule=[PaymentScheduleItem(**item) for item in schedule]
+        results = CreditCalculator.calculate_batch(
+            amounts, rates, terms, payment_types, start_dates,
+            summary_only=batch.summary_only,
+            date_rules=date_rules
+        )
+        effective = CreditCalculator.effective_annual_rates(
+            amounts, rates, terms, payment_types, upfront_fees, monthly_fees
         )
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    
+    def generate_lines():
+        for index, ((schedule, summary), rate) in enumerate(zip(results, effective)):
+            item = {"index": index, "summary": dict(summary, effective_annual_rate=rate)}
+            if schedule is not None:
+                item["schedule"] = schedule.to_rows()
+            yield orjson.dumps(item) + b"\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+
+@app.post("/portfolio/cash-flows")
+async def project_portfolio_cash_flows(data: PortfolioInput):
+    """
+    Projekcija novčanih tokova - glavnica, kamata i preostali dug po mjesecima
+    
+    Zbirovi se računaju direktno u nizove po kalendarskom mjesecu, bez
+    otplatnih planova pojedinih kredita.
+    """
+    try:
+        with metrics.stage("/portfolio/cash-flows", "validate"):
+            if data.credits is not None:
+                require_float_engine(data.credits, "projekciju portfolija")
+                amounts = [credit.amount for credit in data.credits]
+                rates = [credit.annual_interest_rate for credit in data.credits]
+                terms = [credit.term_months for credit in data.credits]
+                payment_types = [credit.payment_type for credit in data.credits]
+                raw_dates = [credit.start_date for credit in data.credits]
+                date_rules = [date_rule(credit) for credit in data.credits]
+            else:
+                columns = data.columns
+                amounts = columns.amounts
+                rates = columns.annual_interest_rates
+                terms = columns.term_months
+                payment_types = columns.payment_types
+                raw_dates = columns.start_dates or [None] * len(amounts)
+                date_rules = [DateRule(columns.date_rule, columns.business_day)] * len(amounts)
+            
+            start_dates = [datetime.strptime(value, "%Y-%m-%d") if value else None for value in raw_dates]
+        
+        with metrics.stage("/portfolio/cash-flows", "calculate"):
+            result = CreditCalculator.project_cash_flows(
+                amounts, rates, terms, payment_types, start_dates, date_rules
+            )
+        
+        with metrics.stage("/portfolio/cash-flows", "serialize"):
+            return ORJSONResponse(result)
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/calculate/prepayment", response_model=CreditCalculationResult)
 async def calculate_with_prepayment(data: dict):
     """
     Izračunaj kredit sa prijevremenom otplatom
+    
+    Prihvata jednu otplatu ("prepayment") ili listu otplata ("prepayments").
     """
     try:
-        credit = CreditInput(**data["credit"])
-        prepayment = PrepaymentInput(**data["prepayment"])
+        with metrics.stage("/calculate/prepayment", "validate"):
+            credit = CreditInput(**data["credit"])
+            if "prepayments" in data:
+                prepayments = [PrepaymentInput(**item) for item in data["prepayments"]]
+            else:
+                prepayments = [PrepaymentInput(**data["prepayment"])]
+            require_float_engine([credit], "prijevremenu otplatu")
         
         start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
         
-        schedule, summary = CreditCalculator.calculate_with_prepayment(
-            credit.amount,
-            credit.annual_interest_rate,
-            credit.term_months,
-            credit.payment_type,
-            prepayment.amount,
-            prepayment.month,
-            start_date
-        )
+        with metrics.stage("/calculate/prepayment", "calculate"):
+            schedule, summary = CreditCalculator.calculate_with_prepayments(
+                credit.amount,
+                credit.annual_interest_rate,
+                credit.term_months,
+                credit.payment_type,
+                [(prepayment.amount, prepayment.month) for prepayment in prepayments],
+                start_date,
+                date_rule(credit)
+            )
+            # EKS iz stvarnih uplata (rata + prijevremena otplata u tom mjesecu)
+            summary["effective_annual_rate"] = CreditCalculator.schedule_effective_rate(
+                credit.amount,
+                credit.annual_interest_rate,
+                [row["monthly_payment"] + row.get("prepayment", 0) for row in schedule],
+                credit.upfront_fee,
+                credit.monthly_fee
+            )
         
-        return CreditCalculationResult(
-            summary=CreditSummary(**summary),
-            schedule=[PaymentScheduleItem(**item) for item in schedule]
-        )
+        with metrics.stage("/calculate/prepayment", "serialize"):
+            return result_response(schedule, summary)
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/calculate/rate-change", response_model=CreditCalculationResult)
-async def calculate_rate_change(data: dict):
+async def calculate_rate_change(
+    data: dict,
+    output_format: Literal["json", "ndjson", "csv"] = Query("json", alias="format")
+):
     """
     Simulacija promjene kamatne stope
+    
+    Uz format=ndjson ili format=csv plan se šalje kao stream, red po red.
     """
     try:
-        credit = CreditInput(**data["credit"])
-        rate_change = InterestRateChangeInput(**data["rate_change"])
+        with metrics.stage("/calculate/rate-change", "validate"):
+            credit = CreditInput(**data["credit"])
+            rate_change = InterestRateChangeInput(**data["rate_change"])
         
         new_rate = credit.annual_interest_rate + rate_change.rate_change
         
@@ -129,108 +562,420 @@ async def calculate_rate_change(data: dict):
         modified_credit = credit.copy()
         modified_credit.annual_interest_rate = new_rate
         
+        if output_format != "json":
+            return stream_schedule(modified_credit, output_format)
+        
         start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
         
-        if credit.payment_type == "annuity":
-            schedule, summary = CreditCalculator.calculate_annuity(
+        with metrics.stage("/calculate/rate-change", "calculate"):
+            schedule, summary = CreditCalculator.calculate_schedule(
                 modified_credit.amount,
                 modified_credit.annual_interest_rate,
                 modified_credit.term_months,
-                start_date
-            )
-        else:
-            schedule, summary = CreditCalculator.calculate_linear(
-                modified_credit.amount,
-                modified_credit.annual_interest_rate,
-                modified_credit.term_months,
-                start_date
+                modified_credit.payment_type,
+                start_date,
+                modified_credit.rounding,
+                date_rule(modified_credit)
             )
+            summary = with_effective_rate(summary, modified_credit)
         
-        return CreditCalculationResult(
-            summary=CreditSummary(**summary),
-            schedule=[PaymentScheduleItem(**item) for item in schedule]
-        )
+        with metrics.stage("/calculate/rate-change", "serialize"):
+            return result_response(schedule, summary)
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/compare")
-async def compare_credits(comparison: ComparisonInput):
+@app.post("/calculate/rate-sensitivity")
+async def calculate_rate_sensitivity(data: RateSensitivityInput):
     """
-    Uporedi više kredita (2-3)
+    Analiza osjetljivosti - sažeci za niz promjena kamatne stope
+    
+    Svi scenariji za sve kredite računaju se u jednom vektorizovanom prolazu.
     """
     try:
-        results = []
+        rate_changes = data.rate_changes if data.rate_changes is not None else data.rate_range.values()
         
-        for credit in comparison.credits:
-            start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
-            
-            if credit.payment_type == "annuity":
-                schedule, summary = CreditCalculator.calculate_annuity(
-                    credit.amount,
-                    credit.annual_interest_rate,
-                    credit.term_months,
-                    start_date
-                )
-            else:
-                schedule, summary = CreditCalculator.calculate_linear(
-                    credit.amount,
-                    credit.annual_interest_rate,
-                    credit.term_months,
-                    start_date
-                )
-            
-            results.append({
-                "input": credit.dict(),
-                "summary": summary,
-                "schedule": schedule
-            })
+        results = CreditCalculator.calculate_rate_sensitivity(
+            [credit.amount for credit in data.credits],
+            [credit.annual_interest_rate for credit in data.credits],
+            [credit.term_months for credit in data.credits],
+            [credit.payment_type for credit in data.credits],
+            rate_changes,
+            data.from_month
+        )
         
-        return {"comparisons": results}
+        return {
+            "from_month": data.from_month,
+            "sensitivity": [
+                {"input": credit.dict(), "scenarios": scenarios}
+                for credit, scenarios in zip(data.credits, results)
+            ]
+        }
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/export/pdf")
-async def export_pdf(credit: CreditInput):
+def variable_rate_path(data: VariableRateInput) -> List[tuple]:
     """
-    Generiši PDF izvještaj
+    Putanja stope (od_mjeseca, stopa) iz unosa
+    
+    Uz rate_path do prve promjene važi stopa iz kredita; uz index_rates
+    stopa je indeks + marža, sa promjenom svakih reset_months mjeseci.
+    """
+    credit = data.credit
+    if data.index_rates is not None:
+        return CreditCalculator.index_rate_path(data.index_rates, data.margin, data.reset_months, credit.term_months)
+    
+    path = [(segment.from_month, segment.annual_interest_rate) for segment in data.rate_path]
+    if path[0][0] > 1:
+        path.insert(0, (1, credit.annual_interest_rate))
+    return path
+
+
+@app.post("/calculate/variable-rate", response_model=VariableRateResult)
+async def calculate_variable_rate(data: VariableRateInput):
+    """
+    Kredit sa promjenljivom kamatnom stopom (zadane promjene ili indeks + marža)
+    
+    Anuitet se na svakoj promjeni stope preračunava za preostali dug i rok.
     """
     try:
+        with metrics.stage("/calculate/variable-rate", "validate"):
+            credit = data.credit
+            require_float_engine([credit], "promjenljivu kamatnu stopu")
+            path = variable_rate_path(data)
+        
         start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
         
-        if credit.payment_type == "annuity":
-            schedule, summary = CreditCalculator.calculate_annuity(
+        with metrics.stage("/calculate/variable-rate", "calculate"):
+            schedule, summary = CreditCalculator.calculate_variable_rate(
                 credit.amount,
-                credit.annual_interest_rate,
                 credit.term_months,
-                start_date
+                credit.payment_type,
+                path,
+                start_date,
+                date_rule(credit)
             )
-        else:
-            schedule, summary = CreditCalculator.calculate_linear(
+            summary["effective_annual_rate"] = CreditCalculator.schedule_effective_rate(
                 credit.amount,
-                credit.annual_interest_rate,
-                credit.term_months,
-                start_date
+                min(rate for _, rate in path),
+                schedule.monthly_payment,
+                credit.upfront_fee,
+                credit.monthly_fee
+            )
+        
+        with metrics.stage("/calculate/variable-rate", "serialize"):
+            return ORJSONResponse({
+                "summary": {field: summary[field] for field in SUMMARY_FIELDS},
+                "schedule": schedule.to_rows(),
+                "rate_path": [
+                    {"from_month": from_month, "annual_interest_rate": rate}
+                    for from_month, rate in path
+                ]
+            })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/simulate/rate-stress")
+def simulate_rate_stress(data: RateStressInput):
+    """
+    Monte Carlo stres test - raspodjela kamate i skoka rate po kreditu i za portfolio
+    
+    Endpoint je sinhron (FastAPI ga izvršava u threadpool-u), pa čekanje na
+    pool procesa ne blokira event loop.
+    """
+    try:
+        require_float_engine(data.credits, "simulaciju kamatne stope")
+        
+        with metrics.stage("/simulate/rate-stress", "calculate"):
+            result = CreditCalculator.simulate_rate_stress(
+                [credit.amount for credit in data.credits],
+                [credit.annual_interest_rate for credit in data.credits],
+                [credit.term_months for credit in data.credits],
+                [credit.payment_type for credit in data.credits],
+                RateModel(**data.model.dict()),
+                data.paths,
+                data.seed,
+                data.reset_months,
+                data.percentiles,
+                get_simulation_executor()
             )
         
+        return ORJSONResponse({
+            "paths": data.paths,
+            "seed": data.seed,
+            "portfolio": result["portfolio"],
+            "loans": [
+                {"input": credit.dict(), **loan}
+                for credit, loan in zip(data.credits, result["loans"])
+            ]
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def rank_comparison(comparison: ComparisonInput) -> dict:
+    """Sažeci, rangiranje i statistika za sve ponude (vidi CreditCalculator.compare_offers)"""
+    credits = comparison.credits
+    return CreditCalculator.compare_offers(
+        [credit.amount for credit in credits],
+        [credit.annual_interest_rate for credit in credits],
+        [credit.term_months for credit in credits],
+        [credit.payment_type for credit in credits],
+        [credit.upfront_fee for credit in credits],
+        [credit.monthly_fee for credit in credits],
+        [credit.rounding for credit in credits],
+        comparison.rank_by,
+        comparison.top
+    )
+
+
+@app.post("/compare")
+async def compare_credits(comparison: ComparisonInput, summary_only: bool = False):
+    """
+    Uporedi proizvoljan broj kredita i rangiraj ih po kriteriju rank_by
+    
+    Sažeci se računaju u jednom prolazu za sve ponude, a rezultat sadrži
+    samo `top` najboljih (bez top - sve), u redoslijedu unosa; "ranking"
+    je lista njihovih indeksa od najbolje. Uz summary_only=true planovi se
+    ne generišu (polje schedule je prazno).
+    """
+    try:
+        with metrics.stage("/compare", "calculate"):
+            ranked = rank_comparison(comparison)
+            
+            results = []
+            ranks = {index: position + 1 for position, index in enumerate(ranked["ranking"])}
+            summaries = dict(zip(ranked["ranking"], ranked["summaries"]))
+            for index in sorted(ranks):
+                credit = comparison.credits[index]
+                schedule = [] if summary_only else calculate_cached(credit)[0].to_rows()
+                results.append({
+                    "index": index,
+                    "rank": ranks[index],
+                    "input": credit.dict(),
+                    "summary": summaries[index],
+                    "schedule": schedule
+                })
+        
+        with metrics.stage("/compare", "serialize"):
+            return ORJSONResponse({
+                "comparisons": results,
+                "ranking": ranked["ranking"],
+                "rank_by": comparison.rank_by,
+                "count": ranked["count"],
+                "statistics": ranked["statistics"]
+            })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/solve/amount")
+async def solve_amount(data: SolveAmountInput):
+    """
+    Najveći iznos kredita uz zadanu mjesečnu ratu, rok i kamatnu stopu
+    
+    Svi upiti se rješavaju obrnutom formulom rate u jednom vektorizovanom prolazu.
+    """
+    try:
+        targets = data.targets
+        with metrics.stage("/solve/amount", "calculate"):
+            results = CreditCalculator.solve_amount(
+                [target.monthly_payment for target in targets],
+                [target.annual_interest_rate for target in targets],
+                [target.term_months for target in targets],
+                [target.payment_type for target in targets]
+            )
+        
+        return ORJSONResponse({
+            "results": [{"input": target.dict(), **result} for target, result in zip(targets, results)]
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/solve/term")
+async def solve_term(data: SolveTermInput):
+    """
+    Najkraći rok otplate uz koji rata ne prelazi zadanu
+    
+    Rok je zaokružen naviše na cijeli mjesec; ako rata ne pokriva kamatu, feasible je false.
+    """
+    try:
+        targets = data.targets
+        with metrics.stage("/solve/term", "calculate"):
+            results = CreditCalculator.solve_term(
+                [target.amount for target in targets],
+                [target.annual_interest_rate for target in targets],
+                [target.monthly_payment for target in targets],
+                [target.payment_type for target in targets]
+            )
+        
+        return ORJSONResponse({
+            "results": [{"input": target.dict(), **result} for target, result in zip(targets, results)]
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/solve/rate")
+async def solve_rate(data: SolveRateInput):
+    """
+    Godišnja kamatna stopa koja uz zadani iznos i rok daje zadanu ratu
+    
+    Ako je rata manja od iznos / rok (negativna stopa) ili bi stopa bila
+    iznad 100% godišnje (granica iz CreditInput), feasible je false.
+    """
+    try:
+        targets = data.targets
+        with metrics.stage("/solve/rate", "calculate"):
+            results = CreditCalculator.solve_rate(
+                [target.amount for target in targets],
+                [target.term_months for target in targets],
+                [target.monthly_payment for target in targets],
+                [target.payment_type for target in targets]
+            )
+        
+        return ORJSONResponse({
+            "results": [{"input": target.dict(), **result} for target, result in zip(targets, results)]
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/export/pdf")
+async def export_pdf(credit: CreditInput, full_schedule: bool = False):
+    """
+    Generiši PDF izvještaj
+    
+    Uz full_schedule=true izvještaj sadrži kompletan otplatni plan.
+    """
+    try:
+        # Izvještaj sadrži datum izrade, pa je dio ključa (verzija šablona je u putanji keša)
+        report_date = datetime.now()
+        key = PDFCache.make_key(
+            credit_key(credit, resolve_start_date(credit)),
+            (credit.upfront_fee, credit.monthly_fee),
+            report_date.date().isoformat(),
+            full_schedule
+        )
+        headers = {
+            "Content-Disposition": f"attachment; filename=kredit_izvjestaj_{report_date.strftime('%Y%m%d')}.pdf"
+        }
+        
+        with metrics.stage("/export/pdf", "pdf_cache"):
+            pdf = await run_in_threadpool(pdf_cache.get, key)
+        if pdf is not None:
+            return Response(pdf, media_type="application/pdf", headers=headers)
+        
+        with metrics.stage("/export/pdf", "calculate"):
+            schedule, summary = calculate_cached(credit)
+            summary = with_effective_rate(summary, credit)
+        
         # Generiši PDF
-        pdf_buffer = PDFGenerator.generate_credit_report(
-            credit.dict(),
-            schedule,
-            summary
+        with metrics.stage("/export/pdf", "render"):
+            pdf = await pdf_pool.render_credit_report(
+                credit.dict(),
+                schedule,
+                summary,
+                full_schedule
+            )
+        with metrics.stage("/export/pdf", "pdf_cache"):
+            await run_in_threadpool(pdf_cache.put, key, pdf)
+        
+        return Response(pdf, media_type="application/pdf", headers=headers)
+    
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/export/pdf/bulk")
+async def export_pdf_bulk(export: BulkExportInput):
+    """
+    Grupni izvoz PDF izvještaja za više kredita
+    
+    output=zip: ZIP sa jednim PDF-om po kreditu; izvještaji se generišu u
+    poolu procesa i arhiva se šalje dok nastaje. Izvještaj koji se ne
+    može generisati zamjenjuje se fajlom kredit_NNNNN_greska.txt.
+    output=pdf: jedan spojeni PDF, generisan u fajl i poslan sa diska.
+    """
+    try:
+        pdf_pool.check_capacity()
+        
+        credits = export.credits
+        require_float_engine(credits, "grupni izvoz")
+        results = CreditCalculator.calculate_batch(
+            [credit.amount for credit in credits],
+            [credit.annual_interest_rate for credit in credits],
+            [credit.term_months for credit in credits],
+            [credit.payment_type for credit in credits],
+            [datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None for credit in credits],
+            date_rules=[date_rule(credit) for credit in credits]
         )
+        reports = (
+            (credit.dict(), schedule, dict(summary, effective_annual_rate=rate))
+            for credit, rate, (schedule, summary) in zip(credits, effective_rates(credits), results)
+        )
+        date_suffix = datetime.now().strftime('%Y%m%d')
+        
+        if export.output == "pdf":
+            fd, path = tempfile.mkstemp(suffix=".pdf")
+            os.close(fd)
+            try:
+                await pdf_pool.render_merged_report(list(reports), path, export.full_schedule)
+            except Exception:
+                os.remove(path)
+                raise
+            
+            return FileResponse(
+                path,
+                media_type="application/pdf",
+                filename=f"krediti_izvjestaj_{date_suffix}.pdf",
+                background=BackgroundTask(os.remove, path)
+            )
+        
+        # Prvi izvještaj se generiše prije slanja odgovora, pa greška (npr.
+        # pool nedostupan) dobija odgovarajući status umjesto 200; kasnije
+        # greške postaju fajlovi sa opisom greške u arhivi (report_entry)
+        jobs = (("credit", report + (export.full_schedule,)) for report in reports)
+        results = pdf_pool.render_many(jobs, return_exceptions=True)
+        first = await results.__anext__()
+        if isinstance(first, Exception):
+            await results.aclose()
+            raise first
+        
+        async def named_pdfs():
+            yield report_entry(1, first)
+            index = 1
+            async for result in results:
+                index += 1
+                yield report_entry(index, result)
         
         return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
+            stream_zip(named_pdfs()),
+            media_type="application/zip",
             headers={
-                "Content-Disposition": f"attachment; filename=kredit_izvjestaj_{datetime.now().strftime('%Y%m%d')}.pdf"
+                "Content-Disposition": f"attachment; filename=krediti_izvjestaji_{date_suffix}.zip"
             }
         )
     
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -238,49 +983,162 @@ async def export_pdf(credit: CreditInput):
 @app.post("/export/comparison-pdf")
 async def export_comparison_pdf(comparison: ComparisonInput):
     """
-    Generiši uporedni PDF izvještaj
+    Generiši uporedni PDF izvještaj za `top` najboljih ponuda (bez top - sve)
     """
     try:
-        results = []
+        # Izvještaj koristi samo sažetke, pa se planovi ne generišu
+        with metrics.stage("/export/comparison-pdf", "calculate"):
+            ranked = rank_comparison(comparison)
+            results = [
+                {"index": index, "input": comparison.credits[index].dict(), "summary": summary}
+                for index, summary in zip(ranked["ranking"], ranked["summaries"])
+            ]
         
-        for credit in comparison.credits:
-            start_date = datetime.strptime(credit.start_date, "%Y-%m-%d") if credit.start_date else None
-            
-            if credit.payment_type == "annuity":
-                schedule, summary = CreditCalculator.calculate_annuity(
-                    credit.amount,
-                    credit.annual_interest_rate,
-                    credit.term_months,
-                    start_date
-                )
-            else:
-                schedule, summary = CreditCalculator.calculate_linear(
-                    credit.amount,
-                    credit.annual_interest_rate,
-                    credit.term_months,
-                    start_date
-                )
-            
-            results.append({
-                "input": credit.dict(),
-                "summary": summary
-            })
-        
-        # Generiši uporedni PDF
-        pdf_buffer = PDFGenerator.generate_comparison_report(results)
+        # Generiši uporedni PDF (ponude u redoslijedu rangiranja)
+        with metrics.stage("/export/comparison-pdf", "render"):
+            pdf = await pdf_pool.render_comparison_report(
+                results, ranked["statistics"], comparison.rank_by, ranked["count"]
+            )
         
-        return StreamingResponse(
-            pdf_buffer,
+        return Response(
+            pdf,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=uporedba_kredita_{datetime.now().strftime('%Y%m%d')}.pdf"
             }
         )
     
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Statistika keša rezultata (pogoci, promašaji, izbacivanja)
+    """
+    return result_cache.stats()
+
+
+@app.get("/cache/pdf")
+async def pdf_cache_stats():
+    """
+    Statistika keša PDF izvještaja
+    """
+    return pdf_cache.stats()
+
+
+@app.delete("/cache/pdf", dependencies=[Depends(require_admin)])
+def invalidate_pdf_cache():
+    """
+    Poništi sve keširane PDF izvještaje (samo uz X-Admin-Token)
+    
+    Brisanje fajlova blokira, pa se endpoint izvršava u threadpool-u.
+    """
+    return {"removed": pdf_cache.invalidate()}
+
+
+@app.get("/export/stats")
+async def export_stats():
+    """
+    Statistika generisanja PDF izvještaja (trajanja, red čekanja, odbijeni zahtjevi)
+    """
+    return pdf_pool.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Metrike u Prometheus formatu: latencija po endpointu i fazi obrade,
+    dužine otplatnih planova i veličine PDF izvještaja (METRICS_ENABLED=1)
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrike nisu uključene (METRICS_ENABLED=1)")
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiling_status():
+    """
+    Stanje profilisanja i lista sačuvanih izvještaja
+    """
+    return profiler.status()
+
+
+@app.post("/admin/profiling/requests", dependencies=[Depends(require_admin)])
+async def arm_profiling(data: ProfilingInput):
+    """
+    Profiliši sljedećih N zahtjeva prema endpointu
+    
+    mode=cprofile: deterministički profil (.prof, za pstats/snakeviz).
+    mode=sample: uzorkovanje steka (collapsed stacks, za flamegraph).
+    PDF izvještaji profilisanih zahtjeva se generišu u ovom procesu.
+    """
+    return profiler.arm(data.endpoint, data.requests, data.mode, data.interval_ms)
+
+
+@app.delete("/admin/profiling/requests", dependencies=[Depends(require_admin)])
+async def disarm_profiling():
+    """
+    Otkaži profilisanje zahtjeva koji još nisu stigli
+    """
+    return profiler.disarm()
+
+
+@app.post("/admin/profiling/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def start_tracemalloc(data: TracemallocInput):
+    """
+    Pokreni praćenje alokacija (usporava obradu dok je uključeno)
+    """
+    return profiler.start_tracemalloc(data.frames)
+
+
+@app.post("/admin/profiling/tracemalloc/snapshot", dependencies=[Depends(require_admin)])
+async def tracemalloc_snapshot():
+    """
+    Snimak alokacija po mjestima poziva u aplikaciji (CreditCalculator, PDFGenerator...)
+    """
+    try:
+        return profiler.tracemalloc_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/admin/profiling/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def stop_tracemalloc():
+    """
+    Zaustavi praćenje alokacija
+    """
+    return profiler.stop_tracemalloc()
+
+
+@app.get("/admin/profiling/reports/{report_id}", dependencies=[Depends(require_admin)])
+async def download_profiling_report(report_id: str, output_format: Literal["raw", "text"] = Query("raw", alias="format")):
+    """
+    Preuzmi izvještaj profilisanja
+    
+    format=raw: .prof (cProfile), .collapsed (uzorkovanje) ili .snap (tracemalloc).
+    format=text: čitljiv sažetak.
+    """
+    report = profiler.get_report(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Izvještaj nije pronađen")
+    
+    if output_format == "text":
+        return PlainTextResponse(report["text"])
+    
+    return Response(
+        report["content"],
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename={report['id']}-{report['filename']}"}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,8 +1,8 @@
 """
 Modeli podataka za kreditni kalkulator
 """
-from pydantic import BaseModel, Field
-from typing import Literal, Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, Literal, Optional, List
 from datetime import date
 
 
@@ -13,6 +13,17 @@ class CreditInput(BaseModel):
     term_months: int = Field(..., gt=0, description="Rok otplate u mjesecima")
     payment_type: Literal["annuity", "linear"] = Field(..., description="Tip otplate: anuitetni ili linearni")
     start_date: Optional[str] = Field(None, description="Datum početka otplate")
+    upfront_fee: float = Field(0, ge=0, description="Jednokratna naknada pri isplati (KM)")
+    monthly_fee: float = Field(0, ge=0, description="Mjesečna naknada uz svaku ratu (KM)")
+    rounding: Optional[Literal["half_up", "half_even"]] = Field(
+        None, description="Obračun u cijelim centima sa zadanim zaokruživanjem kamate (bez - obračun u realnim brojevima)"
+    )
+    date_rule: Literal["days30", "calendar", "calendar_eom"] = Field(
+        "days30", description="Datumi plaćanja: svakih 30 dana, isti dan u mjesecu ili kraj mjeseca (calendar_eom)"
+    )
+    business_day: Literal["none", "following", "modified_following", "preceding"] = Field(
+        "none", description="Pomjeranje datuma plaćanja sa vikenda na radni dan"
+    )
 
 
 class PaymentScheduleItem(BaseModel):
@@ -32,6 +43,7 @@ class CreditSummary(BaseModel):
     total_cost: float = Field(..., description="Ukupni trošak (glavnica + kamata)")
     monthly_payment_avg: float = Field(..., description="Prosječna mjesečna rata")
     payment_type: str = Field(..., description="Tip otplate")
+    effective_annual_rate: Optional[float] = Field(None, description="Efektivna kamatna stopa - EKS (%)")
 
 
 class CreditCalculationResult(BaseModel):
@@ -40,6 +52,15 @@ class CreditCalculationResult(BaseModel):
     schedule: List[PaymentScheduleItem]
 
 
+class ScheduleWindowResult(BaseModel):
+    """Dio otplatnog plana (mjeseci start_month..end_month)"""
+    summary: CreditSummary
+    schedule: List[PaymentScheduleItem]
+    start_month: int = Field(..., description="Prvi mjesec u prozoru")
+    end_month: int = Field(..., description="Posljednji mjesec u prozoru")
+    term_months: int = Field(..., description="Ukupan broj mjeseci plana")
+
+
 class PrepaymentInput(BaseModel):
     """Model za prijevremenu otplatu"""
     amount: float = Field(..., gt=0, description="Iznos prijevremene otplate")
@@ -52,6 +73,242 @@ class InterestRateChangeInput(BaseModel):
     rate_change: float = Field(..., description="Promjena kamatne stope (npr. 1 za +1%, -0.5 za -0.5%)")
 
 
+# Najveći broj promjena stope (lista ili raspon) u analizi osjetljivosti
+MAX_RATE_CHANGES = 200
+
+
+class RateChangeRange(BaseModel):
+    """Raspon promjena kamatne stope (npr. -2 do 5 u koracima od 0.25)"""
+    start: float = Field(..., description="Početna promjena stope (%)")
+    stop: float = Field(..., description="Krajnja promjena stope (%), uključivo")
+    step: float = Field(..., gt=0, description="Korak promjene (%)")
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.stop < self.start:
+            raise ValueError("Krajnja promjena stope mora biti veća od početne")
+        if (self.stop - self.start) / self.step + 1 > MAX_RATE_CHANGES:
+            raise ValueError(f"Raspon može imati najviše {MAX_RATE_CHANGES} promjena stope; povećajte korak")
+        return self
+
+    def values(self) -> List[float]:
+        count = int(round((self.stop - self.start) / self.step)) + 1
+        return [round(self.start + index * self.step, 10) for index in range(count)]
+
+
+class RateSensitivityInput(BaseModel):
+    """Model za analizu osjetljivosti na promjenu kamatne stope"""
+    credits: List[CreditInput] = Field(..., min_items=1, max_items=1000, description="Krediti za analizu")
+    rate_changes: Optional[List[float]] = Field(
+        None, min_items=1, max_items=MAX_RATE_CHANGES, description="Lista promjena stope (%)"
+    )
+    rate_range: Optional[RateChangeRange] = Field(None, description="Raspon promjena stope")
+    from_month: int = Field(1, gt=0, description="Mjesec od kojeg važi nova stopa (1 = cijeli kredit)")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.rate_changes is None) == (self.rate_range is None):
+            raise ValueError("Navedite tačno jedno od polja 'rate_changes' ili 'rate_range'")
+        too_short = [index for index, credit in enumerate(self.credits) if self.from_month > credit.term_months]
+        if too_short:
+            raise ValueError(f"Mjesec promjene stope ({self.from_month}) je nakon roka otplate kredita {too_short}")
+        return self
+
+
+class RateSegment(BaseModel):
+    """Kamatna stopa koja važi od zadanog mjeseca do sljedeće promjene"""
+    from_month: int = Field(..., gt=0, description="Mjesec od kojeg važi stopa")
+    annual_interest_rate: float = Field(..., ge=0, le=100, description="Godišnja kamatna stopa (%)")
+
+
+class VariableRateInput(BaseModel):
+    """Model za kredit sa promjenljivom kamatnom stopom"""
+    credit: CreditInput
+    rate_path: Optional[List[RateSegment]] = Field(
+        None, min_items=1, description="Promjene stope; do prve promjene važi stopa iz kredita"
+    )
+    index_rates: Optional[List[float]] = Field(
+        None, min_items=1, description="Vrijednosti indeksa (%) za uzastopne periode promjene stope"
+    )
+    margin: float = Field(0, description="Marža banke (%) koja se dodaje na indeks")
+    reset_months: int = Field(6, gt=0, description="Period promjene stope u mjesecima")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.rate_path is None) == (self.index_rates is None):
+            raise ValueError("Navedite tačno jedno od polja 'rate_path' ili 'index_rates'")
+        return self
+
+
+class VariableRateResult(BaseModel):
+    """Rezultat izračuna kredita sa promjenljivom stopom"""
+    summary: CreditSummary
+    schedule: List[PaymentScheduleItem]
+    rate_path: List[RateSegment]
+
+
+class RateModelInput(BaseModel):
+    """Parametri Vasicek modela za kretanje indeksa kamatne stope"""
+    initial_rate: float = Field(3.0, description="Trenutna vrijednost indeksa (%)")
+    long_term_rate: float = Field(3.0, description="Dugoročni prosjek indeksa (%)")
+    mean_reversion: float = Field(0.2, ge=0, description="Brzina povratka ka prosjeku (godišnje)")
+    volatility: float = Field(1.0, ge=0, description="Volatilnost indeksa (% godišnje)")
+
+
+class RateStressInput(BaseModel):
+    """Model za Monte Carlo stres test kamatne stope"""
+    credits: List[CreditInput] = Field(..., min_items=1, max_items=1000, description="Portfolio kredita")
+    model: RateModelInput = Field(default_factory=RateModelInput, description="Model kretanja indeksa")
+    paths: int = Field(1000, gt=0, le=100000, description="Broj simuliranih putanja")
+    seed: int = Field(0, ge=0, description="Seed generatora slučajnih brojeva")
+    reset_months: int = Field(12, gt=0, description="Period promjene stope u mjesecima")
+    percentiles: List[Annotated[float, Field(ge=0, le=100)]] = Field(
+        [5, 50, 95, 99], min_items=1, description="Traženi percentili"
+    )
+
+
 class ComparisonInput(BaseModel):
     """Model za uporedbu više kredita"""
-    credits: List[CreditInput] = Field(..., min_items=2, max_items=3, description="Lista kredita za uporedbu")
+    credits: List[CreditInput] = Field(..., min_items=2, max_items=1000, description="Lista kredita za uporedbu")
+    rank_by: Literal["total_cost", "monthly_payment_avg", "effective_annual_rate"] = Field(
+        "total_cost", description="Kriterij rangiranja: ukupni trošak, prosječna rata ili EKS"
+    )
+    top: Optional[int] = Field(None, gt=0, description="Broj najboljih ponuda u rezultatu (bez - sve ponude)")
+
+
+class BatchCreditColumns(BaseModel):
+    """Kolonski unos za grupni izračun (jedna lista po parametru)"""
+    amounts: List[Annotated[float, Field(gt=0)]] = Field(..., description="Iznosi kredita")
+    annual_interest_rates: List[Annotated[float, Field(ge=0, le=100)]] = Field(..., description="Godišnje kamatne stope (%)")
+    term_months: List[Annotated[int, Field(gt=0)]] = Field(..., description="Rokovi otplate u mjesecima")
+    payment_types: List[Literal["annuity", "linear"]] = Field(..., description="Tipovi otplate")
+    start_dates: Optional[List[Optional[str]]] = Field(None, description="Datumi početka otplate")
+    upfront_fees: Optional[List[Annotated[float, Field(ge=0)]]] = Field(None, description="Jednokratne naknade (KM)")
+    monthly_fees: Optional[List[Annotated[float, Field(ge=0)]]] = Field(None, description="Mjesečne naknade (KM)")
+    date_rule: Literal["days30", "calendar", "calendar_eom"] = Field("days30", description="Pravilo za datume plaćanja (svi krediti)")
+    business_day: Literal["none", "following", "modified_following", "preceding"] = Field(
+        "none", description="Pomjeranje datuma plaćanja na radni dan (svi krediti)"
+    )
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        count = len(self.amounts)
+        lengths = [len(self.annual_interest_rates), len(self.term_months), len(self.payment_types)]
+        for optional in (self.start_dates, self.upfront_fees, self.monthly_fees):
+            if optional is not None:
+                lengths.append(len(optional))
+        if any(length != count for length in lengths):
+            raise ValueError("Sve kolone moraju imati isti broj elemenata")
+        return self
+
+
+# Najveći broj kredita u jednom grupnom izračunu
+BATCH_MAX_CREDITS = 50000
+
+
+class BatchCreditInput(BaseModel):
+    """Model za grupni izračun većeg broja kredita"""
+    credits: Optional[List[CreditInput]] = Field(None, max_items=BATCH_MAX_CREDITS, description="Lista kredita")
+    columns: Optional[BatchCreditColumns] = Field(None, description="Krediti u kolonskom obliku")
+    summary_only: bool = Field(False, description="Vrati samo sažetke, bez otplatnih planova")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.credits is None) == (self.columns is None):
+            raise ValueError("Navedite tačno jedno od polja 'credits' ili 'columns'")
+        if self.columns is not None and len(self.columns.amounts) > BATCH_MAX_CREDITS:
+            raise ValueError(f"Grupni izračun može imati najviše {BATCH_MAX_CREDITS} kredita")
+        return self
+
+
+class PortfolioInput(BaseModel):
+    """Model za projekciju novčanih tokova portfolija"""
+    credits: Optional[List[CreditInput]] = Field(None, max_items=BATCH_MAX_CREDITS, description="Lista kredita")
+    columns: Optional[BatchCreditColumns] = Field(None, description="Krediti u kolonskom obliku")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.credits is None) == (self.columns is None):
+            raise ValueError("Navedite tačno jedno od polja 'credits' ili 'columns'")
+        if self.credits is not None and not self.credits:
+            raise ValueError("Portfolio mora imati bar jedan kredit")
+        if self.columns is not None and not self.columns.amounts:
+            raise ValueError("Portfolio mora imati bar jedan kredit")
+        if self.columns is not None and len(self.columns.amounts) > BATCH_MAX_CREDITS:
+            raise ValueError(f"Portfolio može imati najviše {BATCH_MAX_CREDITS} kredita")
+        return self
+
+
+# Spojeni PDF generiše jedan worker u cjelini, pa je broj kredita ograničen
+MERGED_PDF_MAX_CREDITS = 100
+
+
+class BulkExportInput(BaseModel):
+    """Model za grupni izvoz PDF izvještaja"""
+    credits: List[CreditInput] = Field(..., min_items=1, max_items=5000, description="Krediti za izvoz")
+    output: Literal["zip", "pdf"] = Field("zip", description="ZIP sa PDF-om po kreditu ili jedan spojeni PDF")
+    full_schedule: bool = Field(False, description="Kompletan otplatni plan u svakom izvještaju")
+
+    @model_validator(mode="after")
+    def check_merged_size(self):
+        if self.output == "pdf" and len(self.credits) > MERGED_PDF_MAX_CREDITS:
+            raise ValueError(
+                f"Spojeni PDF može imati najviše {MERGED_PDF_MAX_CREDITS} kredita; za više koristite output=zip"
+            )
+        return self
+
+
+class AmountTarget(BaseModel):
+    """Upit za najveći iznos kredita uz zadanu ratu"""
+    monthly_payment: float = Field(..., gt=0, description="Najveća mjesečna rata (linearni: prva rata)")
+    annual_interest_rate: float = Field(..., ge=0, le=100, description="Godišnja kamatna stopa (%)")
+    term_months: int = Field(..., gt=0, description="Rok otplate u mjesecima")
+    payment_type: Literal["annuity", "linear"] = Field(..., description="Tip otplate: anuitetni ili linearni")
+
+
+class TermTarget(BaseModel):
+    """Upit za najkraći rok uz koji rata ne prelazi zadanu"""
+    amount: float = Field(..., gt=0, description="Iznos kredita")
+    annual_interest_rate: float = Field(..., ge=0, le=100, description="Godišnja kamatna stopa (%)")
+    monthly_payment: float = Field(..., gt=0, description="Najveća mjesečna rata (linearni: prva rata)")
+    payment_type: Literal["annuity", "linear"] = Field(..., description="Tip otplate: anuitetni ili linearni")
+
+
+class RateTarget(BaseModel):
+    """Upit za kamatnu stopu koja daje zadanu ratu"""
+    amount: float = Field(..., gt=0, description="Iznos kredita")
+    term_months: int = Field(..., gt=0, description="Rok otplate u mjesecima")
+    monthly_payment: float = Field(..., gt=0, description="Mjesečna rata (linearni: prva rata)")
+    payment_type: Literal["annuity", "linear"] = Field(..., description="Tip otplate: anuitetni ili linearni")
+
+
+# Najveći broj upita u jednom pozivu solvera
+SOLVER_MAX_TARGETS = 10000
+
+
+class SolveAmountInput(BaseModel):
+    """Model za izračun najvećeg iznosa kredita (jedan ili više upita)"""
+    targets: List[AmountTarget] = Field(..., min_items=1, max_items=SOLVER_MAX_TARGETS, description="Upiti")
+
+
+class SolveTermInput(BaseModel):
+    """Model za izračun potrebnog roka otplate (jedan ili više upita)"""
+    targets: List[TermTarget] = Field(..., min_items=1, max_items=SOLVER_MAX_TARGETS, description="Upiti")
+
+
+class SolveRateInput(BaseModel):
+    """Model za izračun implicitne kamatne stope (jedan ili više upita)"""
+    targets: List[RateTarget] = Field(..., min_items=1, max_items=SOLVER_MAX_TARGETS, description="Upiti")
+
+
+class ProfilingInput(BaseModel):
+    """Model za uključivanje profilisanja sljedećih zahtjeva"""
+    endpoint: str = Field(..., description="Putanja endpointa (npr. /calculate/prepayment)")
+    requests: int = Field(1, gt=0, le=1000, description="Broj zahtjeva za profilisanje")
+    mode: Literal["cprofile", "sample"] = Field("cprofile", description="cProfile (deterministički) ili uzorkovanje steka")
+    interval_ms: float = Field(5, gt=0, le=1000, description="Interval uzorkovanja (ms), samo za mode=sample")
+
+
+class TracemallocInput(BaseModel):
+    """Model za pokretanje tracemalloc praćenja"""
+    frames: int = Field(25, gt=0, le=100, description="Broj okvira steka po alokaciji")
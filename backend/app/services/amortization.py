@@ -0,0 +1,539 @@
+"""
+Vektorizovani NumPy motor za izračun otplatnih planova
+
+Kolone (kamata, glavnica, preostali dug) se računaju kao nizovi iz duga
+na početku svakog mjeseca. Dug se gradi istom rekurencijom kao petlja u
+CreditCalculator-u
+
+    B_k = B_{k-1} - (A - B_{k-1} * r)     (anuitet)
+    B_k = B_{k-1} - P / n                 (linearni)
+
+gdje je B_k preostali dug nakon k-tog mjeseca, pa su vrijednosti jednake
+petlji do posljednjeg bita (zatvoreni oblik B_k = P(1+r)^k - A[(1+r)^k - 1]/r
+se razlikuje u zadnjim bitovima i nakon zaokruživanja mijenja cent).
+Zatvorene formule se koriste samo za sažetke (batch_summaries,
+balance_after).
+"""
+from datetime import datetime
+from itertools import accumulate, repeat
+from typing import List, NamedTuple, Optional, Tuple
+import math
+
+import numpy as np
+
+from app.services.payment_dates import DAYS30, DateRule, payment_dates
+
+
+PAYMENT_TYPE_LABELS = {"annuity": "Anuitetni", "linear": "Linearni"}
+
+
+class ScheduleColumns(NamedTuple):
+    """Kolonski prikaz otplatnog plana (nezaokružene vrijednosti)"""
+    month: np.ndarray
+    monthly_payment: np.ndarray
+    principal: np.ndarray
+    interest: np.ndarray
+    remaining_balance: np.ndarray
+
+
+def monthly_rate(annual_rate: float) -> float:
+    """Konverzija godišnje (%) u mjesečnu kamatnu stopu"""
+    return (annual_rate / 100) / 12
+
+
+def annuity_payment(amount: float, rate: float, term_months: int) -> float:
+    """Mjesečna rata anuiteta - isti redoslijed operacija kao petlja"""
+    if rate == 0:
+        return amount / term_months
+    return amount * (
+        rate * math.pow(1 + rate, term_months)
+    ) / (math.pow(1 + rate, term_months) - 1)
+
+
+def annuity_payments(amounts: np.ndarray, rates: np.ndarray, terms: np.ndarray) -> np.ndarray:
+    """Vektorizovana mjesečna rata anuiteta za niz kredita"""
+    growth = np.power(1 + rates, terms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payments = amounts * (rates * growth) / (growth - 1)
+    return np.where(rates == 0, amounts / terms, payments)
+
+
+def _declining_balances(amount: float, step: float, term_months: int) -> np.ndarray:
+    """
+    Dug B_0..B_n kada se svaki mjesec otplaćuje isti iznos
+
+    subtract.accumulate oduzima redom, kao i petlja, pa su vrijednosti
+    identične do posljednjeg bita (P - k * step se razlikuje u zadnjoj
+    decimali i mijenja zaokruživanje na granici pola centa).
+    """
+    steps = np.full(term_months + 1, step)
+    steps[0] = amount
+    return np.subtract.accumulate(steps)
+
+
+def _annuity_balances(amount: float, rate: float, payment: float, term_months: int) -> np.ndarray:
+    """
+    Dug anuiteta B_0..B_n po rekurenciji petlje B_k = B_{k-1} - (A - B_{k-1} * r)
+
+    Rekurencija nije linearna u smislu accumulate ufunc-a, pa se dug
+    računa skalarnim prolazom (samo jedan float po mjesecu, bez redova).
+    """
+    return np.fromiter(
+        accumulate(repeat(None, term_months), lambda balance, _: balance - (payment - balance * rate), initial=amount),
+        dtype=float,
+        count=term_months + 1
+    )
+
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Zaokruživanje na 2 decimale identično Python-ovom round()
+
+    np.round množi sa 100 pa može odstupiti od round() kada je vrijednost
+    na samoj granici pola centa; takve (rijetke) vrijednosti se zaokružuju
+    pojedinačno.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(value, 2) for value in values[ties].tolist()]
+    return rounded
+
+
+def annuity_columns(
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    end_month: Optional[int] = None,
+    start_month: int = 1
+) -> ScheduleColumns:
+    """
+    Kolone anuitetnog plana
+
+    start_month/end_month ograničavaju izračun na mjesece start..end; dug
+    prethodnih mjeseci se samo provlači kroz rekurenciju (bez kolona).
+    """
+    rate = monthly_rate(annual_rate)
+    payment = annuity_payment(amount, rate, term_months)
+
+    end = term_months if end_month is None else min(end_month, term_months)
+    months = np.arange(start_month, end + 1)
+    count = len(months)
+
+    # Dug na početku svakog mjeseca (B_{k-1}); iste operacije kao petlja
+    opening = _annuity_balances(amount, rate, payment, end)[start_month - 1:-1]
+    interest = opening * rate
+    principal = payment - interest
+    remaining = opening - principal
+
+    # Posljednja rata preuzima razliku nastalu zaokruživanjem
+    if end == term_months and count:
+        principal[-1] += remaining[-1]
+        remaining[-1] = 0
+
+    return ScheduleColumns(
+        month=months,
+        monthly_payment=np.full(count, payment),
+        principal=principal,
+        interest=interest,
+        remaining_balance=remaining
+    )
+
+
+def linear_columns(
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    end_month: Optional[int] = None,
+    start_month: int = 1
+) -> ScheduleColumns:
+    """
+    Kolone linearnog plana
+
+    start_month/end_month ograničavaju izračun na mjesece start..end.
+    """
+    rate = monthly_rate(annual_rate)
+    principal_payment = amount / term_months
+
+    end = term_months if end_month is None else min(end_month, term_months)
+    # Dug se i za prozor računa uzastopnim oduzimanjem (isti bitovi kao
+    # petlja); to je jedan vektorski prolaz, a redovi se prave samo za prozor
+    balances = _declining_balances(amount, principal_payment, end)[start_month - 1:]
+    interest = balances[:-1] * rate
+    count = len(interest)
+
+    return ScheduleColumns(
+        month=np.arange(start_month, end + 1),
+        monthly_payment=principal_payment + interest,
+        principal=np.full(count, principal_payment),
+        interest=interest,
+        remaining_balance=balances[1:]
+    )
+
+
+def schedule_columns(
+    payment_type: str,
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    end_month: Optional[int] = None,
+    start_month: int = 1
+) -> ScheduleColumns:
+    """Kolone plana za zadani tip otplate"""
+    if payment_type == "annuity":
+        return annuity_columns(amount, annual_rate, term_months, end_month, start_month)
+    return linear_columns(amount, annual_rate, term_months, end_month, start_month)
+
+
+def variable_rate_columns(
+    payment_type: str,
+    amount: float,
+    term_months: int,
+    rate_path: List[Tuple[int, float]]
+) -> ScheduleColumns:
+    """
+    Kolone plana sa promjenljivom stopom
+
+    rate_path je [(od_mjeseca, godišnja stopa %), ...], rastuće po mjesecu i
+    sa prvim segmentom od mjeseca 1. Anuitet se na početku svakog segmenta
+    ponovo računa za preostali dug i preostali rok, pa je segment jedan
+    poziv annuity_columns. Linearni plan zadržava istu
+    glavnicu, a stopa mijenja samo kamatu - cijeli plan je jedan prolaz.
+    """
+    starts = [month for month, _ in rate_path]
+    lengths = np.diff(starts + [term_months + 1])
+
+    if payment_type != "annuity":
+        balances = _declining_balances(amount, amount / term_months, term_months)
+        rates = np.repeat(monthly_rate(np.array([rate for _, rate in rate_path], dtype=float)), lengths)
+        interest = balances[:-1] * rates
+        return ScheduleColumns(
+            month=np.arange(1, term_months + 1),
+            monthly_payment=amount / term_months + interest,
+            principal=np.full(term_months, amount / term_months),
+            interest=interest,
+            remaining_balance=balances[1:]
+        )
+
+    parts = []
+    balance = amount
+    for (start, annual_rate), length in zip(rate_path, lengths.tolist()):
+        part = annuity_columns(balance, annual_rate, term_months - start + 1, length)
+        parts.append(part._replace(month=part.month + start - 1))
+        balance = float(part.remaining_balance[-1])
+    return ScheduleColumns(*(np.concatenate(column) for column in zip(*parts)))
+
+
+def to_rows(columns: ScheduleColumns, start_date: datetime, date_rule: DateRule = DAYS30) -> List[dict]:
+    """Pretvara kolone u listu redova u formatu CreditCalculator-a"""
+    months = columns.month.tolist()
+    calendar = payment_dates(start_date, months[-1] if months else 0, date_rule)
+    dates = [calendar[month - 1] for month in months]
+
+    return [
+        {
+            "month": month,
+            "payment_date": payment_date,
+            "monthly_payment": payment,
+            "principal": principal,
+            "interest": interest,
+            "remaining_balance": remaining
+        }
+        for month, payment_date, payment, principal, interest, remaining in zip(
+            months,
+            dates,
+            round_cents(columns.monthly_payment).tolist(),
+            round_cents(columns.principal).tolist(),
+            round_cents(columns.interest).tolist(),
+            round_cents(np.maximum(columns.remaining_balance, 0)).tolist()
+        )
+    ]
+
+
+def summarize(amount: float, payment_type: str, columns: ScheduleColumns) -> dict:
+    """Sažetak plana iz kolona - isti zbirovi kao u petlji"""
+    # cumsum sabira redom kao i petlja (np.sum koristi parno sabiranje)
+    total_interest = float(np.cumsum(columns.interest)[-1])
+
+    if payment_type == "annuity":
+        payment_avg = float(columns.monthly_payment[0])
+    else:
+        payment_avg = float(np.cumsum(columns.monthly_payment)[-1]) / len(columns.month)
+
+    return _summary(amount, payment_type, total_interest, payment_avg)
+
+
+def summarize_loop(payment_type: str, amount: float, annual_rate: float, term_months: int) -> dict:
+    """
+    Sažetak kao summarize(schedule_columns(...)), ali bez kolona
+
+    Dug, kamata i rata se računaju skalarnim prolazom istom rekurencijom
+    i sabiraju redom kao cumsum, pa su zbirovi identični, a memorija ne
+    zavisi od roka otplate (za streamovanje plana).
+    """
+    rate = monthly_rate(annual_rate)
+    balance = amount
+    total_interest = 0.0
+
+    if payment_type == "annuity":
+        payment = annuity_payment(amount, rate, term_months)
+        for _ in range(term_months):
+            interest = balance * rate
+            total_interest += interest
+            balance -= payment - interest
+        return _summary(amount, payment_type, total_interest, payment)
+
+    step = amount / term_months
+    total_payments = 0.0
+    for _ in range(term_months):
+        interest = balance * rate
+        total_interest += interest
+        total_payments += step + interest
+        balance -= step
+    return _summary(amount, payment_type, total_interest, total_payments / term_months)
+
+
+def _summary(amount: float, payment_type: str, total_interest: float, payment_avg: float) -> dict:
+    return {
+        "total_amount": round(amount, 2),
+        "total_interest": round(total_interest, 2),
+        "total_cost": round(amount + total_interest, 2),
+        "monthly_payment_avg": round(payment_avg, 2),
+        "payment_type": PAYMENT_TYPE_LABELS[payment_type]
+    }
+
+
+def annuity_schedule(
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    start_date: datetime,
+    date_rule: DateRule = DAYS30
+) -> Tuple[List[dict], dict]:
+    """Anuitetni plan i sažetak preko NumPy motora"""
+    columns = annuity_columns(amount, annual_rate, term_months)
+    return to_rows(columns, start_date, date_rule), summarize(amount, "annuity", columns)
+
+
+def linear_schedule(
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    start_date: datetime,
+    date_rule: DateRule = DAYS30
+) -> Tuple[List[dict], dict]:
+    """Linearni plan i sažetak preko NumPy motora"""
+    columns = linear_columns(amount, annual_rate, term_months)
+    return to_rows(columns, start_date, date_rule), summarize(amount, "linear", columns)
+
+
+def batch_summaries(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray
+) -> dict:
+    """
+    Sažeci za niz kredita bez generisanja planova
+
+    Anuitet:  ukupna kamata = A * n - P
+    Linearni: ukupna kamata = P * r * (n + 1) / 2  (aritmetički niz)
+    """
+    rates = monthly_rate(annual_rates)
+    payments = annuity_payments(amounts, rates, terms)
+
+    linear_interest = amounts * rates * (terms + 1) / 2
+    total_interest = np.where(is_annuity, payments * terms - amounts, linear_interest)
+    payment_avg = np.where(is_annuity, payments, (amounts + linear_interest) / terms)
+
+    return {
+        "total_amount": amounts,
+        "total_interest": total_interest,
+        "total_cost": amounts + total_interest,
+        "monthly_payment_avg": payment_avg
+    }
+
+
+def batch_columns(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray
+) -> ScheduleColumns:
+    """
+    Kolone planova za niz kredita kao matrice (kredit x mjesec)
+
+    Mjeseci nakon roka pojedinog kredita su popunjeni nulama. Dug se gradi
+    mjesec po mjesec za sve kredite odjednom (kolona matrice po koraku),
+    istim operacijama kao petlja u CreditCalculator-u.
+    """
+    rates = monthly_rate(annual_rates)[:, None]
+    # np.power se od math.pow razlikuje u zadnjem bitu, pa se rata računa
+    # skalarno (jedan poziv po kreditu) kao u petlji
+    payments = np.array([
+        annuity_payment(amount, rate, term)
+        for amount, rate, term in zip(amounts.tolist(), rates[:, 0].tolist(), terms.tolist())
+    ]).reshape(-1, 1)
+    step = np.where(is_annuity, payments[:, 0], amounts / terms)
+
+    months = np.arange(1, int(terms.max()) + 1)
+    active = months[None, :] <= terms[:, None]
+
+    # Dug na početku mjeseca: anuitet B - (A - B * r), linearni B - P / n
+    opening = np.empty(active.shape)
+    balance = amounts.astype(float)
+    for column in range(len(months)):
+        opening[:, column] = balance
+        balance = balance - np.where(is_annuity, payments[:, 0] - balance * rates[:, 0], step)
+
+    interest = opening * rates
+    annuity = is_annuity[:, None]
+    principal = np.where(annuity, payments - interest, step[:, None])
+    monthly_payment = np.where(annuity, payments, principal + interest)
+    remaining = opening - principal
+
+    # Posljednja rata anuiteta preuzima razliku nastalu zaokruživanjem
+    rows = np.flatnonzero(is_annuity)
+    last = terms[rows] - 1
+    principal[rows, last] += remaining[rows, last]
+    remaining[rows, last] = 0
+
+    return ScheduleColumns(
+        month=np.broadcast_to(months, active.shape),
+        monthly_payment=np.where(active, monthly_payment, 0),
+        principal=np.where(active, principal, 0),
+        interest=np.where(active, interest, 0),
+        remaining_balance=np.where(active, remaining, 0)
+    )
+
+
+def batch_schedules(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    start_dates: List[datetime],
+    summary_only: bool = False,
+    date_rules: Optional[List[DateRule]] = None
+):
+    """
+    Generator (Schedule, sažetak) za svaki kredit iz niza
+
+    Za summary_only=True plan je None i sažetak dolazi iz zatvorenih formula.
+    date_rules (po kreditu) određuje datume plaćanja; bez njega važi DAYS30.
+    """
+    labels = np.where(is_annuity, PAYMENT_TYPE_LABELS["annuity"], PAYMENT_TYPE_LABELS["linear"]).tolist()
+
+    if summary_only:
+        totals = batch_summaries(amounts, annual_rates, terms, is_annuity)
+        for index, values in enumerate(zip(*(round_cents(totals[key]).tolist() for key in totals))):
+            summary = dict(zip(totals, values))
+            summary["payment_type"] = labels[index]
+            yield None, summary
+        return
+
+    columns = batch_columns(amounts, annual_rates, terms, is_annuity)
+    # cumsum sabira redom kao i petlja (nule nakon roka ne mijenjaju zbir)
+    total_interest = np.cumsum(columns.interest, axis=1)[:, -1]
+    total_payments = np.cumsum(columns.monthly_payment, axis=1)[:, -1]
+    payment_avg = np.where(is_annuity, columns.monthly_payment[:, 0], total_payments / terms)
+
+    totals = {
+        "total_amount": round_cents(amounts).tolist(),
+        "total_interest": round_cents(total_interest).tolist(),
+        "total_cost": round_cents(amounts + total_interest).tolist(),
+        "monthly_payment_avg": round_cents(payment_avg).tolist()
+    }
+
+    # Zaokruživanje cijele matrice odjednom; planovi su pogledi na njene redove
+    from app.services.schedule import Schedule
+    months = columns.month[0].astype(np.int32)
+    payments = round_cents(columns.monthly_payment)
+    principal = round_cents(columns.principal)
+    interest = round_cents(columns.interest)
+    remaining = round_cents(np.maximum(columns.remaining_balance, 0))
+
+    for index, term in enumerate(terms.tolist()):
+        schedule = Schedule(
+            start_dates[index],
+            months[:term],
+            payments[index, :term],
+            principal[index, :term],
+            interest[index, :term],
+            remaining[index, :term],
+            date_rules[index] if date_rules is not None else DAYS30
+        )
+        summary = {key: values[index] for key, values in totals.items()}
+        summary["payment_type"] = labels[index]
+        yield schedule, summary
+
+
+def balance_after(
+    amounts: np.ndarray,
+    rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    elapsed: np.ndarray
+) -> np.ndarray:
+    """Preostali dug nakon `elapsed` mjeseci (zatvoreni oblik, bez petlje)"""
+    payments = annuity_payments(amounts, rates, terms)
+    growth = np.power(1 + rates, elapsed)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(
+            rates == 0,
+            amounts - payments * elapsed,
+            amounts * growth - payments * (growth - 1) / rates
+        )
+    linear = amounts - elapsed * amounts / terms
+    return np.where(is_annuity, annuity, linear)
+
+
+def rate_change_grid(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    rate_changes: np.ndarray,
+    from_month: int = 1
+) -> dict:
+    """
+    Sažeci za sve kombinacije kredit x promjena stope (matrice)
+
+    Nova stopa važi od mjeseca from_month: do tada se otplaćuje po
+    izvornoj stopi, a preostali dug se zatim otplaćuje po novoj stopi
+    tokom preostalog roka (anuitet se ponovo izračunava).
+    """
+    rates = monthly_rate(annual_rates)
+    elapsed = np.minimum(from_month - 1, terms)
+    remaining_terms = (terms - elapsed)[:, None]
+    principal_payments = amounts / terms
+    payments = annuity_payments(amounts, rates, terms)
+
+    balance = balance_after(amounts, rates, terms, is_annuity, elapsed)
+    interest_before = np.where(
+        is_annuity,
+        payments * elapsed - (amounts - balance),
+        rates * (elapsed * amounts - principal_payments * elapsed * (elapsed - 1) / 2)
+    )
+
+    new_rates = monthly_rate(annual_rates[:, None] + rate_changes[None, :])
+    balance = balance[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        new_payments = annuity_payments(balance, new_rates, remaining_terms)
+    new_payments = np.where(remaining_terms > 0, new_payments, 0)
+
+    step = principal_payments[:, None]
+    linear_interest = new_rates * (remaining_terms * balance - step * remaining_terms * (remaining_terms - 1) / 2)
+    annuity = is_annuity[:, None]
+    interest_after = np.where(annuity, new_payments * remaining_terms - balance, linear_interest)
+
+    total_interest = interest_before[:, None] + interest_after
+    total_cost = amounts[:, None] + total_interest
+
+    return {
+        "total_interest": total_interest,
+        "total_cost": total_cost,
+        "monthly_payment_avg": total_cost / terms[:, None],
+        "new_monthly_payment": np.where(annuity, new_payments, np.where(remaining_terms > 0, step + balance * new_rates, 0))
+    }
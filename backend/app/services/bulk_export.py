@@ -0,0 +1,62 @@
+"""
+Pomoćne funkcije za grupni izvoz PDF izvještaja
+"""
+from typing import AsyncIterator, Tuple, Union
+import zipfile
+
+
+class _ChunkWriter:
+    """
+    Izlaz za ZipFile koji skuplja zapisane bajte do sljedećeg preuzimanja
+
+    Nema seek/tell, pa ZipFile piše lokalna zaglavlja sa data descriptor-om
+    i arhiva se može slati dok nastaje.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def report_entry(index: int, result: Union[bytes, Exception]) -> Tuple[str, bytes]:
+    """
+    Naziv i sadržaj fajla u arhivi za izvještaj rednog broja `index`
+
+    Neuspjeli izvještaj (greška iz pool-a) postaje tekstualni fajl sa
+    opisom greške, pa ostali izvještaji i arhiva ostaju ispravni.
+    """
+    if isinstance(result, Exception):
+        return f"kredit_{index:05d}_greska.txt", f"Izvještaj za kredit {index} nije generisan: {result}\n".encode("utf-8")
+    return f"kredit_{index:05d}.pdf", result
+
+
+async def stream_zip(files: AsyncIterator[Tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    ZIP arhiva kao niz bajt-blokova, fajl po fajl
+
+    U memoriji je u svakom trenutku samo trenutni fajl, a ne cijela arhiva.
+    PDF je već komprimovan, pa se fajlovi samo pohranjuju (ZIP_STORED).
+    Status odgovora je već poslan, pa se greška izvora fajlova upisuje u
+    arhivu (greska.txt) i arhiva se ispravno zatvara umjesto prekida.
+    """
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        try:
+            async for name, data in files:
+                archive.writestr(name, data)
+                yield writer.drain()
+        except Exception as error:
+            archive.writestr("greska.txt", f"Izvoz je prekinut: {error}\n".encode("utf-8"))
+    # Centralni direktorij se upisuje pri zatvaranju arhive
+    yield writer.drain()
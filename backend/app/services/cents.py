@@ -0,0 +1,191 @@
+"""
+Motor otplatnog plana u cijelim centima
+
+Dug, kamata, glavnica i rata su cijeli brojevi centi, a kamata se
+zaokružuje eksplicitnim pravilom (half_up ili half_even). Zato u svakom
+redu vrijedi rata = glavnica + kamata, a zbir glavnica je tačno iznos
+kredita. Mjesečna stopa je racionalan broj
+
+    r = stopa_jedinice / (1200 * RATE_SCALE)
+
+pa je kamata B * r tačan količnik dva cijela broja (bez Decimal-a).
+"""
+from datetime import datetime
+from typing import List, Tuple
+import math
+
+import numpy as np
+
+from app.services.amortization import (
+    PAYMENT_TYPE_LABELS, ScheduleColumns, annuity_payment, to_rows
+)
+from app.services.payment_dates import DAYS30, DateRule
+
+
+ROUNDING_MODES = ("half_up", "half_even")
+
+# Godišnja stopa (%) se uzima na 6 decimala
+RATE_SCALE = 10 ** 6
+RATE_DENOMINATOR = 1200 * RATE_SCALE
+
+# Najveći proizvod dug * stopa_jedinice koji stane u int64 (linearni, NumPy)
+INT64_LIMIT = 2 ** 63 - 1
+
+
+def check_rounding(rounding: str) -> None:
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"Nepoznato pravilo zaokruživanja: {rounding}")
+
+
+def to_cents(value: float) -> int:
+    """Iznos u KM kao cijeli broj centi"""
+    return round(value * 100)
+
+
+def rate_units(annual_rate: float) -> int:
+    """Godišnja stopa (%) u jedinicama 1 / RATE_SCALE procenta"""
+    return round(annual_rate * RATE_SCALE)
+
+
+def divide(numerator: int, denominator: int, rounding: str) -> int:
+    """Količnik nenegativnih cijelih brojeva zaokružen na cijeli broj"""
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and (rounding == "half_up" or quotient % 2)):
+        quotient += 1
+    return quotient
+
+
+def divide_array(numerators: np.ndarray, denominator: int, rounding: str) -> np.ndarray:
+    """Vektorizovano divide() za int64 niz"""
+    quotients, remainders = np.divmod(numerators, denominator)
+    twice = 2 * remainders
+    ties = twice == denominator
+    if rounding == "half_even":
+        ties &= quotients % 2 == 1
+    return quotients + ((twice > denominator) | ties)
+
+
+def round_payment(value: float, rounding: str) -> int:
+    """Rata iz formule (u centima, realan broj) zaokružena na cent"""
+    if rounding == "half_up":
+        return math.floor(value + 0.5)
+    return round(value)
+
+
+def annuity_cents(amount: float, annual_rate: float, term_months: int, rounding: str = "half_up") -> Tuple[np.ndarray, ...]:
+    """
+    Anuitetni plan u centima: (rata, glavnica, kamata, preostali dug)
+
+    Rata je formula zaokružena na cent; kamata se računa na stvarni
+    (zaokruženi) dug, pa je petlja po mjesecima neizbježna, ali radi samo
+    sa cijelim brojevima. Rata koja zatvara dug (posljednja) otplaćuje
+    tačno ostatak. Greška zaokruživanja rate raste sa (1 + r)^n, pa kod
+    visokih stopa i dugih rokova dug može biti otplaćen prije roka -
+    preostali mjeseci tada imaju ratu 0. Ako je zaokružena rata jednaka
+    kamati (ekstremne stope) ili je 0 (nekoliko centi na dug rok),
+    glavnica se ne otplaćuje i cijeli dug dospijeva u posljednjoj rati.
+    """
+    check_rounding(rounding)
+    total = to_cents(amount)
+    units = rate_units(annual_rate)
+    payment = round_payment(annuity_payment(total, units / RATE_DENOMINATOR, term_months), rounding)
+
+    balance = total
+    interests: List[int] = []
+    append = interests.append
+    for _ in range(term_months - 1):
+        interest = divide(balance * units, RATE_DENOMINATOR, rounding)
+        if payment - interest >= balance:
+            break
+        append(interest)
+        balance -= payment - interest
+
+    # Rata koja zatvara dug
+    closing_interest = divide(balance * units, RATE_DENOMINATOR, rounding)
+    append(closing_interest)
+    closing = len(interests)
+
+    interest = np.zeros(term_months, dtype=np.int64)
+    interest[:closing] = interests
+    payments = np.full(term_months, payment, dtype=np.int64)
+    payments[closing - 1] = balance + closing_interest
+    payments[closing:] = 0
+    principal = payments - interest
+    remaining = total - np.cumsum(principal)
+    return payments, principal, interest, remaining
+
+
+def linear_cents(amount: float, annual_rate: float, term_months: int, rounding: str = "half_up") -> Tuple[np.ndarray, ...]:
+    """
+    Linearni plan u centima: (rata, glavnica, kamata, preostali dug)
+
+    Glavnica je iznos / rok; ostatak dijeljenja (manje od roka centi)
+    raspoređuje se po jedan cent na prve mjesece. Dug ne zavisi od kamate,
+    pa se sve kolone računaju vektorski.
+    """
+    check_rounding(rounding)
+    total = to_cents(amount)
+    units = rate_units(annual_rate)
+    if total * units > INT64_LIMIT:
+        raise ValueError("Iznos i kamatna stopa su izvan opsega obračuna u centima")
+
+    base, extra = divmod(total, term_months)
+    principal = np.full(term_months, base, dtype=np.int64)
+    principal[:extra] += 1
+    remaining = total - np.cumsum(principal)
+    interest = divide_array((remaining + principal) * units, RATE_DENOMINATOR, rounding)
+    return principal + interest, principal, interest, remaining
+
+
+def schedule_columns(
+    payment_type: str,
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    rounding: str = "half_up"
+) -> ScheduleColumns:
+    """Kolone plana (u KM) iz obračuna u centima"""
+    calculate = annuity_cents if payment_type == "annuity" else linear_cents
+    payments, principal, interest, remaining = calculate(amount, annual_rate, term_months, rounding)
+    return ScheduleColumns(
+        month=np.arange(1, term_months + 1),
+        monthly_payment=payments / 100,
+        principal=principal / 100,
+        interest=interest / 100,
+        remaining_balance=remaining / 100
+    )
+
+
+def summarize(amount: float, payment_type: str, columns: ScheduleColumns) -> dict:
+    """Sažetak plana - zbirovi u cijelim centima"""
+    total_interest = int(np.rint(columns.interest * 100).sum())
+    total_payments = int(np.rint(columns.monthly_payment * 100).sum())
+    total_amount = to_cents(amount)
+
+    if payment_type == "annuity":
+        payment_avg = float(columns.monthly_payment[0])
+    else:
+        payment_avg = round(total_payments / len(columns.month) / 100, 2)
+
+    return {
+        "total_amount": total_amount / 100,
+        "total_interest": total_interest / 100,
+        "total_cost": (total_amount + total_interest) / 100,
+        "monthly_payment_avg": payment_avg,
+        "payment_type": PAYMENT_TYPE_LABELS[payment_type]
+    }
+
+
+def schedule(
+    payment_type: str,
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    start_date: datetime,
+    rounding: str = "half_up",
+    date_rule: DateRule = DAYS30
+) -> Tuple[List[dict], dict]:
+    """Plan (redovi) i sažetak obračunati u centima"""
+    columns = schedule_columns(payment_type, amount, annual_rate, term_months, rounding)
+    return to_rows(columns, start_date, date_rule), summarize(amount, payment_type, columns)
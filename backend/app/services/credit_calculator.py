@@ -1,20 +1,49 @@
 """
 Servis za izračun kredita - anuitetni i linearni model
 """
-from datetime import datetime, timedelta
-from typing import List, Tuple
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
 import math
 
+import numpy as np
+
+from app.services import amortization, cents, portfolio, simulation, solvers
+from app.services.metrics import metrics
+from app.services.payment_dates import DAYS30, DateRule, payment_dates
+from app.services.schedule import Schedule
+
 
 class CreditCalculator:
     """Klasa za izračun različitih tipova kredita"""
     
+    # Dostupni motori: "loop" (petlja po mjesecima), "numpy" (vektorizovani)
+    # i "cents" (obračun u cijelim centima, vidi cents.py)
+    ENGINES = ("loop", "numpy", "cents")
+    
+    # Broj kredita koji se obrađuje u jednom vektorizovanom prolazu
+    BATCH_CHUNK_SIZE = 512
+    
+    # Polja sažetka po kojima se ponude mogu rangirati
+    RANK_FIELDS = ("total_cost", "monthly_payment_avg", "effective_annual_rate")
+    
+    # Najveća godišnja kamatna stopa (%) koju prima CreditInput
+    MAX_ANNUAL_RATE = 100
+    
+    @staticmethod
+    def _check_engine(engine: str) -> None:
+        if engine not in CreditCalculator.ENGINES:
+            raise ValueError(f"Nepoznat motor za izračun: {engine}")
+    
     @staticmethod
     def calculate_annuity(
         amount: float,
         annual_rate: float,
         term_months: int,
-        start_date: datetime = None
+        start_date: datetime = None,
+        engine: str = "loop",
+        rounding: str = "half_up",
+        date_rule: DateRule = DAYS30
     ) -> Tuple[List[dict], dict]:
         """
         Izračun anuitetnog kredita (fiksna rata)
@@ -26,10 +55,21 @@ class CreditCalculator:
         P = iznos kredita
         r = mjesečna kamatna stopa
         n = broj mjeseci
+        
+        engine="numpy" računa sve kolone odjednom (vidi amortization.py), a
+        engine="cents" u cijelim centima sa pravilom zaokruživanja `rounding`.
+        Datumi plaćanja dolaze iz keširanog kalendara za `date_rule`.
         """
+        CreditCalculator._check_engine(engine)
+        metrics.observe("schedule_length_months", term_months, "annuity", "calculate_annuity")
         if start_date is None:
             start_date = datetime.now()
         
+        if engine == "numpy":
+            return amortization.annuity_schedule(amount, annual_rate, term_months, start_date, date_rule)
+        if engine == "cents":
+            return cents.schedule("annuity", amount, annual_rate, term_months, start_date, rounding, date_rule)
+        
         # Konverzija godišnje u mjesečnu kamatnu stopu
         monthly_rate = (annual_rate / 100) / 12
         
@@ -41,6 +81,7 @@ class CreditCalculator:
                 monthly_rate * math.pow(1 + monthly_rate, term_months)
             ) / (math.pow(1 + monthly_rate, term_months) - 1)
         
+        dates = payment_dates(start_date, term_months, date_rule)
         schedule = []
         remaining_balance = amount
         total_interest = 0
@@ -64,15 +105,13 @@ class CreditCalculator:
             total_interest += interest
             total_principal += principal
             
-            payment_date = start_date + timedelta(days=30 * month)
-            
             schedule.append({
                 "month": month,
-                "payment_date": payment_date.strftime("%Y-%m-%d"),
+                "payment_date": dates[month - 1],
                 "monthly_payment": round(monthly_payment, 2),
                 "principal": round(principal, 2),
                 "interest": round(interest, 2),
-                "remaining_balance": round(max(0, remaining_balance), 2)
+                "remaining_balance": round(max(0.0, remaining_balance), 2)
             })
         
         summary = {
@@ -90,22 +129,37 @@ class CreditCalculator:
         amount: float,
         annual_rate: float,
         term_months: int,
-        start_date: datetime = None
+        start_date: datetime = None,
+        engine: str = "loop",
+        rounding: str = "half_up",
+        date_rule: DateRule = DAYS30
     ) -> Tuple[List[dict], dict]:
         """
         Izračun linearnog kredita (opadajuća rata)
         
         Glavnica se dijeli na jednake dijelove, kamata se obračunava na preostali dug
+        
+        engine="numpy" računa sve kolone odjednom (vidi amortization.py), a
+        engine="cents" u cijelim centima sa pravilom zaokruživanja `rounding`.
+        Datumi plaćanja dolaze iz keširanog kalendara za `date_rule`.
         """
+        CreditCalculator._check_engine(engine)
+        metrics.observe("schedule_length_months", term_months, "linear", "calculate_linear")
         if start_date is None:
             start_date = datetime.now()
         
+        if engine == "numpy":
+            return amortization.linear_schedule(amount, annual_rate, term_months, start_date, date_rule)
+        if engine == "cents":
+            return cents.schedule("linear", amount, annual_rate, term_months, start_date, rounding, date_rule)
+        
         # Konverzija godišnje u mjesečnu kamatnu stopu
         monthly_rate = (annual_rate / 100) / 12
         
         # Fiksni dio glavnice
         principal_payment = amount / term_months
         
+        dates = payment_dates(start_date, term_months, date_rule)
         schedule = []
         remaining_balance = amount
         total_interest = 0
@@ -124,15 +178,13 @@ class CreditCalculator:
             # Ažuriranje preostalog duga
             remaining_balance -= principal_payment
             
-            payment_date = start_date + timedelta(days=30 * month)
-            
             schedule.append({
                 "month": month,
-                "payment_date": payment_date.strftime("%Y-%m-%d"),
+                "payment_date": dates[month - 1],
                 "monthly_payment": round(monthly_payment, 2),
                 "principal": round(principal_payment, 2),
                 "interest": round(interest, 2),
-                "remaining_balance": round(max(0, remaining_balance), 2)
+                "remaining_balance": round(max(0.0, remaining_balance), 2)
             })
         
         summary = {
@@ -145,6 +197,194 @@ class CreditCalculator:
         
         return schedule, summary
     
+    @staticmethod
+    def iter_schedule(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        start_date: datetime = None,
+        rounding: Optional[str] = None,
+        date_rule: DateRule = DAYS30
+    ) -> Iterator[dict]:
+        """
+        Generator otplatnog plana - vraća red po red
+        
+        Redovi su identični onima iz calculate_annuity / calculate_linear,
+        ali se plan nikad ne drži cijeli u memoriji. Uz `rounding` plan se
+        obračunava u centima (kolone se prave odjednom, redovi red po red).
+        """
+        metrics.observe("schedule_length_months", term_months, payment_type, "iter_schedule")
+        if start_date is None:
+            start_date = datetime.now()
+        
+        if rounding is not None:
+            columns = cents.schedule_columns(payment_type, amount, annual_rate, term_months, rounding)
+            yield from Schedule.from_columns(columns, start_date, date_rule).to_rows()
+            return
+        
+        dates = payment_dates(start_date, term_months, date_rule)
+        monthly_rate = (annual_rate / 100) / 12
+        annuity = payment_type == "annuity"
+        
+        if annuity:
+            monthly_payment = amortization.annuity_payment(amount, monthly_rate, term_months)
+        else:
+            principal_payment = amount / term_months
+        
+        remaining_balance = amount
+        
+        for month in range(1, term_months + 1):
+            interest = remaining_balance * monthly_rate
+            
+            if annuity:
+                principal = monthly_payment - interest
+                remaining_balance -= principal
+                
+                # Zaokruživanje na posljednji mjesec zbog zaokruživanja
+                if month == term_months:
+                    principal += remaining_balance
+                    remaining_balance = 0
+            else:
+                principal = principal_payment
+                monthly_payment = principal_payment + interest
+                remaining_balance -= principal_payment
+            
+            yield {
+                "month": month,
+                "payment_date": dates[month - 1],
+                "monthly_payment": round(monthly_payment, 2),
+                "principal": round(principal, 2),
+                "interest": round(interest, 2),
+                "remaining_balance": round(max(0.0, remaining_balance), 2)
+            }
+    
+    @staticmethod
+    def calculate_schedule(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        start_date: datetime = None,
+        rounding: Optional[str] = None,
+        date_rule: DateRule = DAYS30
+    ) -> Tuple[Schedule, dict]:
+        """
+        Otplatni plan kao kompaktan Schedule (kolone u NumPy nizovima)
+        
+        Vrijednosti su iste kao u calculate_annuity/calculate_linear, ali bez
+        pravljenja dict-a za svaki mjesec; redovi se prave tek pri čitanju.
+        Uz `rounding` ("half_up"/"half_even") plan se obračunava u centima.
+        """
+        metrics.observe("schedule_length_months", term_months, payment_type, "calculate_schedule")
+        if start_date is None:
+            start_date = datetime.now()
+        
+        if rounding is not None:
+            columns = cents.schedule_columns(payment_type, amount, annual_rate, term_months, rounding)
+            return Schedule.from_columns(columns, start_date, date_rule), cents.summarize(amount, payment_type, columns)
+        
+        columns = amortization.schedule_columns(payment_type, amount, annual_rate, term_months)
+        summary = amortization.summarize(amount, payment_type, columns)
+        return Schedule.from_columns(columns, start_date, date_rule), summary
+    
+    @staticmethod
+    def calculate_schedule_window(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        start_month: int,
+        end_month: int,
+        start_date: datetime = None,
+        rounding: Optional[str] = None,
+        date_rule: DateRule = DAYS30
+    ) -> Schedule:
+        """
+        Dio otplatnog plana - mjeseci start_month..end_month (uključivo)
+        
+        Dug prethodnih mjeseci se samo provlači kroz rekurenciju (bez kolona
+        i redova), pa se prave samo redovi prozora; vrijednosti su iste kao
+        u punom planu. Obračun u centima (`rounding`) se izdvaja iz cijelog
+        plana.
+        """
+        if not 1 <= start_month <= term_months:
+            raise ValueError("Početni mjesec mora biti između 1 i roka otplate")
+        if end_month < start_month:
+            raise ValueError("Krajnji mjesec ne može biti prije početnog")
+        if start_date is None:
+            start_date = datetime.now()
+        
+        if rounding is not None:
+            full = cents.schedule_columns(payment_type, amount, annual_rate, term_months, rounding)
+            columns = amortization.ScheduleColumns(*(column[start_month - 1:end_month] for column in full))
+        else:
+            columns = amortization.schedule_columns(
+                payment_type, amount, annual_rate, term_months, end_month, start_month
+            )
+        metrics.observe("schedule_length_months", len(columns.month), payment_type, "calculate_schedule_window")
+        return Schedule.from_columns(columns, start_date, date_rule)
+    
+    @staticmethod
+    def calculate_summary(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        rounding: Optional[str] = None
+    ) -> dict:
+        """
+        Sažetak kredita bez generisanja otplatnog plana - O(1)
+        
+        Anuitet:  ukupna kamata = A * n - P
+        Linearni: ukupna kamata = P * r * (n + 1) / 2  (aritmetički niz)
+        
+        Uz `rounding` kamata zavisi od zaokruživanja svakog mjeseca, pa se
+        sažetak računa iz plana u centima (O(n)).
+        """
+        if rounding is not None:
+            columns = cents.schedule_columns(payment_type, amount, annual_rate, term_months, rounding)
+            return cents.summarize(amount, payment_type, columns)
+        
+        monthly_rate = amortization.monthly_rate(annual_rate)
+        
+        if payment_type == "annuity":
+            monthly_payment = amortization.annuity_payment(amount, monthly_rate, term_months)
+            total_interest = monthly_payment * term_months - amount
+            payment_avg = monthly_payment
+        else:
+            total_interest = amount * monthly_rate * (term_months + 1) / 2
+            payment_avg = (amount + total_interest) / term_months
+        
+        return {
+            "total_amount": round(amount, 2),
+            "total_interest": round(total_interest, 2),
+            "total_cost": round(amount + total_interest, 2),
+            "monthly_payment_avg": round(payment_avg, 2),
+            "payment_type": amortization.PAYMENT_TYPE_LABELS[payment_type]
+        }
+    
+    @staticmethod
+    def schedule_summary(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        rounding: Optional[str] = None
+    ) -> dict:
+        """
+        Sažetak identičan onome iz calculate_schedule, bez plana u memoriji
+        
+        Zatvorene formule iz calculate_summary se u rijetkim slučajevima
+        razlikuju za cent od zbira redova; ovdje se kamata sabira skalarnim
+        prolazom kroz mjesece (O(n) vrijeme, O(1) memorija), kao uz
+        iter_schedule. Uz `rounding` sažetak dolazi iz plana u centima.
+        """
+        if rounding is not None:
+            columns = cents.schedule_columns(payment_type, amount, annual_rate, term_months, rounding)
+            return cents.summarize(amount, payment_type, columns)
+        return amortization.summarize_loop(payment_type, amount, annual_rate, term_months)
+    
     @staticmethod
     def calculate_with_prepayment(
         amount: float,
@@ -153,72 +393,616 @@ class CreditCalculator:
         payment_type: str,
         prepayment_amount: float,
         prepayment_month: int,
-        start_date: datetime = None
+        start_date: datetime = None,
+        date_rule: DateRule = DAYS30
     ) -> Tuple[List[dict], dict]:
         """
         Izračun kredita sa prijevremenom otplatom
         """
+        return CreditCalculator.calculate_with_prepayments(
+            amount,
+            annual_rate,
+            term_months,
+            payment_type,
+            [(prepayment_amount, prepayment_month)],
+            start_date,
+            date_rule
+        )
+    
+    @staticmethod
+    def calculate_with_prepayments(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        prepayments: Sequence[Tuple[float, int]],
+        start_date: datetime = None,
+        date_rule: DateRule = DAYS30
+    ) -> Tuple[List[dict], dict]:
+        """
+        Izračun kredita sa jednom ili više prijevremenih otplata
+        
+        prepayments je lista parova (iznos, mjesec). Osnovni plan se računa
+        samo jednom (kolonski): iz njega dolaze redovi do prve otplate i
+        ukupna kamata za izračun uštede. Nakon svake djelimične otplate
+        generišu se samo redovi do sljedeće otplate, odnosno do kraja roka.
+        """
         if start_date is None:
             start_date = datetime.now()
         
-        # Prvo generiši redovni plan
-        if payment_type == "annuity":
-            schedule, _ = CreditCalculator.calculate_annuity(amount, annual_rate, term_months, start_date)
-        else:
-            schedule, _ = CreditCalculator.calculate_linear(amount, annual_rate, term_months, start_date)
+        # Otplate u istom mjesecu se sabiraju
+        amounts_by_month = {}
+        for prepayment_amount, prepayment_month in prepayments:
+            amounts_by_month[prepayment_month] = amounts_by_month.get(prepayment_month, 0) + prepayment_amount
+        months = sorted(amounts_by_month)
+        
+        base = amortization.schedule_columns(payment_type, amount, annual_rate, term_months)
+        original_interest = float(np.cumsum(amortization.round_cents(base.interest))[-1])
+        
+        schedule = []
+        total_payment = 0
+        total_interest = 0
+        
+        # Trenutni dio plana i broj mjeseci koji mu prethode
+        segment = base
+        offset = 0
         
-        # Primijeni prijevremenu otplatu
-        if prepayment_month <= len(schedule):
-            remaining_at_prepayment = schedule[prepayment_month - 1]["remaining_balance"]
+        for index, prepayment_month in enumerate(months):
+            if prepayment_month > term_months:
+                break
+            
+            head = amortization.ScheduleColumns(*(column[:prepayment_month - offset] for column in segment))
+            rows = amortization.to_rows(head._replace(month=head.month + offset), start_date, date_rule)
+            schedule.extend(rows)
+            total_payment = sum((row["monthly_payment"] for row in rows), total_payment)
+            total_interest = sum((row["interest"] for row in rows), total_interest)
+            
+            last = rows[-1]
+            remaining_at_prepayment = last["remaining_balance"]
+            prepayment_amount = amounts_by_month[prepayment_month]
             
             if prepayment_amount >= remaining_at_prepayment:
                 # Potpuna otplata
-                schedule = schedule[:prepayment_month]
-                schedule[-1]["remaining_balance"] = 0
-                new_term = prepayment_month
-            else:
-                # Djelimična otplata - smanji preostali dug i preračunaj
-                new_amount = remaining_at_prepayment - prepayment_amount
-                remaining_months = term_months - prepayment_month
-                
-                # Dodaj informaciju o prijevremnoj otplati
-                schedule[prepayment_month - 1]["prepayment"] = prepayment_amount
-                schedule[prepayment_month - 1]["remaining_balance"] -= prepayment_amount
-                
-                # Preračunaj preostale rate
-                if payment_type == "annuity":
-                    new_schedule, _ = CreditCalculator.calculate_annuity(
-                        new_amount, annual_rate, remaining_months,
-                        start_date + timedelta(days=30 * prepayment_month)
-                    )
-                else:
-                    new_schedule, _ = CreditCalculator.calculate_linear(
-                        new_amount, annual_rate, remaining_months,
-                        start_date + timedelta(days=30 * prepayment_month)
-                    )
-                
-                # Ažuriraj mjesečne brojeve
-                for item in new_schedule:
-                    item["month"] += prepayment_month
-                
-                # Kombiniraj raspored
-                schedule = schedule[:prepayment_month] + new_schedule
-                new_term = len(schedule)
+                last["remaining_balance"] = 0
+                segment = None
+                break
+            
+            # Djelimična otplata - smanji preostali dug i preračunaj ostatak
+            last["prepayment"] = prepayment_amount
+            last["remaining_balance"] -= prepayment_amount
+            
+            next_month = months[index + 1] if index + 1 < len(months) else term_months
+            offset = prepayment_month
+            segment = amortization.schedule_columns(
+                payment_type,
+                remaining_at_prepayment - prepayment_amount,
+                annual_rate,
+                term_months - offset,
+                next_month - offset
+            )
         
-        # Izračunaj novi sažetak
-        total_payment = sum(item["monthly_payment"] for item in schedule)
-        total_interest = sum(item["interest"] for item in schedule)
+        if segment is not None:
+            rows = amortization.to_rows(segment._replace(month=segment.month + offset), start_date, date_rule)
+            schedule.extend(rows)
+            total_payment = sum((row["monthly_payment"] for row in rows), total_payment)
+            total_interest = sum((row["interest"] for row in rows), total_interest)
         
         summary = {
             "total_amount": round(amount, 2),
             "total_interest": round(total_interest, 2),
             "total_cost": round(total_payment, 2),
             "monthly_payment_avg": round(total_payment / len(schedule), 2),
-            "payment_type": "Anuitetni" if payment_type == "annuity" else "Linearni",
-            "prepayment_savings": round(amount + sum(item["interest"] for item in 
-                (CreditCalculator.calculate_annuity(amount, annual_rate, term_months, start_date)[0] 
-                 if payment_type == "annuity" else 
-                 CreditCalculator.calculate_linear(amount, annual_rate, term_months, start_date)[0])) - total_payment, 2)
+            "payment_type": amortization.PAYMENT_TYPE_LABELS[payment_type],
+            "prepayment_savings": round(amount + original_interest - total_payment, 2)
         }
         
+        metrics.observe("schedule_length_months", len(schedule), payment_type, "calculate_with_prepayments")
         return schedule, summary
+    
+    @staticmethod
+    def calculate_rate_sensitivity(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str],
+        rate_changes: Sequence[float],
+        from_month: int = 1
+    ) -> List[List[dict]]:
+        """
+        Analiza osjetljivosti na promjenu kamatne stope
+        
+        Za svaki kredit i svaku promjenu stope vraća sažetak, izračunat
+        u jednom vektorizovanom prolazu (matrica kredit x scenarij).
+        Nova stopa važi od mjeseca from_month (1 = cijeli kredit).
+        """
+        annual_rates = np.asarray(annual_rates, dtype=float)
+        changes = np.asarray(list(rate_changes) + [0.0], dtype=float)
+        
+        if (annual_rates[:, None] + changes[None, :] < 0).any():
+            raise ValueError("Kamatna stopa ne može biti negativna")
+        
+        grid = amortization.rate_change_grid(
+            np.asarray(amounts, dtype=float),
+            annual_rates,
+            np.asarray(term_months, dtype=int),
+            np.asarray(payment_types) == "annuity",
+            changes,
+            from_month
+        )
+        
+        # Posljednja kolona je izvorna stopa (promjena 0) - osnova za poređenje
+        interest_difference = grid["total_interest"][:, :-1] - grid["total_interest"][:, -1:]
+        columns = {key: amortization.round_cents(values[:, :-1]).tolist() for key, values in grid.items()}
+        columns["interest_difference"] = amortization.round_cents(interest_difference).tolist()
+        new_rates = (annual_rates[:, None] + changes[None, :-1]).round(10).tolist()
+        
+        results = []
+        for loan in range(len(annual_rates)):
+            scenarios = []
+            for scenario, rate_change in enumerate(changes[:-1].tolist()):
+                item = {"rate_change": rate_change, "annual_interest_rate": new_rates[loan][scenario]}
+                for key, values in columns.items():
+                    item[key] = values[loan][scenario]
+                scenarios.append(item)
+            results.append(scenarios)
+        
+        return results
+    
+    @staticmethod
+    def index_rate_path(
+        index_rates: Sequence[float],
+        margin: float,
+        reset_months: int,
+        term_months: int
+    ) -> List[Tuple[int, float]]:
+        """
+        Putanja stope za kredit vezan za indeks (npr. EURIBOR + marža)
+        
+        Stopa se mijenja svakih reset_months mjeseci: segment k počinje
+        mjesecom 1 + k * reset_months i ima stopu index_rates[k] + margin
+        (najmanje 0). Kada indeksa ima manje od perioda, posljednja stopa
+        važi do kraja roka.
+        """
+        if reset_months <= 0:
+            raise ValueError("Period promjene stope mora biti veći od 0")
+        
+        path = []
+        for period, index_rate in enumerate(index_rates):
+            from_month = 1 + period * reset_months
+            if from_month > term_months:
+                break
+            path.append((from_month, round(max(index_rate + margin, 0.0), 10)))
+        return path
+    
+    @staticmethod
+    def _check_rate_path(rate_path: Sequence[Tuple[int, float]], term_months: int) -> List[Tuple[int, float]]:
+        """Provjera putanje stope - mjeseci rastući, od 1 do roka, stope >= 0"""
+        path = [(int(month), float(rate)) for month, rate in rate_path]
+        if not path or path[0][0] != 1:
+            raise ValueError("Putanja kamatne stope mora početi od 1. mjeseca")
+        for (month, _), (next_month, _) in zip(path, path[1:]):
+            if next_month <= month:
+                raise ValueError("Mjeseci promjene kamatne stope moraju biti rastući")
+        if path[-1][0] > term_months:
+            raise ValueError("Promjena kamatne stope ne može biti nakon roka otplate")
+        if any(rate < 0 for _, rate in path):
+            raise ValueError("Kamatna stopa ne može biti negativna")
+        return path
+    
+    @staticmethod
+    def calculate_variable_rate(
+        amount: float,
+        term_months: int,
+        payment_type: str,
+        rate_path: Sequence[Tuple[int, float]],
+        start_date: datetime = None,
+        date_rule: DateRule = DAYS30
+    ) -> Tuple[Schedule, dict]:
+        """
+        Kredit sa promjenljivom kamatnom stopom
+        
+        rate_path je lista (od_mjeseca, godišnja stopa %) - prvi segment
+        počinje mjesecom 1, a svaka stopa važi do sljedeće promjene. Plan se
+        računa po segmentima (vidi amortization.variable_rate_columns), bez
+        pravljenja redova po mjesecima.
+        Prosječna rata je ukupna uplata / broj mjeseci.
+        """
+        path = CreditCalculator._check_rate_path(rate_path, term_months)
+        metrics.observe("schedule_length_months", term_months, payment_type, "calculate_variable_rate")
+        if start_date is None:
+            start_date = datetime.now()
+        
+        columns = amortization.variable_rate_columns(payment_type, amount, term_months, path)
+        summary = amortization.summarize(amount, payment_type, columns)
+        summary["monthly_payment_avg"] = round(float(np.cumsum(columns.monthly_payment)[-1]) / term_months, 2)
+        return Schedule.from_columns(columns, start_date, date_rule), summary
+    
+    @staticmethod
+    def simulate_rate_stress(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str],
+        model: simulation.RateModel,
+        paths: int,
+        seed: int = 0,
+        reset_months: int = 12,
+        percentiles: Sequence[float] = (5, 50, 95, 99),
+        executor: Optional[Executor] = None
+    ) -> dict:
+        """
+        Monte Carlo stres test kamatne stope za portfolio kredita
+        
+        Za `paths` simuliranih putanja indeksa (Vasicek, vidi simulation.py)
+        računa raspodjelu ukupne kamate i najvećeg skoka mjesečne rate (%)
+        za svaki kredit i za cijeli portfolio. Isti seed daje iste
+        rezultate, bez obzira na executor (pool procesa).
+        """
+        if paths <= 0:
+            raise ValueError("Broj putanja mora biti veći od 0")
+        if reset_months <= 0:
+            raise ValueError("Period promjene stope mora biti veći od 0")
+        if any(not 0 <= percentile <= 100 for percentile in percentiles):
+            raise ValueError("Percentili moraju biti između 0 i 100")
+        
+        amounts, annual_rates, terms, is_annuity = CreditCalculator._solver_inputs(
+            payment_types, amounts, annual_rates, term_months
+        )
+        interest, shock = simulation.simulate(
+            amounts, annual_rates, terms.astype(np.int64), is_annuity,
+            model, reset_months, paths, seed, executor
+        )
+        
+        keys = [f"p{percentile:g}" for percentile in percentiles]
+        
+        def distribution(sketch: simulation.QuantileSketch) -> List[dict]:
+            quantiles = amortization.round_cents(sketch.quantiles(percentiles)).tolist()
+            means = amortization.round_cents(sketch.means()).tolist()
+            return [dict(zip(keys, values), mean=mean) for values, mean in zip(quantiles, means)]
+        
+        interest_rows = distribution(interest)
+        shock_rows = distribution(shock)
+        return {
+            "loans": [
+                {"total_interest": interest_row, "payment_shock": shock_row}
+                for interest_row, shock_row in zip(interest_rows[:-1], shock_rows[:-1])
+            ],
+            "portfolio": {"total_interest": interest_rows[-1], "payment_shock": shock_rows[-1]}
+        }
+    
+    @staticmethod
+    def _solver_inputs(payment_types: Sequence[str], *columns: Sequence[float]) -> Tuple[np.ndarray, ...]:
+        """Kolone upita kao NumPy nizovi iste dužine"""
+        if any(len(column) != len(payment_types) for column in columns):
+            raise ValueError("Sve kolone upita moraju imati isti broj elemenata")
+        return tuple(np.asarray(column, dtype=float) for column in columns) + (np.asarray(payment_types) == "annuity",)
+    
+    @staticmethod
+    def solve_amount(
+        monthly_payments: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str]
+    ) -> List[dict]:
+        """
+        Najveći iznos kredita za zadanu mjesečnu ratu (za linearni - prvu ratu)
+        
+        Obrnuta formula rate, bez generisanja otplatnih planova.
+        """
+        payments, rates, terms, is_annuity = CreditCalculator._solver_inputs(
+            payment_types, monthly_payments, annual_rates, term_months
+        )
+        rates = amortization.monthly_rate(rates)
+        amounts = solvers.max_amounts(payments, rates, terms, is_annuity)
+        achieved = amortization.round_cents(solvers.first_payments(amounts, rates, terms, is_annuity))
+        
+        return [
+            {"amount": amount, "monthly_payment": payment, "feasible": amount > 0}
+            for amount, payment in zip(amounts.tolist(), achieved.tolist())
+        ]
+    
+    @staticmethod
+    def solve_term(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        monthly_payments: Sequence[float],
+        payment_types: Sequence[str]
+    ) -> List[dict]:
+        """
+        Najkraći rok otplate uz koji rata (za linearni - prva rata) ne prelazi zadanu
+        
+        Ako rata ne pokriva ni mjesečnu kamatu, rješenje ne postoji (feasible=False).
+        """
+        amounts, rates, payments, is_annuity = CreditCalculator._solver_inputs(
+            payment_types, amounts, annual_rates, monthly_payments
+        )
+        rates = amortization.monthly_rate(rates)
+        terms = solvers.min_terms(amounts, rates, payments, is_annuity)
+        feasible = terms > 0
+        achieved = amortization.round_cents(
+            solvers.first_payments(amounts, rates, np.where(feasible, terms, 1), is_annuity)
+        )
+        
+        return [
+            {"term_months": term, "monthly_payment": payment, "feasible": True}
+            if ok else {"term_months": None, "monthly_payment": None, "feasible": False}
+            for term, payment, ok in zip(terms.tolist(), achieved.tolist(), feasible.tolist())
+        ]
+    
+    @staticmethod
+    def solve_rate(
+        amounts: Sequence[float],
+        term_months: Sequence[int],
+        monthly_payments: Sequence[float],
+        payment_types: Sequence[str]
+    ) -> List[dict]:
+        """
+        Godišnja kamatna stopa (%) koja daje zadanu ratu (za linearni - prvu ratu)
+        
+        Linearni model ima zatvoreni oblik; za anuitet se koristi vektorizovani
+        Newton. Rata manja od iznos / rok nema rješenje, a stopa iznad
+        MAX_ANNUAL_RATE (granica iz CreditInput) nije dozvoljena - u oba
+        slučaja feasible=False.
+        """
+        amounts, terms, payments, is_annuity = CreditCalculator._solver_inputs(
+            payment_types, amounts, term_months, monthly_payments
+        )
+        rates = solvers.implied_rates(amounts, payments, terms, is_annuity)
+        annual_rates = [round(rate * 12 * 100, 6) for rate in rates.tolist()]
+        
+        return [
+            {"annual_interest_rate": rate, "feasible": True}
+            if rate <= CreditCalculator.MAX_ANNUAL_RATE else {"annual_interest_rate": None, "feasible": False}
+            for rate in annual_rates
+        ]
+    
+    @staticmethod
+    def _fee_columns(count: int, upfront_fees: Optional[Sequence[float]], monthly_fees: Optional[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Naknade kao NumPy nizovi (bez naknada - nule)"""
+        upfront = np.zeros(count) if upfront_fees is None else np.asarray(upfront_fees, dtype=float)
+        monthly = np.zeros(count) if monthly_fees is None else np.asarray(monthly_fees, dtype=float)
+        if len(upfront) != count or len(monthly) != count:
+            raise ValueError("Broj naknada ne odgovara broju kredita")
+        return upfront, monthly
+    
+    @staticmethod
+    def _effective_rates(flows: np.ndarray, net_amounts: np.ndarray, start_rates: np.ndarray) -> List[float]:
+        """EKS (%) iz matrice tokova: (1 + i)^12 - 1, i = mjesečna interna stopa prinosa"""
+        if (net_amounts <= 0).any():
+            raise ValueError("Jednokratna naknada mora biti manja od iznosa kredita")
+        monthly = solvers.irr_rates(flows, net_amounts, start_rates)
+        return [round(rate, 2) for rate in ((np.power(1 + monthly, 12) - 1) * 100).tolist()]
+    
+    @staticmethod
+    def effective_annual_rates(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str],
+        upfront_fees: Optional[Sequence[float]] = None,
+        monthly_fees: Optional[Sequence[float]] = None
+    ) -> List[float]:
+        """
+        Efektivna kamatna stopa (EKS, %) za niz kredita sa naknadama
+        
+        Korisnik dobija iznos umanjen za jednokratnu naknadu, a plaća ratu
+        uvećanu za mjesečnu naknadu. Interna stopa prinosa tih tokova računa
+        se jednim Newton postupkom za cijeli blok od BATCH_CHUNK_SIZE kredita.
+        """
+        amounts, rates, terms, is_annuity = CreditCalculator._solver_inputs(
+            payment_types, amounts, annual_rates, term_months
+        )
+        upfront, monthly = CreditCalculator._fee_columns(len(amounts), upfront_fees, monthly_fees)
+        rates = amortization.monthly_rate(rates)
+        chunk_size = CreditCalculator.BATCH_CHUNK_SIZE
+        
+        results = []
+        for offset in range(0, len(amounts), chunk_size):
+            chunk = slice(offset, offset + chunk_size)
+            flows = solvers.installment_flows(amounts[chunk], rates[chunk], terms[chunk], is_annuity[chunk])
+            flows += np.where(flows > 0, monthly[chunk, None], 0.0)
+            results += CreditCalculator._effective_rates(flows, amounts[chunk] - upfront[chunk], rates[chunk])
+        
+        return results
+    
+    @staticmethod
+    def effective_annual_rate(
+        amount: float,
+        annual_rate: float,
+        term_months: int,
+        payment_type: str,
+        upfront_fee: float = 0,
+        monthly_fee: float = 0
+    ) -> float:
+        """Efektivna kamatna stopa (EKS, %) jednog kredita"""
+        return CreditCalculator.effective_annual_rates(
+            [amount], [annual_rate], [term_months], [payment_type], [upfront_fee], [monthly_fee]
+        )[0]
+    
+    @staticmethod
+    def schedule_effective_rate(
+        amount: float,
+        annual_rate: float,
+        payments: Sequence[float],
+        upfront_fee: float = 0,
+        monthly_fee: float = 0
+    ) -> float:
+        """
+        EKS (%) za proizvoljan niz mjesečnih uplata (npr. plan sa prijevremenom otplatom)
+        """
+        flows = np.asarray(payments, dtype=float)[None, :] + monthly_fee
+        start = np.array([amortization.monthly_rate(annual_rate)])
+        return CreditCalculator._effective_rates(flows, np.array([amount - upfront_fee]), start)[0]
+    
+    @staticmethod
+    def project_cash_flows(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str],
+        start_dates: Optional[Sequence[Optional[datetime]]] = None,
+        date_rules: Optional[Sequence[DateRule]] = None
+    ) -> dict:
+        """
+        Novčani tokovi portfolija po kalendarskim mjesecima
+        
+        Za svaki mjesec vraća zbir glavnice, kamate i rata svih kredita te
+        preostali dug na kraju mjeseca. Planovi pojedinih kredita se ne
+        prave (vidi portfolio.py), pa memorija ne raste sa brojem kredita.
+        """
+        count = len(amounts)
+        if not (len(annual_rates) == len(term_months) == len(payment_types) == count):
+            raise ValueError("Sve kolone portfolija moraju imati isti broj elemenata")
+        if start_dates is not None and len(start_dates) != count:
+            raise ValueError("Broj datuma početka ne odgovara broju kredita")
+        if date_rules is not None and len(date_rules) != count:
+            raise ValueError("Broj pravila za datume ne odgovara broju kredita")
+        
+        today = np.datetime64(datetime.now().date(), "D")
+        dates = np.array([
+            np.datetime64(date.date(), "D") if date is not None else today
+            for date in (start_dates if start_dates is not None else [None] * count)
+        ], dtype="datetime64[D]")
+        
+        first_month, flows = portfolio.project(
+            np.asarray(amounts, dtype=float),
+            np.asarray(annual_rates, dtype=float),
+            np.asarray(term_months, dtype=np.int64),
+            np.asarray(payment_types) == "annuity",
+            dates,
+            date_rules if date_rules is not None else [DAYS30] * count
+        )
+        
+        labels = portfolio.month_labels(first_month, len(flows["payment"]))
+        columns = {key: values.tolist() for key, values in flows.items()}
+        months = [
+            {"month": label, **{key: values[index] for key, values in columns.items()}}
+            for index, label in enumerate(labels)
+        ]
+        
+        totals = {key: round(float(np.cumsum(flows[key])[-1]), 2) for key in ("principal", "interest", "payment")}
+        totals["loans"] = count
+        return {"months": months, "totals": totals}
+    
+    @staticmethod
+    def compare_offers(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str],
+        upfront_fees: Optional[Sequence[float]] = None,
+        monthly_fees: Optional[Sequence[float]] = None,
+        roundings: Optional[Sequence[Optional[str]]] = None,
+        rank_by: str = "total_cost",
+        top: Optional[int] = None
+    ) -> dict:
+        """
+        Uporedba proizvoljnog broja ponuda - sažeci, rangiranje i statistika
+        
+        Sažeci i EKS se računaju u jednom vektorizovanom prolazu (ponude sa
+        `rounding` se preračunavaju u centima). Najboljih `top` ponuda po
+        polju rank_by (manje je bolje) bira se sa np.partition u O(N), pa se
+        sortira samo izabranih k; kod jednakih vrijednosti prednost ima
+        ranija ponuda. Statistika (min, medijan, prosjek, max) obuhvata sve
+        ponude.
+        """
+        if rank_by not in CreditCalculator.RANK_FIELDS:
+            raise ValueError(f"Nepoznat kriterij rangiranja: {rank_by}")
+        
+        amounts_array, rates, terms, is_annuity = CreditCalculator._solver_inputs(
+            payment_types, amounts, annual_rates, term_months
+        )
+        totals = {
+            key: amortization.round_cents(values)
+            for key, values in amortization.batch_summaries(amounts_array, rates, terms, is_annuity).items()
+        }
+        totals["effective_annual_rate"] = np.array(CreditCalculator.effective_annual_rates(
+            amounts, annual_rates, term_months, payment_types, upfront_fees, monthly_fees
+        ))
+        
+        for index, rounding in enumerate(roundings or []):
+            if rounding is not None:
+                summary = CreditCalculator.calculate_summary(
+                    amounts[index], annual_rates[index], term_months[index], payment_types[index], rounding
+                )
+                for key in ("total_amount", "total_interest", "total_cost", "monthly_payment_avg"):
+                    totals[key][index] = summary[key]
+        
+        count = len(amounts)
+        values = totals[rank_by]
+        selected = count if top is None else min(top, count)
+        if selected < count:
+            threshold = np.partition(values, selected - 1)[selected - 1]
+            better = np.flatnonzero(values < threshold)
+            equal = np.flatnonzero(values == threshold)[:selected - len(better)]
+            candidates = np.concatenate([better, equal])
+        else:
+            candidates = np.arange(count)
+        ranking = candidates[np.lexsort((candidates, values[candidates]))]
+        
+        labels = amortization.PAYMENT_TYPE_LABELS
+        columns = {key: values[ranking].tolist() for key, values in totals.items()}
+        summaries = [
+            dict({key: column[position] for key, column in columns.items()}, payment_type=labels[payment_types[index]])
+            for position, index in enumerate(ranking.tolist())
+        ]
+        
+        statistics = {
+            key: {
+                "min": float(totals[key].min()),
+                "median": round(float(np.median(totals[key])), 2),
+                "mean": round(float(totals[key].mean()), 2),
+                "max": float(totals[key].max())
+            }
+            for key in ("total_cost", "total_interest", "monthly_payment_avg", "effective_annual_rate")
+        }
+        
+        return {"count": count, "ranking": ranking.tolist(), "summaries": summaries, "statistics": statistics}
+    
+    @staticmethod
+    def calculate_batch(
+        amounts: Sequence[float],
+        annual_rates: Sequence[float],
+        term_months: Sequence[int],
+        payment_types: Sequence[str],
+        start_dates: Optional[Sequence[Optional[datetime]]] = None,
+        summary_only: bool = False,
+        date_rules: Optional[Sequence[DateRule]] = None
+    ) -> Iterator[Tuple[Optional[Schedule], dict]]:
+        """
+        Grupni izračun većeg broja kredita
+        
+        Vraća generator (plan, sažetak) u redoslijedu ulaza. Krediti se
+        obrađuju u blokovima od BATCH_CHUNK_SIZE, pa memorija ne raste sa
+        veličinom portfolija. Uz summary_only=True planovi se ne generišu.
+        date_rules (po kreditu) određuje datume plaćanja; bez njega DAYS30.
+        """
+        count = len(amounts)
+        if not (len(annual_rates) == len(term_months) == len(payment_types) == count):
+            raise ValueError("Sve kolone grupnog izračuna moraju imati isti broj elemenata")
+        if start_dates is not None and len(start_dates) != count:
+            raise ValueError("Broj datuma početka ne odgovara broju kredita")
+        if date_rules is not None and len(date_rules) != count:
+            raise ValueError("Broj pravila za datume ne odgovara broju kredita")
+        
+        today = datetime.now()
+        chunk_size = CreditCalculator.BATCH_CHUNK_SIZE
+        
+        for offset in range(0, count, chunk_size):
+            chunk = slice(offset, offset + chunk_size)
+            types = payment_types[chunk]
+            dates = start_dates[chunk] if start_dates is not None else [None] * len(types)
+            
+            if metrics.enabled and not summary_only:
+                for term, payment_type in zip(term_months[chunk], types):
+                    metrics.observe("schedule_length_months", term, payment_type, "calculate_batch")
+            
+            yield from amortization.batch_schedules(
+                np.asarray(amounts[chunk], dtype=float),
+                np.asarray(annual_rates[chunk], dtype=float),
+                np.asarray(term_months[chunk], dtype=int),
+                np.asarray(types) == "annuity",
+                [date or today for date in dates],
+                summary_only,
+                date_rules[chunk] if date_rules is not None else None
+            )
@@ -0,0 +1,220 @@
+"""
+Metrike latencije i veličina rezultata u Prometheus tekstualnom formatu
+
+Mjerenje je isključeno dok se ne pozove metrics.enable() (METRICS_ENABLED=1).
+Dok je isključeno, timer()/stage() vraćaju zajednički prazan context manager,
+a observe() se odmah vraća, pa instrumentacija u kodu ne košta gotovo ništa.
+"""
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+
+# Granice histograma (Prometheus "le"; +Inf se dodaje automatski)
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONTHS_BUCKETS = (12, 24, 36, 60, 120, 180, 240, 300, 360, 480, 600, 1200)
+BYTES_BUCKETS = tuple(4096 * 4 ** power for power in range(8))
+
+
+class Histogram:
+    """Histogram sa fiksnim granicama, po kombinaciji vrijednosti labela"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labele -> [brojači po granici (+Inf na kraju), suma, broj]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, labels: Tuple[str, ...]) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = ",".join(pairs + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{label_text} {total!r}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class _NullTimer:
+    """Prazan context manager kada je mjerenje isključeno"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Timer:
+    """Mjeri trajanje bloka i upisuje ga u histogram"""
+    __slots__ = ("_registry", "_name", "_labels", "_started")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Tuple[str, ...]):
+        self._registry = registry
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._registry.observe(self._name, time.perf_counter() - self._started, *self._labels)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    Skup histograma aplikacije
+
+    Vrijednosti iz worker procesa (PDF pool) se prenose kao snapshot() i
+    dodaju sa merge(), pa /metrics prikazuje i vrijeme generisanja PDF-a.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = Lock()
+        self._histograms: Dict[str, Histogram] = {}
+
+        self.register("http_request_duration_seconds", "Trajanje HTTP zahtjeva",
+                      ("endpoint", "method", "status"), SECONDS_BUCKETS)
+        self.register("request_stage_duration_seconds", "Trajanje faza obrade zahtjeva",
+                      ("endpoint", "stage"), SECONDS_BUCKETS)
+        self.register("schedule_length_months", "Dužina generisanih otplatnih planova",
+                      ("payment_type", "source"), MONTHS_BUCKETS)
+        self.register("pdf_stage_duration_seconds", "Trajanje faza generisanja PDF-a (worker)",
+                      ("kind", "stage"), SECONDS_BUCKETS)
+        self.register("pdf_wait_seconds", "Čekanje na slobodan PDF worker",
+                      ("kind",), SECONDS_BUCKETS)
+        self.register("pdf_size_bytes", "Veličina generisanih PDF izvještaja",
+                      ("kind",), BYTES_BUCKETS)
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def register(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]) -> Histogram:
+        histogram = Histogram(name, help_text, labelnames, buckets)
+        self._histograms[name] = histogram
+        return histogram
+
+    def observe(self, name: str, value: float, *labels: str) -> None:
+        """Upiši vrijednost u histogram `name` (ako je mjerenje uključeno)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._histograms[name].observe(value, labels)
+
+    def timer(self, name: str, *labels: str):
+        """Context manager koji upisuje trajanje bloka u histogram `name`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def stage(self, endpoint: str, stage: str):
+        """Mjerenje faze obrade zahtjeva (validacija, izračun, serijalizacija...)"""
+        return self.timer("request_stage_duration_seconds", endpoint, stage)
+
+    def render(self) -> str:
+        """Sve metrike u Prometheus tekstualnom formatu (verzija 0.0.4)"""
+        lines = []
+        with self._lock:
+            for histogram in self._histograms.values():
+                lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, reset: bool = False) -> Dict[str, dict]:
+        """Kopija serija svih histograma (za prenos između procesa)"""
+        with self._lock:
+            snapshot = {
+                name: {labels: [list(counts), total, count] for labels, (counts, total, count) in histogram._series.items()}
+                for name, histogram in self._histograms.items()
+                if histogram._series
+            }
+            if reset:
+                for histogram in self._histograms.values():
+                    histogram._series.clear()
+        return snapshot
+
+    def merge(self, snapshot: Optional[Dict[str, dict]]) -> None:
+        """Dodaj serije iz snapshot() drugog procesa"""
+        if not snapshot:
+            return
+        with self._lock:
+            for name, series in snapshot.items():
+                histogram = self._histograms[name]
+                for labels, (counts, total, count) in series.items():
+                    current = histogram._series.get(labels)
+                    if current is None:
+                        histogram._series[labels] = [list(counts), total, count]
+                        continue
+                    current[0] = [left + right for left, right in zip(current[0], counts)]
+                    current[1] += total
+                    current[2] += count
+
+    def reset(self) -> None:
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram._series.clear()
+
+
+# Zajednički registar procesa
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware - trajanje svakog HTTP zahtjeva po ruti i statusu
+
+    Ruta se uzima iz scope["route"] (šablon putanje), pa broj serija ne
+    zavisi od sadržaja URL-a. Kada je mjerenje isključeno, zahtjev se
+    prosljeđuje bez ikakvog dodatnog posla.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            self.registry.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                endpoint, scope["method"], status[0]
+            )
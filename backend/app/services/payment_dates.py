@@ -0,0 +1,102 @@
+"""
+Kalendar datuma plaćanja
+
+Datumi se računaju vektorski (NumPy datetime64) i keširaju kao torka ISO
+stringova po (datum početka, broj mjeseci, pravilo), pa ih dijele svi
+kalkulatori, Schedule i PDF izvještaji umjesto timedelta + strftime po redu.
+
+Pravila za mjesec (month_rule):
+    days30        - početak + 30 * k dana (dosadašnje ponašanje)
+    calendar      - isti dan u mjesecu, k mjeseci nakon početka; u kraćim
+                    mjesecima posljednji dan (31.01. -> 28.02. -> 31.03.)
+    calendar_eom  - kao calendar, ali ako je početak posljednji dan mjeseca,
+                    svi datumi su posljednji dani mjeseca (30.04. -> 31.05.)
+
+Pomjeranje na radni dan (business_day; subota i nedjelja nisu radni dani):
+    none, following, modified_following, preceding
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+MONTH_RULES = ("days30", "calendar", "calendar_eom")
+
+# Nazivi pravila u API-ju -> roll argument za np.busday_offset
+BUSINESS_DAY_ROLLS = {
+    "none": None,
+    "following": "following",
+    "modified_following": "modifiedfollowing",
+    "preceding": "preceding"
+}
+
+# Broj keširanih nizova datuma (niz od 600 mjeseci zauzima ~40 KB)
+CACHE_SIZE = 256
+
+
+class DateRule(NamedTuple):
+    """Pravilo za datume plaćanja"""
+    month_rule: str = "days30"
+    business_day: str = "none"
+
+
+# Dosadašnje pravilo: svakih 30 dana, bez pomjeranja na radni dan
+DAYS30 = DateRule()
+
+
+def check_rule(rule: DateRule) -> None:
+    if rule.month_rule not in MONTH_RULES:
+        raise ValueError(f"Nepoznato pravilo za datume plaćanja: {rule.month_rule}")
+    if rule.business_day not in BUSINESS_DAY_ROLLS:
+        raise ValueError(f"Nepoznato pravilo za radni dan: {rule.business_day}")
+
+
+def due_dates(start: date, term_months: int, rule: DateRule = DAYS30) -> np.ndarray:
+    """Datumi plaćanja za mjesece 1..term_months (datetime64[D])"""
+    return due_date_matrix(np.array([np.datetime64(start, "D")]), term_months, rule)[0]
+
+
+def due_date_matrix(starts: np.ndarray, term_months: int, rule: DateRule = DAYS30) -> np.ndarray:
+    """
+    Datumi plaćanja za niz datuma početka - matrica (kredit x mjesec 1..term_months)
+
+    Isto pravilo kao due_dates, ali za sve kredite odjednom (datetime64[D]).
+    """
+    months = np.arange(1, term_months + 1)
+    starts = starts.astype("datetime64[D]")[:, None]
+
+    if rule.month_rule == "days30":
+        dates = starts + 30 * months
+    else:
+        start_months = starts.astype("datetime64[M]")
+        month_starts = (start_months + months).astype("datetime64[D]")
+        lengths = ((start_months + months + 1).astype("datetime64[D]") - month_starts).astype(np.int64)
+        days = (starts - start_months.astype("datetime64[D]")).astype(np.int64) + 1
+        if rule.month_rule == "calendar_eom":
+            days = np.where((starts + 1).astype("datetime64[M]") != start_months, 31, days)
+        dates = month_starts + (np.minimum(days, lengths) - 1)
+
+    roll = BUSINESS_DAY_ROLLS[rule.business_day]
+    if roll is not None:
+        dates = np.busday_offset(dates, 0, roll=roll)
+    return dates
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_dates(start: date, term_months: int, rule: DateRule) -> Tuple[str, ...]:
+    return tuple(np.datetime_as_string(due_dates(start, term_months, rule)).tolist())
+
+
+def payment_dates(start: date, term_months: int, rule: DateRule = DAYS30) -> Tuple[str, ...]:
+    """
+    Datumi plaćanja za mjesece 1..term_months kao ISO stringovi (YYYY-MM-DD)
+
+    Datum za mjesec k je payment_dates(...)[k - 1]. Vrijeme u start (datetime)
+    se zanemaruje, pa zahtjevi istog dana dijele isti keširani niz.
+    """
+    if isinstance(start, datetime):
+        start = start.date()
+    check_rule(rule)
+    return _cached_dates(start, term_months, DateRule(*rule))
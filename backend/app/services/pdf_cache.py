@@ -0,0 +1,148 @@
+"""
+Keš generisanih PDF izvještaja na disku
+"""
+from collections import OrderedDict
+from typing import Hashable, Optional
+import hashlib
+import os
+import shutil
+import tempfile
+from threading import Lock
+
+
+class PDFCache:
+    """
+    Keš PDF izvještaja adresiran sadržajem (SHA-256 normalizovanih ulaza)
+
+    Fajlovi se čuvaju u poddirektoriju po verziji šablona izvještaja, pa
+    promjena TEMPLATE_VERSION automatski poništava stare izvještaje
+    (direktoriji drugih verzija se brišu pri pokretanju). Ukupna veličina
+    je ograničena na max_bytes; prvi se brišu najdavnije korišteni fajlovi.
+    Metode se pozivaju iz threadpool-a, pa indeks čuva lock.
+    """
+
+    # Prefiks poddirektorija verzije; samo takvi direktoriji se brišu
+    VERSION_PREFIX = "pdf-v"
+
+    def __init__(self, directory: str, template_version: str, max_bytes: int = 256 * 1024 * 1024):
+        self.root = directory
+        self.template_version = template_version
+        self.directory = os.path.join(directory, f"{self.VERSION_PREFIX}{template_version}")
+        self.max_bytes = max_bytes
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_other_versions()
+        self._load_index()
+
+    @staticmethod
+    def make_key(*parts: Hashable) -> str:
+        """SHA-256 ključ od normalizovanih dijelova (ulaz, datum izvještaja...)"""
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Keširani PDF ili None
+
+        Fajl se čita pod lock-om, pa ga izbacivanje (evict) ili invalidate
+        ne mogu obrisati između pretrage i čitanja.
+        """
+        path = self._path(key)
+        with self._lock:
+            try:
+                if key not in self._files:
+                    raise FileNotFoundError(path)
+                with open(path, "rb") as handle:
+                    pdf = handle.read()
+            except FileNotFoundError:
+                if key in self._files:
+                    self._bytes -= self._files.pop(key)
+                self.misses += 1
+                return None
+
+            self._files.move_to_end(key)
+            os.utime(path)
+            self.hits += 1
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> str:
+        """Sačuvaj PDF (atomično) i vrati putanju do fajla"""
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(pdf)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if key in self._files:
+                self._bytes -= self._files.pop(key)
+            self._files[key] = len(pdf)
+            self._bytes += len(pdf)
+            self._evict()
+        return path
+
+    def invalidate(self) -> int:
+        """Obriši sve keširane izvještaje; vraća broj obrisanih fajlova"""
+        with self._lock:
+            count = len(self._files)
+            for key in list(self._files):
+                self._remove(key)
+        return count
+
+    def stats(self) -> dict:
+        """Brojači i zauzeće keša"""
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "template_version": self.template_version,
+            "files": len(self._files),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._files:
+            oldest = next(iter(self._files))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._files.pop(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _remove_other_versions(self) -> None:
+        current = os.path.basename(self.directory)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name != current and name.startswith(self.VERSION_PREFIX) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _load_index(self) -> None:
+        """Indeks postojećih fajlova, od najdavnije korištenog"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                os.remove(entry.path)
+            elif entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+            self._bytes += size
+        self._evict()
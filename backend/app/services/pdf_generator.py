@@ -9,40 +9,219 @@ from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from io import BytesIO
 from datetime import datetime
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Iterator, Optional
+
+from app.services.metrics import metrics
+
+
+# Verzija izgleda izvještaja - povećati pri svakoj promjeni sadržaja ili
+# rasporeda PDF-a, kako bi se poništili keširani izvještaji (pdf_cache.py)
+TEMPLATE_VERSION = "2"
+
+# Zaglavlje tabele otplatnog plana
+SCHEDULE_HEADER = ['Mj.', 'Datum', 'Rata (KM)', 'Glavnica', 'Kamata', 'Ostatak']
+
+# Broj redova po tabeli u punom otplatnom planu (otprilike jedna stranica A4)
+SCHEDULE_CHUNK_ROWS = 45
+
+# Broj ponuda po uporednoj tabeli (kolone od 1.8 inča staju u širinu A4)
+COMPARISON_COLUMNS = 3
+
+# Kriteriji rangiranja ponuda (polje sažetka -> naziv u izvještaju)
+RANK_LABELS = {
+    'total_cost': 'ukupnom trošku',
+    'monthly_payment_avg': 'prosječnoj rati',
+    'effective_annual_rate': 'EKS-u'
+}
+
+
+@lru_cache(maxsize=None)
+def get_templates() -> Dict:
+    """
+    Stilovi paragrafa i tabela, kreirani jednom po procesu
+    
+    getSampleStyleSheet() i TableStyle objekti se ne mijenjaju pri
+    generisanju, pa ih svi izvještaji mogu dijeliti.
+    """
+    styles = getSampleStyleSheet()
+    
+    # Stil za naslov
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#1f2937'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+    
+    # Osnovni podaci o kreditu
+    info_style = ParagraphStyle(
+        'InfoStyle',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=6
+    )
+    
+    summary_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#fef3c7'))
+    ])
+    
+    schedule_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3f4f6')])
+    ])
+    
+    comparison_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#e5e7eb')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')])
+    ])
+    
+    return {
+        'styles': styles,
+        'title': title_style,
+        'info': info_style,
+        'summary_table': summary_table,
+        'schedule_table': schedule_table,
+        'comparison_table': comparison_table,
+        'schedule_col_widths': [0.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch],
+        'summary_col_widths': [3.5*inch, 2*inch]
+    }
+
+
+def format_schedule_row(item: Dict) -> List[str]:
+    """Red otplatnog plana formatiran za tabelu"""
+    return [
+        str(item['month']),
+        item['payment_date'],
+        f"{item['monthly_payment']:,.2f}",
+        f"{item['principal']:,.2f}",
+        f"{item['interest']:,.2f}",
+        f"{item['remaining_balance']:,.2f}"
+    ]
 
 
 class PDFGenerator:
     """Klasa za generisanje PDF izvještaja o kreditu"""
     
+    @staticmethod
+    def schedule_tables(schedule: List[Dict]) -> Iterator[Table]:
+        """
+        Puni otplatni plan kao niz manjih tabela
+        
+        Jedna velika tabela se sporo raspoređuje po stranicama; tabele od
+        SCHEDULE_CHUNK_ROWS redova (sa ponovljenim zaglavljem) drže vrijeme
+        i memoriju linearnim u odnosu na rok otplate.
+        """
+        templates = get_templates()
+        for offset in range(0, len(schedule), SCHEDULE_CHUNK_ROWS):
+            chunk = schedule[offset:offset + SCHEDULE_CHUNK_ROWS]
+            table = Table(
+                [SCHEDULE_HEADER] + [format_schedule_row(item) for item in chunk],
+                colWidths=templates['schedule_col_widths'],
+                repeatRows=1
+            )
+            table.setStyle(templates['schedule_table'])
+            yield table
+    
     @staticmethod
     def generate_credit_report(
         credit_data: Dict,
         schedule: List[Dict],
-        summary: Dict
+        summary: Dict,
+        full_schedule: bool = False
     ) -> BytesIO:
         """
         Generiše PDF izvještaj sa otplatnim planom
+        
+        Dugački planovi se skraćuju na prvih 12 i posljednjih 6 redova,
+        osim ako je full_schedule=True.
         """
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, 
                                 rightMargin=30, leftMargin=30,
                                 topMargin=30, bottomMargin=18)
         
-        # Elementi dokumenta
+        with metrics.timer("pdf_stage_duration_seconds", "credit", "elements"):
+            elements = PDFGenerator.credit_report_elements(credit_data, schedule, summary, full_schedule)
+        
+        # Generiši PDF
+        with metrics.timer("pdf_stage_duration_seconds", "credit", "build"):
+            doc.build(elements)
+        buffer.seek(0)
+        return buffer
+    
+    @staticmethod
+    def generate_merged_report(
+        reports: List[tuple],
+        output_path: str,
+        full_schedule: bool = False
+    ) -> None:
+        """
+        Generiše jedan PDF sa izvještajima za više kredita
+        
+        reports je lista (credit_data, schedule, summary); svaki izvještaj
+        počinje na novoj stranici. Dokument se upisuje u output_path.
+        """
+        doc = SimpleDocTemplate(output_path, pagesize=A4,
+                                rightMargin=30, leftMargin=30,
+                                topMargin=30, bottomMargin=18)
+        
         elements = []
-        styles = getSampleStyleSheet()
+        with metrics.timer("pdf_stage_duration_seconds", "merged", "elements"):
+            for index, (credit_data, schedule, summary) in enumerate(reports):
+                if index:
+                    elements.append(PageBreak())
+                elements.extend(PDFGenerator.credit_report_elements(credit_data, schedule, summary, full_schedule))
         
-        # Stil za naslov
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1f2937'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
+        with metrics.timer("pdf_stage_duration_seconds", "merged", "build"):
+            doc.build(elements)
+    
+    @staticmethod
+    def credit_report_elements(
+        credit_data: Dict,
+        schedule: List[Dict],
+        summary: Dict,
+        full_schedule: bool = False
+    ) -> List:
+        """
+        Elementi (flowables) izvještaja o jednom kreditu
+        """
+        # Elementi dokumenta
+        elements = []
+        templates = get_templates()
+        styles = templates['styles']
+        title_style = templates['title']
+        info_style = templates['info']
         
         # Naslov
         title = Paragraph("Izvještaj o Kreditu", title_style)
@@ -50,18 +229,15 @@ class PDFGenerator:
         elements.append(Spacer(1, 12))
         
         # Osnovni podaci o kreditu
-        info_style = ParagraphStyle(
-            'InfoStyle',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=6
-        )
-        
         elements.append(Paragraph(f"<b>Datum izvještaja:</b> {datetime.now().strftime('%d.%m.%Y')}", info_style))
         elements.append(Paragraph(f"<b>Iznos kredita:</b> {credit_data.get('amount', 0):,.2f} KM", info_style))
         elements.append(Paragraph(f"<b>Kamatna stopa:</b> {credit_data.get('annual_interest_rate', 0):.2f}%", info_style))
         elements.append(Paragraph(f"<b>Rok otplate:</b> {credit_data.get('term_months', 0)} mjeseci", info_style))
         elements.append(Paragraph(f"<b>Tip otplate:</b> {summary.get('payment_type', 'N/A')}", info_style))
+        if credit_data.get('upfront_fee'):
+            elements.append(Paragraph(f"<b>Jednokratna naknada:</b> {credit_data['upfront_fee']:,.2f} KM", info_style))
+        if credit_data.get('monthly_fee'):
+            elements.append(Paragraph(f"<b>Mjesečna naknada:</b> {credit_data['monthly_fee']:,.2f} KM", info_style))
         elements.append(Spacer(1, 20))
         
         # Sažetak
@@ -75,21 +251,11 @@ class PDFGenerator:
             ['Ukupni trošak', f"{summary['total_cost']:,.2f}"],
             ['Prosječna mjesečna rata', f"{summary['monthly_payment_avg']:,.2f}"]
         ]
+        if summary.get('effective_annual_rate') is not None:
+            summary_data.append(['Efektivna kamatna stopa (EKS)', f"{summary['effective_annual_rate']:.2f}%"])
         
-        summary_table = Table(summary_data, colWidths=[3.5*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#fef3c7'))
-        ]))
+        summary_table = Table(summary_data, colWidths=templates['summary_col_widths'])
+        summary_table.setStyle(templates['summary_table'])
         
         elements.append(summary_table)
         elements.append(Spacer(1, 30))
@@ -98,72 +264,52 @@ class PDFGenerator:
         elements.append(Paragraph("<b>OTPLATNI PLAN</b>", styles['Heading2']))
         elements.append(Spacer(1, 12))
         
-        # Tabela sa otplatnim planom (prikaži prvih 12 i posljednjih 6 redova ako je dugačak)
-        schedule_data = [['Mj.', 'Datum', 'Rata (KM)', 'Glavnica', 'Kamata', 'Ostatak']]
-        
-        display_schedule = schedule
-        if len(schedule) > 24:
-            display_schedule = schedule[:12] + [
-                {
-                    'month': '...',
-                    'payment_date': '...',
-                    'monthly_payment': '...',
-                    'principal': '...',
-                    'interest': '...',
-                    'remaining_balance': '...'
-                }
-            ] + schedule[-6:]
-        
-        for item in display_schedule:
-            if item['month'] == '...':
-                schedule_data.append(['...', '...', '...', '...', '...', '...'])
-            else:
-                schedule_data.append([
-                    str(item['month']),
-                    item['payment_date'],
-                    f"{item['monthly_payment']:,.2f}",
-                    f"{item['principal']:,.2f}",
-                    f"{item['interest']:,.2f}",
-                    f"{item['remaining_balance']:,.2f}"
-                ])
-        
-        schedule_table = Table(schedule_data, colWidths=[0.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch])
-        schedule_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3f4f6')])
-        ]))
-        
-        elements.append(schedule_table)
-        
-        # Napomena ako je tabela skraćena
-        if len(schedule) > 24:
-            elements.append(Spacer(1, 10))
-            note = Paragraph(
-                f"<i>Napomena: Prikazan je skraćeni prikaz ({len(schedule)} ukupno mjeseci). "
-                "Potpun plan dostupan je u online aplikaciji.</i>",
-                styles['Italic']
-            )
-            elements.append(note)
+        if full_schedule:
+            elements.extend(PDFGenerator.schedule_tables(schedule))
+        else:
+            # Tabela sa otplatnim planom (prikaži prvih 12 i posljednjih 6 redova ako je dugačak)
+            schedule_data = [SCHEDULE_HEADER]
+            
+            display_schedule = schedule
+            if len(schedule) > 24:
+                display_schedule = list(schedule[:12]) + [None] + list(schedule[-6:])
+            
+            for item in display_schedule:
+                if item is None:
+                    schedule_data.append(['...', '...', '...', '...', '...', '...'])
+                else:
+                    schedule_data.append(format_schedule_row(item))
+            
+            schedule_table = Table(schedule_data, colWidths=templates['schedule_col_widths'])
+            schedule_table.setStyle(templates['schedule_table'])
+            
+            elements.append(schedule_table)
+            
+            # Napomena ako je tabela skraćena
+            if len(schedule) > 24:
+                elements.append(Spacer(1, 10))
+                note = Paragraph(
+                    f"<i>Napomena: Prikazan je skraćeni prikaz ({len(schedule)} ukupno mjeseci). "
+                    "Potpun plan dostupan je u online aplikaciji.</i>",
+                    styles['Italic']
+                )
+                elements.append(note)
         
-        # Generiši PDF
-        doc.build(elements)
-        buffer.seek(0)
-        return buffer
+        return elements
     
     @staticmethod
     def generate_comparison_report(
-        comparisons: List[Dict]
+        comparisons: List[Dict],
+        statistics: Optional[Dict] = None,
+        rank_by: str = 'total_cost',
+        total_count: Optional[int] = None
     ) -> BytesIO:
         """
         Generiše uporedni izvještaj za više kredita
+        
+        Ponude se prikazuju u tabelama od po COMPARISON_COLUMNS kolona, sa
+        oznakom "Kredit {index + 1}" (redni broj u unosu). Uz `statistics`
+        dodaje se pregled svih total_count ponuda.
         """
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4,
@@ -171,40 +317,28 @@ class PDFGenerator:
                                 topMargin=30, bottomMargin=18)
         
         elements = []
-        styles = getSampleStyleSheet()
+        templates = get_templates()
+        styles = templates['styles']
+        info_style = templates['info']
         
         # Naslov
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1f2937'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        
+        title_style = templates['title']
         title = Paragraph("Uporedni Izvještaj Kredita", title_style)
         elements.append(title)
         elements.append(Spacer(1, 12))
         
         # Datum
-        info_style = ParagraphStyle(
-            'InfoStyle',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=6
-        )
         elements.append(Paragraph(f"<b>Datum izvještaja:</b> {datetime.now().strftime('%d.%m.%Y')}", info_style))
         elements.append(Spacer(1, 20))
         
-        # Uporedna tabela
-        comparison_data = [['', 'Kredit 1', 'Kredit 2', 'Kredit 3'][:len(comparisons)+1]]
+        # Redni broj ponude u unosu (bez 'index' - redoslijed u listi)
+        numbers = [comp.get('index', i) + 1 for i, comp in enumerate(comparisons)]
         
-        # Dodaj redove
+        # Redovi uporedne tabele
         rows = [
             ('Iznos kredita (KM)', 'amount'),
             ('Kamatna stopa (%)', 'annual_interest_rate'),
+            ('EKS (%)', 'effective_annual_rate'),
             ('Rok (mjeseci)', 'term_months'),
             ('Tip otplate', 'payment_type'),
             ('Ukupna kamata (KM)', 'total_interest'),
@@ -212,54 +346,87 @@ class PDFGenerator:
             ('Prosječna rata (KM)', 'monthly_payment_avg')
         ]
         
-        for label, key in rows:
-            row = [label]
-            for comp in comparisons:
-                if key in ['amount', 'total_interest', 'total_cost', 'monthly_payment_avg']:
-                    row.append(f"{comp['summary'].get(key, 0):,.2f}")
-                elif key == 'annual_interest_rate':
-                    row.append(f"{comp['input'].get(key, 0):.2f}")
-                elif key == 'payment_type':
-                    row.append(comp['summary'].get(key, 'N/A'))
-                else:
-                    row.append(str(comp['input'].get(key, 'N/A')))
-            comparison_data.append(row)
-        
         col_width = 1.8 * inch
-        comparison_table = Table(comparison_data, colWidths=[2*inch] + [col_width] * len(comparisons))
-        comparison_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#e5e7eb')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')])
-        ]))
+        for start in range(0, len(comparisons), COMPARISON_COLUMNS):
+            group = comparisons[start:start + COMPARISON_COLUMNS]
+            comparison_data = [[''] + [f"Kredit {number}" for number in numbers[start:start + COMPARISON_COLUMNS]]]
+            
+            for label, key in rows:
+                row = [label]
+                for comp in group:
+                    if key == 'amount':
+                        row.append(f"{comp['input']['amount']:,.2f}")
+                    elif key in ['total_interest', 'total_cost', 'monthly_payment_avg']:
+                        row.append(f"{comp['summary'].get(key, 0):,.2f}")
+                    elif key == 'annual_interest_rate':
+                        row.append(f"{comp['input'].get(key, 0):.2f}")
+                    elif key == 'effective_annual_rate':
+                        rate = comp['summary'].get(key)
+                        row.append('N/A' if rate is None else f"{rate:.2f}")
+                    elif key == 'payment_type':
+                        row.append(comp['summary'].get(key, 'N/A'))
+                    else:
+                        row.append(str(comp['input'].get(key, 'N/A')))
+                comparison_data.append(row)
+            
+            comparison_table = Table(comparison_data, colWidths=[2*inch] + [col_width] * len(group))
+            comparison_table.setStyle(templates['comparison_table'])
+            
+            elements.append(comparison_table)
+            elements.append(Spacer(1, 20))
         
-        elements.append(comparison_table)
-        elements.append(Spacer(1, 30))
+        elements.append(Spacer(1, 10))
+        
+        # Statistika svih ponuda (i onih koje nisu prikazane)
+        if statistics:
+            elements.append(Paragraph("<b>STATISTIKA PONUDA</b>", styles['Heading2']))
+            elements.append(Spacer(1, 12))
+            count = total_count or len(comparisons)
+            elements.append(Paragraph(
+                f"Prikazano je {len(comparisons)} od {count} ponuda, rangirano po {RANK_LABELS[rank_by]}.",
+                info_style
+            ))
+            elements.append(Spacer(1, 12))
+            
+            statistics_data = [['', 'Min', 'Medijan', 'Prosjek', 'Max']]
+            for label, key in [
+                ('Ukupni trošak (KM)', 'total_cost'),
+                ('Ukupna kamata (KM)', 'total_interest'),
+                ('Prosječna rata (KM)', 'monthly_payment_avg'),
+                ('EKS (%)', 'effective_annual_rate')
+            ]:
+                values = statistics[key]
+                statistics_data.append([label] + [
+                    f"{values[field]:,.2f}" for field in ('min', 'median', 'mean', 'max')
+                ])
+            statistics_table = Table(statistics_data, colWidths=[2*inch] + [1.35*inch] * 4)
+            statistics_table.setStyle(templates['comparison_table'])
+            elements.append(statistics_table)
+            elements.append(Spacer(1, 30))
         
         # Preporuka
         elements.append(Paragraph("<b>PREPORUKA</b>", styles['Heading2']))
         elements.append(Spacer(1, 12))
         
-        # Pronađi najjeftiniji kredit
-        min_cost_idx = min(range(len(comparisons)), 
-                          key=lambda i: comparisons[i]['summary']['total_cost'])
+        # Pronađi najbolji kredit po kriteriju rangiranja
+        best_idx = min(range(len(comparisons)),
+                       key=lambda i: comparisons[i]['summary'][rank_by])
+        best = comparisons[best_idx]['summary']
         
-        recommendation = Paragraph(
-            f"<b>Najisplativija opcija je Kredit {min_cost_idx + 1}</b> sa ukupnim troškom "
-            f"od {comparisons[min_cost_idx]['summary']['total_cost']:,.2f} KM.",
-            info_style
-        )
+        if rank_by == 'total_cost':
+            text = (f"<b>Najisplativija opcija je Kredit {numbers[best_idx]}</b> sa ukupnim troškom "
+                    f"od {best['total_cost']:,.2f} KM.")
+        elif rank_by == 'monthly_payment_avg':
+            text = (f"<b>Najniža prosječna rata je kod opcije Kredit {numbers[best_idx]}</b>: "
+                    f"{best['monthly_payment_avg']:,.2f} KM (ukupni trošak {best['total_cost']:,.2f} KM).")
+        else:
+            text = (f"<b>Najniži EKS ima opcija Kredit {numbers[best_idx]}</b>: "
+                    f"{best['effective_annual_rate']:.2f}% (ukupni trošak {best['total_cost']:,.2f} KM).")
+        recommendation = Paragraph(text, info_style)
         elements.append(recommendation)
         
         # Generiši PDF
-        doc.build(elements)
+        with metrics.timer("pdf_stage_duration_seconds", "comparison", "build"):
+            doc.build(elements)
         buffer.seek(0)
         return buffer
@@ -0,0 +1,231 @@
+"""
+Pool procesa za generisanje PDF izvještaja
+
+ReportLab (doc.build) troši CPU, pa bi direktan poziv iz async endpointa
+blokirao event loop uvicorn workera. Izvještaji se zato generišu u
+zasebnim procesima, uz ograničen broj zahtjeva na čekanju.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
+import multiprocessing
+import time
+
+from app.services.metrics import metrics
+from app.services.pdf_generator import PDFGenerator, get_templates
+from app.services.profiling import profiling_active
+
+
+class PoolSaturatedError(Exception):
+    """Svi workeri su zauzeti i red čekanja je pun"""
+
+
+class PoolUnavailableError(Exception):
+    """Worker proces je prekinut (npr. OOM) i ni novi pool nije generisao izvještaj"""
+
+
+def _init_worker(metrics_enabled: bool) -> None:
+    """Priprema worker procesa: stilovi izvještaja i mjerenje faza"""
+    get_templates()
+    metrics.enable(metrics_enabled)
+
+
+def _render(kind: str, args: tuple) -> Tuple[bytes, float, Optional[dict]]:
+    """
+    Izvršava se u worker procesu - vraća PDF, trajanje generisanja i
+    metrike faza izmjerene u workeru (ili None)
+    """
+    started = time.perf_counter()
+    if kind == "merged":
+        # Upisuje se direktno u fajl; bajti se ne vraćaju kroz pool
+        PDFGenerator.generate_merged_report(*args)
+        pdf = b""
+    elif kind == "credit":
+        pdf = PDFGenerator.generate_credit_report(*args).getvalue()
+    else:
+        pdf = PDFGenerator.generate_comparison_report(*args).getvalue()
+    worker_metrics = metrics.snapshot(reset=True) if metrics.enabled else None
+    return pdf, time.perf_counter() - started, worker_metrics
+
+
+class PDFRenderPool:
+    """
+    Ograničen pool procesa za PDF izvještaje
+
+    max_pending je najveći broj izvještaja koji se istovremeno generišu ili
+    čekaju na slobodan worker; preko toga se odmah baca PoolSaturatedError.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._stats = {
+            "renders": 0,
+            "rejected": 0,
+            "failed": 0,
+            "restarts": 0,
+            "render_seconds_total": 0.0,
+            "render_seconds_max": 0.0,
+            "wait_seconds_total": 0.0,
+            "bytes_total": 0
+        }
+
+    async def render_credit_report(
+        self,
+        credit_data: Dict,
+        schedule: List[Dict],
+        summary: Dict,
+        full_schedule: bool = False
+    ) -> bytes:
+        """PDF izvještaj sa otplatnim planom (vidi PDFGenerator)"""
+        return await self._submit("credit", (credit_data, schedule, summary, full_schedule))
+
+    async def render_comparison_report(
+        self,
+        comparisons: List[Dict],
+        statistics: Optional[Dict] = None,
+        rank_by: str = "total_cost",
+        total_count: Optional[int] = None
+    ) -> bytes:
+        """Uporedni PDF izvještaj (vidi PDFGenerator)"""
+        return await self._submit("comparison", (comparisons, statistics, rank_by, total_count))
+
+    async def render_merged_report(self, reports: List[tuple], output_path: str, full_schedule: bool = False) -> None:
+        """Jedan PDF sa izvještajima za više kredita, upisan u output_path"""
+        await self._submit("merged", (reports, output_path, full_schedule))
+
+    async def render_many(
+        self,
+        jobs: Iterable[Tuple[str, tuple]],
+        window: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> AsyncIterator[Union[bytes, Exception]]:
+        """
+        PDF izvještaji za niz poslova (vrsta, argumenti), u redoslijedu ulaza
+
+        Najviše `window` izvještaja (podrazumijevano max_workers) je
+        istovremeno u obradi, pa memorija ne raste sa brojem poslova.
+        Pozivalac provjerava kapacitet (check_capacity) prije slanja
+        odgovora; pojedinačni poslovi se ne odbijaju. Uz return_exceptions
+        (kao asyncio.gather) greška posla se vraća umjesto izvještaja, a
+        ostali poslovi se nastavljaju.
+        """
+        window = window or self.max_workers
+        in_flight = deque()
+
+        async def result(task: asyncio.Future) -> Union[bytes, Exception]:
+            try:
+                return await task
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                return error
+
+        try:
+            for kind, args in jobs:
+                in_flight.append(asyncio.ensure_future(self._submit(kind, args, check_capacity=False)))
+                if len(in_flight) >= window:
+                    yield await result(in_flight.popleft())
+            while in_flight:
+                yield await result(in_flight.popleft())
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    def check_capacity(self) -> None:
+        """Baca PoolSaturatedError ako je red čekanja pun"""
+        if self._pending >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise PoolSaturatedError("Server trenutno generiše previše PDF izvještaja, pokušajte ponovo")
+
+    async def _submit(self, kind: str, args: tuple, check_capacity: bool = True) -> bytes:
+        # Provjera i povećanje brojača se dešavaju bez await-a između,
+        # pa su atomični unutar event loop-a
+        if check_capacity:
+            self.check_capacity()
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            if profiling_active.get():
+                # Profilisani zahtjev: generisanje u ovom procesu, da bi
+                # cProfile/tracemalloc vidjeli PDFGenerator (blokira event loop)
+                pdf, render_seconds, worker_metrics = _render(kind, args)
+            else:
+                pdf, render_seconds, worker_metrics = await self._run_in_pool(kind, args)
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        stats = self._stats
+        stats["renders"] += 1
+        stats["render_seconds_total"] += render_seconds
+        stats["render_seconds_max"] = max(stats["render_seconds_max"], render_seconds)
+        stats["wait_seconds_total"] += time.perf_counter() - started - render_seconds
+        stats["bytes_total"] += len(pdf)
+        
+        if metrics.enabled:
+            metrics.merge(worker_metrics)
+            metrics.observe("pdf_stage_duration_seconds", render_seconds, kind, "total")
+            metrics.observe("pdf_wait_seconds", time.perf_counter() - started - render_seconds, kind)
+            if pdf:
+                metrics.observe("pdf_size_bytes", len(pdf), kind)
+        return pdf
+
+    async def _run_in_pool(self, kind: str, args: tuple) -> Tuple[bytes, float, Optional[dict]]:
+        """
+        Izvršava posao u poolu; ako je worker prekinut (BrokenProcessPool),
+        pool se zamjenjuje novim i posao se ponavlja jednom
+        """
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, _render, kind, args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+        raise PoolUnavailableError("Generisanje PDF izvještaja je prekinuto, pokušajte ponovo")
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Ugasi pokvaren pool; sljedeći posao pravi novi (samo ako ga drugi zahtjev već nije zamijenio)"""
+        executor.shutdown(wait=False, cancel_futures=True)
+        if self._executor is executor:
+            self._executor = None
+            self._stats["restarts"] += 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn - ne kopira niti (threads) uvicorn procesa u workere;
+            # stilovi se pripremaju pri pokretanju workera, ne pri prvom PDF-u
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(metrics.enabled,)
+            )
+        return self._executor
+
+    def stats(self) -> dict:
+        """Brojači i prosječna trajanja generisanja"""
+        stats = dict(self._stats)
+        renders = stats["renders"]
+        stats.update({
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "render_seconds_avg": stats["render_seconds_total"] / renders if renders else 0.0,
+            "wait_seconds_avg": stats["wait_seconds_total"] / renders if renders else 0.0
+        })
+        return stats
+
+    def shutdown(self) -> None:
+        """Zaustavi worker procese"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,92 @@
+"""
+Projekcija novčanih tokova portfolija po kalendarskim mjesecima
+
+Krediti se obrađuju u blokovima (matrica kredit x mjesec iz
+batch_columns), a glavnica, kamata i promjena duga se odmah sabiraju u
+nizove indeksirane kalendarskim mjesecom (np.bincount). Planovi pojedinih
+kredita se ne prave, pa memorija osim bloka zavisi samo od broja mjeseci.
+
+Vrijednosti redova se zaokružuju na cent prije sabiranja, pa su zbirovi
+isti kao zbir otplatnih planova iz /calculate. Preostali dug na kraju
+mjeseca je zbir isplaćenih iznosa umanjen za otplaćenu glavnicu
+(kumulativni zbir promjena duga).
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from app.services.amortization import batch_columns, round_cents
+from app.services.payment_dates import DateRule, due_date_matrix
+
+
+# Broj kredita u jednom bloku (memorija bloka ~ kredit x rok)
+CHUNK_SIZE = 512
+
+
+def project(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    start_dates: np.ndarray,
+    date_rules: Sequence[DateRule]
+) -> Tuple[np.datetime64, dict]:
+    """
+    Mjesečni zbirovi (prvi mjesec, {kolona: niz}) za cijeli portfolio
+
+    start_dates su datumi isplate (datetime64[D]); prvi mjesec projekcije
+    je najraniji mjesec isplate. Krediti se obrađuju sortirani po roku, pa
+    blokovi imaju malo praznih mjeseci.
+    """
+    start_months = start_dates.astype("datetime64[M]")
+    first_month = start_months.min()
+    # Gornja granica: 30 dana po rati prelazi kalendarski mjesec najviše
+    # za jedan mjesec na svakih 14, plus pomjeranje na radni dan
+    horizon = int((start_months - first_month).astype(np.int64).max() + terms.max() + terms.max() // 14 + 2) + 1
+
+    principal = np.zeros(horizon)
+    interest = np.zeros(horizon)
+    payment = np.zeros(horizon)
+    balance_change = np.bincount(
+        (start_months - first_month).astype(np.int64), weights=round_cents(amounts), minlength=horizon
+    )
+
+    # Pravila za datume kao cijeli brojevi (obično je svima isto pravilo)
+    rule_ids = {}
+    rules = np.array([rule_ids.setdefault(DateRule(*rule), len(rule_ids)) for rule in date_rules])
+    unique_rules = list(rule_ids)
+
+    order = np.argsort(terms, kind="stable")
+    for offset in range(0, len(order), CHUNK_SIZE):
+        chunk = order[offset:offset + CHUNK_SIZE]
+        columns = batch_columns(amounts[chunk], annual_rates[chunk], terms[chunk], is_annuity[chunk])
+        months = np.zeros(columns.month.shape, dtype=np.int64)
+        for rule_id in np.unique(rules[chunk]).tolist():
+            rows = np.flatnonzero(rules[chunk] == rule_id)
+            dates = due_date_matrix(start_dates[chunk[rows]], columns.month.shape[1], unique_rules[rule_id])
+            months[rows] = (dates.astype("datetime64[M]") - first_month).astype(np.int64)
+
+        active = columns.month <= terms[chunk][:, None]
+        indices = months[active]
+        remaining = round_cents(np.maximum(columns.remaining_balance, 0))
+        opening = np.concatenate([round_cents(amounts[chunk])[:, None], remaining[:, :-1]], axis=1)
+
+        principal += np.bincount(indices, weights=round_cents(columns.principal)[active], minlength=horizon)
+        interest += np.bincount(indices, weights=round_cents(columns.interest)[active], minlength=horizon)
+        payment += np.bincount(indices, weights=round_cents(columns.monthly_payment)[active], minlength=horizon)
+        balance_change += np.bincount(indices, weights=(remaining - opening)[active], minlength=horizon)
+
+    outstanding = np.cumsum(balance_change)
+    last = int(max(np.flatnonzero(payment).max(initial=0), np.flatnonzero(balance_change).max(initial=0))) + 1
+    flows = {
+        "principal": principal[:last],
+        "interest": interest[:last],
+        "payment": payment[:last],
+        "outstanding_balance": np.maximum(outstanding[:last], 0)
+    }
+    return first_month, {key: round_cents(values) for key, values in flows.items()}
+
+
+def month_labels(first_month: np.datetime64, count: int) -> List[str]:
+    """Oznake kalendarskih mjeseci (YYYY-MM) od first_month"""
+    return np.datetime_as_string(first_month + np.arange(count)).tolist()
@@ -0,0 +1,366 @@
+"""
+Profilisanje živog procesa na zahtjev (cProfile, uzorkovanje, tracemalloc)
+
+Administrator uključi profilisanje za sljedećih N zahtjeva prema jednom
+endpointu; izvještaji se čuvaju u memoriji i preuzimaju kao fajlovi, bez
+restarta procesa. Dok ništa nije uključeno, middleware samo prosljeđuje
+zahtjeve.
+"""
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from fnmatch import fnmatch
+from io import StringIO
+from functools import wraps
+from threading import Event, Lock, Thread, get_ident
+from typing import Optional
+import asyncio
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from fastapi.routing import APIRoute
+
+
+# Fajlovi čije alokacije tracemalloc izvještaj izdvaja (mjesta poziva kalkulatora i PDF-a)
+TRACEMALLOC_SOURCES = ("*/app/services/*", "*/app/main.py")
+
+# Middleware okviri su na svakom steku, pa se ne računaju kao mjesto poziva
+TRACEMALLOC_EXCLUDED = ("*/app/services/profiling.py", "*/app/services/metrics.py")
+
+# Zahtjev koji se upravo profiliše (PDF pool tada generiše izvještaj u istom procesu)
+profiling_active: ContextVar[bool] = ContextVar("profiling_active", default=False)
+
+# Profiler uzorkovanjem zahtjeva koji se upravo profiliše (kontekst se
+# kopira i u nit threadpool-a u kojoj se izvršava sinhroni endpoint)
+active_sampler: ContextVar[Optional["SamplingProfiler"]] = ContextVar("active_sampler", default=None)
+
+
+class SamplingProfiler:
+    """
+    Profiler uzorkovanjem: zasebna nit svakih `interval` sekundi bilježi
+    stekove niti koje obrađuju zahtjev - niti event loop-a i, za sinhrone
+    endpointe, niti threadpool-a dok izvršava endpoint (vidi ProfiledRoute).
+    Rezultat je u "collapsed stack" formatu (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def add_thread(self, thread_id: int) -> None:
+        self.thread_ids.add(thread_id)
+
+    def remove_thread(self, thread_id: int) -> None:
+        self.thread_ids.discard(thread_id)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def report(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class Profiler:
+    """
+    Stanje profilisanja procesa i sačuvani izvještaji
+
+    Istovremeno se profiliše najviše jedan zahtjev (cProfile ne dozvoljava
+    dva aktivna profilera); ostali zahtjevi prema istom endpointu prolaze
+    neprofilisani i ne troše preostali broj.
+    """
+
+    MODES = ("cprofile", "sample")
+
+    def __init__(self, max_reports: int = 20):
+        self.max_reports = max_reports
+        self.endpoint: Optional[str] = None
+        self.mode = "cprofile"
+        self.interval = 0.005
+        self.remaining = 0
+        self._busy = False
+        self._lock = Lock()
+        self._reports: "OrderedDict[str, dict]" = OrderedDict()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def arm(self, endpoint: str, requests: int, mode: str = "cprofile", interval_ms: float = 5) -> dict:
+        """Profiliši sljedećih `requests` zahtjeva prema `endpoint`"""
+        if mode not in self.MODES:
+            raise ValueError(f"Nepoznat način profilisanja: {mode}")
+        with self._lock:
+            self.endpoint = endpoint
+            self.mode = mode
+            self.interval = interval_ms / 1000
+            self.remaining = requests
+        return self.status()
+
+    def disarm(self) -> dict:
+        with self._lock:
+            self.endpoint = None
+            self.remaining = 0
+        return self.status()
+
+    def claim(self, path: str) -> Optional[str]:
+        """Način profilisanja ako zahtjev prema `path` treba profilisati, inače None"""
+        if self.remaining <= 0 or path != self.endpoint:
+            return None
+        with self._lock:
+            if self.remaining <= 0 or path != self.endpoint or self._busy:
+                return None
+            self.remaining -= 1
+            self._busy = True
+            return self.mode
+
+    def release(self) -> None:
+        with self._lock:
+            self._busy = False
+            if self.remaining <= 0:
+                self.endpoint = None
+
+    def add_report(self, kind: str, content: bytes, text: str, filename: str, **details) -> dict:
+        """Sačuvaj izvještaj; najstariji se brišu preko max_reports"""
+        report_id = uuid.uuid4().hex[:12]
+        report = {
+            "id": report_id,
+            "kind": kind,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "filename": filename,
+            "size_bytes": len(content),
+            **details,
+            "content": content,
+            "text": text
+        }
+        with self._lock:
+            self._reports[report_id] = report
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+        return self.describe(report)
+
+    def get_report(self, report_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._reports.get(report_id)
+
+    @staticmethod
+    def describe(report: dict) -> dict:
+        """Opis izvještaja bez sadržaja"""
+        return {key: value for key, value in report.items() if key not in ("content", "text")}
+
+    def status(self) -> dict:
+        with self._lock:
+            reports = [self.describe(report) for report in self._reports.values()]
+            return {
+                "endpoint": self.endpoint,
+                "mode": self.mode,
+                "interval_ms": self.interval * 1000,
+                "remaining": self.remaining,
+                "tracemalloc": tracemalloc.is_tracing(),
+                "reports": reports
+            }
+
+    # --- tracemalloc ---
+
+    def start_tracemalloc(self, frames: int = 25) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._snapshot = None
+        return self.status()
+
+    def stop_tracemalloc(self) -> dict:
+        tracemalloc.stop()
+        self._snapshot = None
+        return self.status()
+
+    def tracemalloc_snapshot(self, limit: int = 30) -> dict:
+        """
+        Snimak alokacija filtriran na kod aplikacije
+
+        Tekstualni izvještaj sadrži najveća mjesta alokacije (sa stekom
+        poziva) i razliku u odnosu na prethodni snimak; sirovi snimak se
+        učitava sa tracemalloc.Snapshot.load().
+        """
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc nije pokrenut")
+
+        # Alokacije kojima je bilo koji okvir steka u kodu aplikacije
+        # (i one unutar NumPy/ReportLab pozvanih iz kalkulatora ili PDF-a)
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, pattern, all_frames=True) for pattern in TRACEMALLOC_SOURCES]
+            + [tracemalloc.Filter(False, pattern) for pattern in TRACEMALLOC_EXCLUDED]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [f"Praćena memorija: trenutno {current} B, vrh {peak} B", "", "Mjesta poziva u aplikaciji:"]
+        for site, (size, count) in _call_sites(snapshot)[:limit]:
+            lines.append(f"{size:>12} B  {count:>8} blokova  {site}")
+
+        lines += ["", "Najveći stekovi alokacije:"]
+        for statistic in snapshot.statistics("traceback")[:limit]:
+            lines.append(f"{statistic.size} B u {statistic.count} blokova")
+            lines.extend(f"    {line}" for line in statistic.traceback.format(most_recent_first=True))
+        if self._snapshot is not None:
+            lines += ["", "Razlika u odnosu na prethodni snimak:"]
+            lines.extend(str(difference) for difference in snapshot.compare_to(self._snapshot, "lineno")[:limit])
+        self._snapshot = snapshot
+
+        fd, path = tempfile.mkstemp(suffix=".snap")
+        os.close(fd)
+        try:
+            snapshot.dump(path)
+            with open(path, "rb") as handle:
+                content = handle.read()
+        finally:
+            os.remove(path)
+
+        return self.add_report(
+            "tracemalloc", content, "\n".join(lines) + "\n", "tracemalloc.snap",
+            traced_bytes=current, peak_bytes=peak
+        )
+
+
+def sampled(call):
+    """
+    Sinhroni poziv koji se, dok traje, uzorkuje u niti u kojoj se izvršava
+
+    FastAPI izvršava sinhrone endpointe u threadpool-u, pa nit event
+    loop-a za to vrijeme samo čeka; omotač prijavljuje nit threadpool-a
+    profileru aktivnog zahtjeva (ako ga ima).
+    """
+    @wraps(call)
+    def wrapper(*args, **kwargs):
+        sampler = active_sampler.get()
+        if sampler is None:
+            return call(*args, **kwargs)
+        thread_id = get_ident()
+        sampler.add_thread(thread_id)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            sampler.remove_thread(thread_id)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute čiji se sinhroni endpointi uzorkuju u niti threadpool-a"""
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if call is not None and not asyncio.iscoroutinefunction(call):
+            self.dependant.call = sampled(call)
+        return super().get_route_handler()
+
+
+def _is_call_site(filename: str) -> bool:
+    return (
+        any(fnmatch(filename, pattern) for pattern in TRACEMALLOC_SOURCES)
+        and not any(fnmatch(filename, pattern) for pattern in TRACEMALLOC_EXCLUDED)
+    )
+
+
+def _call_sites(snapshot: tracemalloc.Snapshot) -> list:
+    """
+    Zauzeće po najbližem mjestu poziva u kodu aplikacije, od najvećeg:
+    [("fajl:linija", (bajti, blokovi)), ...]
+    """
+    sites = {}
+    for trace in snapshot.traces:
+        # Okviri su poredani od najstarijeg; traži se najnoviji okvir aplikacije
+        for frame in reversed(trace.traceback):
+            if _is_call_site(frame.filename):
+                site = f"{frame.filename}:{frame.lineno}"
+                size, count = sites.get(site, (0, 0))
+                sites[site] = (size + trace.size, count + 1)
+                break
+    return sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+
+
+def _cprofile_report(profile: cProfile.Profile, limit: int = 60) -> tuple:
+    """(.prof sadržaj za pstats/snakeviz, tekstualni sažetak)"""
+    text = StringIO()
+    stats = pstats.Stats(profile, stream=text)
+    # Stats preuzima (i prazni) profile.stats, pa se .prof pravi iz stats.stats
+    content = marshal.dumps(stats.stats)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return content, text.getvalue()
+
+
+# Zajednički profiler procesa
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware - profiliše zahtjeve koje je administrator najavio
+
+    cProfile mjeri sve što se izvršava na niti event loop-a dok zahtjev
+    traje, pa mogu ući i korutine istovremenih zahtjeva; sinhroni endpointi
+    (threadpool) su vidljivi samo u načinu "sample".
+    """
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.profiler.remaining <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        mode = self.profiler.claim(scope["path"])
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = profiling_active.set(True)
+        started = time.perf_counter()
+        if mode == "cprofile":
+            sampler = None
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            profile = None
+            sampler = SamplingProfiler(get_ident(), self.profiler.interval)
+            sampler_token = active_sampler.set(sampler)
+            sampler.start()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            profiling_active.reset(token)
+            details = {"endpoint": scope["path"], "duration_ms": duration_ms}
+            if profile is not None:
+                profile.disable()
+                content, text = _cprofile_report(profile)
+                self.profiler.add_report("cprofile", content, text, "profile.prof", **details)
+            else:
+                active_sampler.reset(sampler_token)
+                sampler.stop()
+                text = sampler.report()
+                self.profiler.add_report("sample", text.encode("utf-8"), text, "profile.collapsed", **details)
+            self.profiler.release()
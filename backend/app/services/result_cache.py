@@ -0,0 +1,154 @@
+"""
+LRU keš rezultata izračuna kredita
+"""
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional, Tuple
+import sys
+import time
+
+
+def make_key(
+    amount: float,
+    annual_rate: float,
+    term_months: int,
+    payment_type: str,
+    start_date: datetime,
+    rounding: Optional[str] = None,
+    date_rule: Tuple[str, str] = ("days30", "none")
+) -> Tuple:
+    """
+    Normalizovan ključ keša za parametre kredita
+
+    Plan zavisi samo od datuma (ne i vremena) početka, pa se ključ pravi od
+    datuma. Zahtjevi bez start_date moraju prije poziva razriješiti datum
+    (datetime.now()) kako bi ključ i izračun koristili isti dan.
+    """
+    return (
+        float(amount),
+        float(annual_rate),
+        int(term_months),
+        payment_type,
+        start_date.date().isoformat(),
+        rounding,
+        tuple(date_rule)
+    )
+
+
+def estimate_size(result: Tuple[Any, dict]) -> int:
+    """Procjena zauzeća memorije rezultata (plan kao lista ili Schedule, sažetak) u bajtima"""
+    schedule, summary = result
+    size = sys.getsizeof(schedule) + sys.getsizeof(summary)
+    if hasattr(schedule, "nbytes"):
+        # Schedule - kolone u NumPy nizovima
+        size += schedule.nbytes
+    elif schedule:
+        row = schedule[0]
+        row_size = sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        size += row_size * len(schedule)
+    return size
+
+
+class ResultCache:
+    """
+    Ograničeni LRU keš sa TTL-om
+
+    Ograničen je brojem stavki i ukupnom procijenjenom veličinom u bajtima.
+    Sačuvane vrijednosti se dijele između zahtjeva i ne smiju se mijenjati.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Vrati vrijednost iz keša ili None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, _, expires_at = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """Sačuvaj vrijednost; najstarije stavke se izbacuju po potrebi"""
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, self._clock() + self.ttl_seconds)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        sizeof: Callable[[Any], int] = estimate_size
+    ) -> Any:
+        """Vrati keširanu vrijednost ili je izračunaj i sačuvaj"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, sizeof(value))
+        return value
+
+    def clear(self) -> None:
+        """Isprazni keš (brojači ostaju)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Brojači i trenutno zauzeće keša"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
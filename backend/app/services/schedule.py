@@ -0,0 +1,150 @@
+"""
+Kompaktan otplatni plan sa kolonama u NumPy nizovima
+"""
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Iterator, List, Union
+
+import numpy as np
+import orjson
+
+from app.services.amortization import ScheduleColumns, round_cents
+from app.services.payment_dates import DAYS30, DateRule, payment_dates
+
+
+# Kolone reda otplatnog plana, u redoslijedu iz CreditCalculator-a
+FIELDS = ("month", "payment_date", "monthly_payment", "principal", "interest", "remaining_balance")
+
+
+class ScheduleRow(Mapping):
+    """
+    Pogled na jedan red plana (bez kopiranja podataka)
+
+    Ponaša se kao dict iz CreditCalculator-a: row["principal"], dict(row),
+    PaymentScheduleItem(**row).
+    """
+    __slots__ = ("_schedule", "_index")
+
+    def __init__(self, schedule: "Schedule", index: int):
+        self._schedule = schedule
+        self._index = index
+
+    def __getitem__(self, key: str):
+        if key == "payment_date":
+            return self._schedule.payment_date(self._index)
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self._schedule, key)[self._index].item()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"ScheduleRow({dict(self)!r})"
+
+
+class Schedule:
+    """
+    Otplatni plan u kolonskom obliku
+
+    Iznosi su zaokruženi na 2 decimale (kao u redovima CreditCalculator-a),
+    a datumi se čuvaju kao redni broj mjeseca i pravilo (date_rule), a
+    čitaju iz keširanog kalendara (payment_dates.py). Indeksiranje vraća
+    ScheduleRow, a isjecanje (slice) novi Schedule koji dijeli iste nizove.
+    """
+    __slots__ = ("start_date", "month", "monthly_payment", "principal", "interest", "remaining_balance", "date_rule")
+
+    def __init__(
+        self,
+        start_date: date,
+        month: np.ndarray,
+        monthly_payment: np.ndarray,
+        principal: np.ndarray,
+        interest: np.ndarray,
+        remaining_balance: np.ndarray,
+        date_rule: DateRule = DAYS30
+    ):
+        self.start_date = start_date.date() if isinstance(start_date, datetime) else start_date
+        self.month = month
+        self.monthly_payment = monthly_payment
+        self.principal = principal
+        self.interest = interest
+        self.remaining_balance = remaining_balance
+        self.date_rule = date_rule
+
+    @classmethod
+    def from_columns(cls, columns: ScheduleColumns, start_date: date, date_rule: DateRule = DAYS30) -> "Schedule":
+        """Plan iz nezaokruženih kolona (amortization.py)"""
+        return cls(
+            start_date,
+            columns.month.astype(np.int32),
+            round_cents(columns.monthly_payment),
+            round_cents(columns.principal),
+            round_cents(columns.interest),
+            round_cents(np.maximum(columns.remaining_balance, 0)),
+            date_rule
+        )
+
+    def __len__(self) -> int:
+        return len(self.month)
+
+    @property
+    def nbytes(self) -> int:
+        """Zauzeće memorije kolona (bajti)"""
+        return sum(getattr(self, name).nbytes for name in FIELDS if name != "payment_date")
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ScheduleRow, "Schedule"]:
+        if isinstance(index, slice):
+            return Schedule(
+                self.start_date,
+                self.month[index],
+                self.monthly_payment[index],
+                self.principal[index],
+                self.interest[index],
+                self.remaining_balance[index],
+                self.date_rule
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Indeks izvan otplatnog plana")
+        return ScheduleRow(self, index)
+
+    def __iter__(self) -> Iterator[ScheduleRow]:
+        for index in range(len(self)):
+            yield ScheduleRow(self, index)
+
+    def _calendar(self) -> tuple:
+        """Keširani datumi za mjesece 1..posljednji mjesec plana"""
+        return payment_dates(self.start_date, int(self.month[-1]) if len(self) else 0, self.date_rule)
+
+    def payment_date(self, index: int) -> str:
+        """Datum plaćanja za red `index` (YYYY-MM-DD)"""
+        return self._calendar()[int(self.month[index]) - 1]
+
+    def payment_dates(self) -> List[str]:
+        """Datumi plaćanja za sve redove odjednom"""
+        calendar = self._calendar()
+        return [calendar[month - 1] for month in self.month.tolist()]
+
+    def columns(self) -> dict:
+        """Kolone kao liste Python vrijednosti"""
+        return {
+            "month": self.month.tolist(),
+            "payment_date": self.payment_dates(),
+            "monthly_payment": self.monthly_payment.tolist(),
+            "principal": self.principal.tolist(),
+            "interest": self.interest.tolist(),
+            "remaining_balance": self.remaining_balance.tolist()
+        }
+
+    def to_rows(self) -> List[dict]:
+        """Plan kao lista dict-ova (format CreditCalculator.calculate_*)"""
+        return [dict(zip(FIELDS, values)) for values in zip(*self.columns().values())]
+
+    def to_json(self) -> bytes:
+        """JSON niz redova (orjson), isti kao za listu iz to_rows()"""
+        return orjson.dumps(self.to_rows())
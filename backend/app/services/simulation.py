@@ -0,0 +1,262 @@
+"""
+Monte Carlo simulacija kamatnih stopa nad portfolijem kredita
+
+Indeks (npr. EURIBOR) prati Vasicek model
+
+    dr = kappa * (theta - r) dt + sigma dW
+
+koji ima tačnu diskretizaciju za proizvoljan korak, pa se putanje
+generišu samo u mjesecima promjene stope (svakih reset_months), a ne za
+svaki mjesec. Stopa kredita u segmentu je izvorna stopa + (indeks - r0),
+ograničena na [0, 100]; prvi segment je uvijek izvorna stopa.
+
+Svaki kredit se računa za sve putanje odjednom (matrica kredit x putanja),
+segment po segment u zatvorenom obliku kao u rate_change_grid. Putanje se
+obrađuju u blokovima od CHUNK_PATHS (svaki blok ima svoj seed iz
+SeedSequence, pa rezultat ne zavisi od broja workera), a rezultati bloka
+se odmah dodaju u QuantileSketch - memorija ne zavisi od broja putanja.
+"""
+from concurrent.futures import Executor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+from app.services.amortization import annuity_payments, monthly_rate
+
+
+# Broj putanja u jednom bloku (jedan posao u pool-u)
+CHUNK_PATHS = 256
+
+# Broj kredita koji se računa zajedno unutar bloka (memorija ~ kredit x putanja)
+LOAN_CHUNK_SIZE = 512
+
+# Skica kvantila: relativna greška i opseg vrijednosti sa log-kantama
+RELATIVE_ACCURACY = 0.005
+MIN_VALUE = 0.01
+MAX_VALUE = 1e10
+
+
+class RateModel(NamedTuple):
+    """Parametri Vasicek modela (godišnje stope u %)"""
+    initial_rate: float = 3.0
+    long_term_rate: float = 3.0
+    mean_reversion: float = 0.2
+    volatility: float = 1.0
+
+
+def index_paths(model: RateModel, steps: int, step_months: int, paths: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Putanje indeksa (putanja x korak) u mjesecima 1, 1 + step_months, ...
+
+    Prva kolona je početna vrijednost; ostale slijede tačnu diskretizaciju
+    Vasicek modela za korak dt = step_months / 12.
+    """
+    dt = step_months / 12
+    kappa = model.mean_reversion
+    if kappa > 0:
+        decay = math.exp(-kappa * dt)
+        deviation = model.volatility * math.sqrt((1 - decay ** 2) / (2 * kappa))
+    else:
+        decay = 1.0
+        deviation = model.volatility * math.sqrt(dt)
+
+    shocks = rng.standard_normal((paths, steps - 1)) * deviation
+    values = np.empty((paths, steps))
+    values[:, 0] = model.initial_rate
+    for step in range(1, steps):
+        values[:, step] = model.long_term_rate + (values[:, step - 1] - model.long_term_rate) * decay + shocks[:, step - 1]
+    return values
+
+
+def stress_loans(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    index: np.ndarray,
+    initial_rate: float,
+    reset_months: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Kredit x putanja: ukupna kamata, najveći skok rate (%) i rate po segmentu
+
+    index su vrijednosti indeksa u mjesecima promjene (putanja x segment).
+    Anuitet se na početku segmenta preračunava za preostali dug i rok
+    (kao rate_change_grid); linearni plan zadržava glavnicu P / n. Skok
+    rate je najveća rata u odnosu na prvu (anuitet: rata segmenta,
+    linearni: prva rata segmenta). Treća vrijednost je zbir rata svih
+    kredita po segmentu (putanja x segment) za skok rate portfolija.
+    """
+    amounts = amounts[:, None]
+    terms = terms[:, None]
+    annuity = is_annuity[:, None]
+    step = amounts / terms
+    rate_shifts = index - initial_rate
+
+    balance = np.broadcast_to(amounts, (len(amounts), index.shape[0])).astype(float)
+    total_interest = np.zeros_like(balance)
+    portfolio_payments = np.empty(index.shape)
+    first_payment = max_payment = None
+
+    for segment in range(index.shape[1]):
+        start = 1 + segment * reset_months
+        remaining = terms - start + 1
+        length = np.clip(np.minimum(reset_months, remaining), 0, None)
+        rates = monthly_rate(np.clip(annual_rates[:, None] + rate_shifts[None, :, segment], 0, 100))
+
+        payments = annuity_payments(balance, rates, np.maximum(remaining, 1))
+        growth = np.power(1 + rates, length)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            annuity_balance = np.where(rates == 0, balance - payments * length, balance * growth - payments * (growth - 1) / rates)
+
+        total_interest += np.where(
+            annuity,
+            payments * length - (balance - annuity_balance),
+            rates * (length * balance - step * length * (length - 1) / 2)
+        )
+        payments = np.where(length > 0, np.where(annuity, payments, step + balance * rates), 0)
+        balance = np.where(annuity, annuity_balance, balance - step * length)
+
+        portfolio_payments[:, segment] = payments.sum(axis=0)
+        if first_payment is None:
+            first_payment = max_payment = payments
+        else:
+            max_payment = np.maximum(max_payment, payments)
+
+    return total_interest, (max_payment / first_payment - 1) * 100, portfolio_payments
+
+
+def stress_chunk(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    model: RateModel,
+    reset_months: int,
+    paths: int,
+    seed: np.random.SeedSequence
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Jedan blok putanja za sve kredite (izvršava se u worker procesu)
+
+    Vraća (kamata, skok rate) kao matrice (kredit + 1) x putanja; posljednji
+    red je portfolio - zbir kamata i skok ukupne mjesečne rate svih kredita.
+    """
+    steps = int(math.ceil(terms.max() / reset_months))
+    index = index_paths(model, steps, reset_months, paths, np.random.default_rng(seed))
+
+    count = len(amounts)
+    interest = np.empty((count + 1, paths))
+    shock = np.empty((count + 1, paths))
+    portfolio_payments = np.zeros(index.shape)
+    for offset in range(0, count, LOAN_CHUNK_SIZE):
+        chunk = slice(offset, min(offset + LOAN_CHUNK_SIZE, count))
+        interest[chunk], shock[chunk], payments = stress_loans(
+            amounts[chunk], annual_rates[chunk], terms[chunk], is_annuity[chunk],
+            index, model.initial_rate, reset_months
+        )
+        portfolio_payments += payments
+
+    interest[-1] = interest[:-1].sum(axis=0)
+    shock[-1] = (portfolio_payments.max(axis=1) / portfolio_payments[:, 0] - 1) * 100
+    return interest, shock
+
+
+class QuantileSketch:
+    """
+    Skica kvantila sa log-kantama (relativna greška RELATIVE_ACCURACY)
+
+    Svaki red (kredit) ima isti niz kanti: vrijednost x ide u kantu
+    ceil(log_gamma(x)), a vrijednosti ispod MIN_VALUE u kantu nula. Skice
+    se spajaju sabiranjem brojača, a memorija je red x kanta bez obzira
+    na broj dodatih vrijednosti. Minimum i maksimum se čuvaju tačno.
+    """
+
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_INDEX = math.ceil(math.log(MIN_VALUE) / LOG_GAMMA)
+    BINS = math.ceil(math.log(MAX_VALUE) / LOG_GAMMA) - MIN_INDEX + 2
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.counts = np.zeros((rows, self.BINS), dtype=np.int64)
+        self.count = 0
+        self.sums = np.zeros(rows)
+        self.minimums = np.full(rows, np.inf)
+        self.maximums = np.full(rows, -np.inf)
+
+    def add(self, values: np.ndarray) -> None:
+        """Dodaje matricu vrijednosti (red x uzorak)"""
+        with np.errstate(divide="ignore"):
+            buckets = np.ceil(np.log(np.maximum(values, MIN_VALUE)) / self.LOG_GAMMA) - self.MIN_INDEX + 1
+        buckets = np.where(values < MIN_VALUE, 0, np.clip(buckets, 1, self.BINS - 1)).astype(np.int64)
+        flat = buckets + (np.arange(self.rows) * self.BINS)[:, None]
+        self.counts += np.bincount(flat.ravel(), minlength=self.rows * self.BINS).reshape(self.rows, self.BINS)
+
+        self.count += values.shape[1]
+        self.sums += values.sum(axis=1)
+        self.minimums = np.minimum(self.minimums, values.min(axis=1))
+        self.maximums = np.maximum(self.maximums, values.max(axis=1))
+
+    def quantiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """Kvantili (red x percentil); vrijednost kante je njena sredina"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        bucket_values = np.zeros(self.BINS)
+        bucket_values[1:] = 2 * np.power(self.GAMMA, np.arange(1, self.BINS) + self.MIN_INDEX - 1) / (self.GAMMA + 1)
+
+        result = np.empty((self.rows, len(percentiles)))
+        for column, percentile in enumerate(percentiles):
+            rank = percentile / 100 * (self.count - 1)
+            buckets = np.argmax(cumulative > rank, axis=1)
+            result[:, column] = bucket_values[buckets]
+        return np.clip(result, self.minimums[:, None], self.maximums[:, None])
+
+    def means(self) -> np.ndarray:
+        return self.sums / self.count
+
+
+def simulate(
+    amounts: np.ndarray,
+    annual_rates: np.ndarray,
+    terms: np.ndarray,
+    is_annuity: np.ndarray,
+    model: RateModel,
+    reset_months: int,
+    paths: int,
+    seed: int,
+    executor: Optional[Executor] = None,
+    window: int = 4
+) -> Tuple[QuantileSketch, QuantileSketch]:
+    """
+    Skice kamate i skoka rate za sve kredite (+ portfolio) preko `paths` putanja
+
+    Blokovi putanja se šalju u executor (pool procesa), a najviše `window`
+    blokova je istovremeno u obradi; rezultati se spajaju u redoslijedu
+    slanja, pa su i zbirovi (prosjeci) ponovljivi. Bez executor-a ili za
+    jedan blok sve se računa u ovom procesu.
+    """
+    sizes = [min(CHUNK_PATHS, paths - offset) for offset in range(0, paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = (amounts, annual_rates, terms, is_annuity, model, reset_months)
+
+    interest = QuantileSketch(len(amounts) + 1)
+    shock = QuantileSketch(len(amounts) + 1)
+
+    def merge(result: Tuple[np.ndarray, np.ndarray]) -> None:
+        interest.add(result[0])
+        shock.add(result[1])
+
+    if executor is None or len(sizes) == 1:
+        for size, chunk_seed in zip(sizes, seeds):
+            merge(stress_chunk(*arguments, size, chunk_seed))
+        return interest, shock
+
+    in_flight: List = []
+    for size, chunk_seed in zip(sizes, seeds):
+        in_flight.append(executor.submit(stress_chunk, *arguments, size, chunk_seed))
+        if len(in_flight) >= window:
+            merge(in_flight.pop(0).result())
+    for future in in_flight:
+        merge(future.result())
+    return interest, shock
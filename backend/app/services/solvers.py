@@ -0,0 +1,171 @@
+"""
+Inverzni izračuni - iznos, rok ili kamatna stopa za zadanu mjesečnu ratu,
+te interna stopa prinosa novčanih tokova (osnova za EKS)
+
+Sve funkcije rade nad NumPy nizovima (jedan element po upitu). Za linearni
+model "rata" je prva, najveća rata: P / n + P * r.
+"""
+import numpy as np
+
+from app.services.amortization import annuity_payments
+
+
+# Relativna tolerancija poređenja rate sa ciljem (greška pokretnog zareza)
+PAYMENT_TOLERANCE = 1e-12
+
+# Newton za implicitnu stopu anuiteta
+RATE_MAX_ITERATIONS = 100
+RATE_TOLERANCE = 1e-15
+
+# Newton za internu stopu prinosa (zbir tokova nosi grešku reda 1e-16)
+IRR_MAX_ITERATIONS = 50
+IRR_TOLERANCE = 1e-13
+
+
+def first_payments(amounts: np.ndarray, rates: np.ndarray, terms: np.ndarray, is_annuity: np.ndarray) -> np.ndarray:
+    """Prva mjesečna rata (za anuitet i jedina)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        linear = amounts / terms + amounts * rates
+    return np.where(is_annuity, annuity_payments(amounts, rates, terms), linear)
+
+
+def max_amounts(payments: np.ndarray, rates: np.ndarray, terms: np.ndarray, is_annuity: np.ndarray) -> np.ndarray:
+    """
+    Najveći iznos kredita (na cent) čija prva rata ne prelazi `payments`
+
+    Anuitet: P = A * ((1 + r)^n - 1) / (r * (1 + r)^n), za r = 0: P = A * n
+    Linearni: P = X / (1 / n + r)
+    """
+    growth = np.power(1 + rates, terms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(rates == 0, payments * terms, payments * (growth - 1) / (rates * growth))
+    linear = payments / (1 / terms + rates)
+    amounts = np.floor(np.where(is_annuity, annuity, linear) * 100 + 1e-6) / 100
+
+    # Greška zaokruživanja formule može pomjeriti rezultat za cent - provjera kroz ratu
+    limit = payments * (1 + PAYMENT_TOLERANCE)
+    over = first_payments(amounts, rates, terms, is_annuity) > limit
+    amounts = np.round(np.where(over, amounts - 0.01, amounts), 2)
+    more = np.round(amounts + 0.01, 2)
+    return np.where(first_payments(more, rates, terms, is_annuity) <= limit, more, amounts)
+
+
+def min_terms(amounts: np.ndarray, rates: np.ndarray, payments: np.ndarray, is_annuity: np.ndarray) -> np.ndarray:
+    """
+    Najkraći rok (mjeseci) uz koji prva rata ne prelazi `payments`
+
+    Anuitet: n = ln(A / (A - P * r)) / ln(1 + r), za r = 0: n = P / A
+    Linearni: n = P / (X - P * r)
+    Nemoguće (rata ne pokriva kamatu) je -1.
+    """
+    interest = amounts * rates
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(
+            rates == 0,
+            amounts / payments,
+            np.log(payments / (payments - interest)) / np.log1p(rates)
+        )
+        linear = amounts / (payments - interest)
+    exact = np.where(is_annuity, annuity, linear)
+
+    feasible = (payments > interest) & np.isfinite(exact)
+    terms = np.where(feasible, np.maximum(np.ceil(exact - 1e-9), 1), 1).astype(np.int64)
+
+    # Granični slučajevi oko cijelog broja: provjera i korekcija za jedan mjesec
+    limit = payments * (1 + PAYMENT_TOLERANCE)
+    terms = terms + (first_payments(amounts, rates, terms, is_annuity) > limit)
+    shorter = np.maximum(terms - 1, 1)
+    fits_shorter = (terms > 1) & (first_payments(amounts, rates, shorter, is_annuity) <= limit)
+    terms = np.where(fits_shorter, shorter, terms)
+
+    return np.where(feasible, terms, -1)
+
+
+def implied_rates(amounts: np.ndarray, payments: np.ndarray, terms: np.ndarray, is_annuity: np.ndarray) -> np.ndarray:
+    """
+    Mjesečna kamatna stopa koja daje ratu `payments`
+
+    Linearni: r = (X - P / n) / P (zatvoreni oblik).
+    Anuitet: Newton nad f(r) = P * r / (1 - (1 + r)^-n) - A, unutar intervala
+    [0, A / P] koji sigurno sadrži rješenje; korak izvan intervala se
+    zamjenjuje polovljenjem. Rata zaokružena na cent dozvoljava A * n do
+    pola centa po rati ispod P (stopa 0); ispod toga je nemoguće (NaN).
+    """
+    base = amounts / terms
+    linear = (payments - base) / amounts
+
+    annuity = np.zeros(len(amounts))
+    active = is_annuity & (payments > base)
+    if active.any():
+        principal = amounts[active]
+        target = payments[active]
+        n = terms[active]
+
+        low = np.zeros(len(principal))
+        high = target / principal
+        # Početna procjena iz razvoja rate u red: A ≈ P / n * (1 + r * (n + 1) / 2)
+        rate = np.clip(2 * (target * n - principal) / (principal * n * (n + 1)), 0, high)
+
+        for _ in range(RATE_MAX_ITERATIONS):
+            discount = np.power(1 + rate, -n)
+            annuity_factor = 1 - discount
+            with np.errstate(divide="ignore", invalid="ignore"):
+                value = principal * rate / annuity_factor - target
+                derivative = principal * (annuity_factor - rate * n * discount / (1 + rate)) / annuity_factor ** 2
+                # Za stopu blizu nule (1 + r)^-n je 1, a rata teži P / n
+                value = np.where(annuity_factor > 0, value, principal / n - target)
+
+                low = np.where(value < 0, rate, low)
+                high = np.where(value > 0, rate, high)
+                step = rate - value / derivative
+            outside = ~np.isfinite(step) | (step <= low) | (step >= high)
+            step = np.where(outside, (low + high) / 2, step)
+
+            converged = np.abs(step - rate) <= RATE_TOLERANCE * np.maximum(step, 1)
+            rate = step
+            if converged.all():
+                break
+
+        annuity[active] = rate
+
+    rates = np.maximum(np.where(is_annuity, annuity, linear), 0)
+    return np.where((payments + 0.005) * terms < amounts, np.nan, rates)
+
+
+def installment_flows(amounts: np.ndarray, rates: np.ndarray, terms: np.ndarray, is_annuity: np.ndarray) -> np.ndarray:
+    """
+    Mjesečne rate kao matrica (kredit x mjesec), sa nulama nakon roka
+
+    Anuitet: A u svakom mjesecu; linearni: P / n + B_{k-1} * r.
+    """
+    months = np.arange(1, int(terms.max()) + 1)
+    principal = (amounts / terms)[:, None]
+    opening = amounts[:, None] - (months - 1) * principal
+    linear = principal + opening * rates[:, None]
+    flows = np.where(is_annuity[:, None], annuity_payments(amounts, rates, terms)[:, None], linear)
+    return np.where(months <= terms[:, None], flows, 0.0)
+
+
+def irr_rates(flows: np.ndarray, net_amounts: np.ndarray, start_rates: np.ndarray) -> np.ndarray:
+    """
+    Mjesečna interna stopa prinosa i: sum_k C_k / (1 + i)^k = N
+
+    Vektorizovani Newton nad cijelom matricom tokova. Za nenegativne tokove
+    funkcija je opadajuća i konveksna, pa Newton iz tačke lijevo od
+    rješenja (nominalna stopa kada su naknade >= 0) monotono konvergira.
+    """
+    months = np.arange(1, flows.shape[1] + 1)
+    rate = np.asarray(start_rates, dtype=float)
+
+    for _ in range(IRR_MAX_ITERATIONS):
+        present = flows * np.power(1 + rate[:, None], -months)
+        value = present.sum(axis=1) - net_amounts
+        derivative = -(present @ months) / (1 + rate)
+        step = rate - value / derivative
+
+        converged = np.abs(step - rate) <= IRR_TOLERANCE * np.maximum(np.abs(step), 1)
+        rate = step
+        if converged.all():
+            break
+
+    return rate
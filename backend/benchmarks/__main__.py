@@ -0,0 +1,41 @@
+"""
+Pokretanje svih benchmarka i snimanje rezultata
+
+Pokretanje (iz backend direktorija):
+    python -m benchmarks [--suite calculator api pdf] [--repeat N] [--output rezultati.json]
+
+Bez --repeat svaki skup koristi svoj podrazumijevani broj ponavljanja.
+"""
+import argparse
+
+from benchmarks import bench_api, bench_calculator, bench_pdf
+from benchmarks.common import print_result, write_results
+
+
+SUITES = {
+    "calculator": bench_calculator.run,
+    "api": bench_api.run,
+    "pdf": bench_pdf.run
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kreditnog kalkulatora")
+    parser.add_argument("--suite", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--repeat", type=int)
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON fajl za rezultate")
+    args = parser.parse_args()
+
+    results = []
+    for suite in args.suite:
+        suite_results = SUITES[suite](args.repeat) if args.repeat else SUITES[suite]()
+        for result in suite_results:
+            print_result(result)
+        results.extend(suite_results)
+
+    write_results(args.output, results)
+    print(f"Rezultati snimljeni u {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+End-to-end benchmark API-ja - zahtjevi kroz cijelu FastAPI aplikaciju
+
+Aplikacija se poziva u istom procesu preko ASGI transporta (httpx), bez
+mreže i bez pokretanja servera. PDF keš koristi privremeni direktorij.
+httpx nije runtime zavisnost - instalira se iz requirements-dev.txt.
+
+Pokretanje (iz backend direktorija):
+    python -m benchmarks.bench_api [--repeat 30] [--output rezultati.json]
+"""
+from itertools import count
+from typing import List
+import argparse
+import asyncio
+import os
+import tempfile
+
+import httpx
+
+from benchmarks.common import measure, print_result, write_results
+
+
+TERMS = (12, 120, 360, 600)
+
+
+def credit(term_months: int, payment_type: str = "annuity", amount: float = 150000) -> dict:
+    return {
+        "amount": amount,
+        "annual_interest_rate": 4.5,
+        "term_months": term_months,
+        "payment_type": payment_type,
+        "start_date": "2025-01-01"
+    }
+
+
+def run(repeat: int = 30) -> List[dict]:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ.setdefault("PDF_CACHE_DIR", cache_dir)
+        from app.main import app, pdf_pool
+
+        loop = asyncio.new_event_loop()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+        # Različit iznos za svaki poziv zaobilazi keš rezultata i PDF keš
+        unique = count(1)
+
+        def post(path: str, body_factory):
+            def call():
+                response = loop.run_until_complete(client.post(path, json=body_factory()))
+                response.raise_for_status()
+                return response
+            return call
+
+        cases = []
+        for term in TERMS:
+            params = {"term_months": term}
+            cases += [
+                ("POST /calculate", post("/calculate", lambda term=term: credit(term, amount=150000 + next(unique))),
+                 dict(params, cache="miss")),
+                ("POST /calculate", post("/calculate", lambda term=term: credit(term)), dict(params, cache="hit")),
+                ("POST /calculate/prepayment", post("/calculate/prepayment", lambda term=term: {
+                    "credit": credit(term),
+                    "prepayment": {"amount": 10000, "month": max(1, term // 3), "type": "partial"}
+                }), params),
+                ("POST /calculate/rate-change", post("/calculate/rate-change", lambda term=term: {
+                    "credit": credit(term), "rate_change": {"rate_change": 1}
+                }), params),
+                ("POST /compare", post("/compare", lambda term=term: {
+                    "credits": [credit(term, amount=150000 + next(unique)), credit(term, "linear")]
+                }), params),
+                ("POST /export/pdf", post("/export/pdf", lambda term=term: credit(term, amount=150000 + next(unique))),
+                 dict(params, cache="miss")),
+                ("POST /export/pdf", post("/export/pdf", lambda term=term: credit(term)), dict(params, cache="hit"))
+            ]
+
+        batch = [credit(TERMS[index % len(TERMS)]) for index in range(100)]
+        cases.append(("POST /calculate/batch", post("/calculate/batch", lambda: {"credits": batch}), {"loans": 100}))
+
+        try:
+            return [measure("api", name, function, repeat, params) for name, function, params in cases]
+        finally:
+            loop.run_until_complete(client.aclose())
+            loop.close()
+            pdf_pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark API-ja")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", help="JSON fajl za rezultate")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for result in results:
+        print_result(result)
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Mikro-benchmark kalkulatora za matricu rokova otplate i tipova kredita
+
+Pokretanje (iz backend direktorija):
+    python -m benchmarks.bench_calculator [--repeat 50] [--output rezultati.json]
+"""
+from datetime import datetime
+from typing import List
+import argparse
+
+from app.services.credit_calculator import CreditCalculator
+from benchmarks.common import measure, print_result, write_results
+
+
+TERMS = (12, 60, 120, 240, 360, 480, 600)
+PAYMENT_TYPES = ("annuity", "linear")
+
+AMOUNT = 150000
+ANNUAL_RATE = 4.5
+START_DATE = datetime(2025, 1, 1)
+
+
+def cases(payment_type: str, term: int):
+    """(naziv, funkcija, dodatni parametri) za jedan tip kredita i rok"""
+    calculate = CreditCalculator.calculate_annuity if payment_type == "annuity" else CreditCalculator.calculate_linear
+
+    for engine in CreditCalculator.ENGINES:
+        yield (
+            f"calculate_{payment_type}",
+            lambda engine=engine: calculate(AMOUNT, ANNUAL_RATE, term, START_DATE, engine),
+            {"engine": engine}
+        )
+    yield (
+        "calculate_schedule",
+        lambda: CreditCalculator.calculate_schedule(AMOUNT, ANNUAL_RATE, term, payment_type, START_DATE),
+        {}
+    )
+    yield (
+        "calculate_schedule",
+        lambda: CreditCalculator.calculate_schedule(AMOUNT, ANNUAL_RATE, term, payment_type, START_DATE, "half_up"),
+        {"rounding": "half_up"}
+    )
+    yield (
+        "calculate_summary",
+        lambda: CreditCalculator.calculate_summary(AMOUNT, ANNUAL_RATE, term, payment_type),
+        {}
+    )
+    yield (
+        "iter_schedule",
+        lambda: sum(1 for _ in CreditCalculator.iter_schedule(AMOUNT, ANNUAL_RATE, term, payment_type, START_DATE)),
+        {}
+    )
+    yield (
+        "calculate_with_prepayment",
+        lambda: CreditCalculator.calculate_with_prepayment(
+            AMOUNT, ANNUAL_RATE, term, payment_type, 10000, max(1, term // 3), START_DATE
+        ),
+        {}
+    )
+
+
+def run(repeat: int = 50) -> List[dict]:
+    results = []
+    for payment_type in PAYMENT_TYPES:
+        for term in TERMS:
+            for name, function, extra in cases(payment_type, term):
+                params = dict({"payment_type": payment_type, "term_months": term}, **extra)
+                results.append(measure("calculator", name, function, repeat, params))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kalkulatora")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="JSON fajl za rezultate")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for result in results:
+        print_result(result)
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
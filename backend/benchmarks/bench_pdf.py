@@ -0,0 +1,114 @@
+"""
+Benchmark generisanja PDF izvještaja
+
+Pokretanje (iz backend direktorija):
+    python -m benchmarks.bench_pdf [--repeat 50] [--output rezultati.json]
+"""
+from datetime import datetime
+from typing import List
+import argparse
+import asyncio
+import os
+import time
+
+from app.services.credit_calculator import CreditCalculator
+from app.services.pdf_generator import PDFGenerator, get_templates
+from app.services.pdf_pool import PDFRenderPool
+from benchmarks.common import measure, print_result, write_results
+
+
+# Broj izvještaja u mjerenju propusnosti
+THROUGHPUT_REPORTS = 24
+
+
+def report_args(term_months: int, full_schedule: bool = False) -> tuple:
+    credit = {"amount": 150000, "annual_interest_rate": 4.5, "term_months": term_months, "payment_type": "annuity"}
+    schedule, summary = CreditCalculator.calculate_schedule(150000, 4.5, term_months, "annuity", datetime(2025, 1, 1))
+    return credit, schedule, summary, full_schedule
+
+
+def throughput(case: str, render, reports: int, params: dict) -> dict:
+    """Izvještaja u sekundi za `reports` izvještaja"""
+    started = time.perf_counter()
+    render(reports)
+    elapsed = time.perf_counter() - started
+    per_report_ms = elapsed * 1000 / reports
+    return {
+        "suite": "pdf",
+        "case": case,
+        "params": dict(params, reports=reports),
+        "repeat": 1,
+        "median_ms": round(per_report_ms, 4),
+        "p95_ms": round(per_report_ms, 4),
+        "min_ms": round(per_report_ms, 4),
+        "mean_ms": round(per_report_ms, 4),
+        "per_second": round(reports / elapsed, 2)
+    }
+
+
+def run(repeat: int = 50) -> List[dict]:
+    credit, schedule, summary, _ = report_args(360)
+    comparisons = [
+        {"input": dict(credit, annual_interest_rate=rate), "summary": summary}
+        for rate in (3.9, 4.5, 5.1)
+    ]
+
+    results = [
+        # Priprema stilova bez keša (stanje prije get_templates) i sa kešom
+        measure("pdf", "template_setup", get_templates.__wrapped__, repeat),
+        measure("pdf", "template_cached", get_templates, repeat),
+        measure("pdf", "comparison_report", lambda: PDFGenerator.generate_comparison_report(comparisons), repeat)
+    ]
+    for term in (12, 120, 360, 600):
+        for full_schedule in (False, True):
+            args = report_args(term, full_schedule)
+            results.append(measure(
+                "pdf", "credit_report", lambda: PDFGenerator.generate_credit_report(*args), repeat,
+                {"term_months": term, "full_schedule": full_schedule}
+            ))
+
+    args = report_args(360)
+    results.append(throughput(
+        "throughput_serial",
+        lambda reports: [PDFGenerator.generate_credit_report(*args) for _ in range(reports)],
+        THROUGHPUT_REPORTS,
+        {"term_months": 360, "workers": 1}
+    ))
+
+    workers = os.cpu_count() or 1
+    pool = PDFRenderPool(max_workers=workers, max_pending=THROUGHPUT_REPORTS)
+
+    async def render_pool(reports: int):
+        async for _ in pool.render_many(("credit", args) for _ in range(reports)):
+            pass
+
+    try:
+        # Zagrijavanje - pokretanje worker procesa nije dio mjerenja
+        asyncio.run(render_pool(workers))
+        results.append(throughput(
+            "throughput_pool",
+            lambda reports: asyncio.run(render_pool(reports)),
+            THROUGHPUT_REPORTS,
+            {"term_months": 360, "workers": workers}
+        ))
+    finally:
+        pool.shutdown()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF izvještaja")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="JSON fajl za rezultate")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for result in results:
+        print_result(result)
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Zajednički alati benchmarka: mjerenje, statistika i JSON izlaz
+
+Svaki rezultat je dict:
+    {"suite": "calculator", "case": "calculate_annuity",
+     "params": {"term_months": 360, ...}, "repeat": 50,
+     "median_ms": ..., "p95_ms": ..., "min_ms": ..., "mean_ms": ...}
+Slučajevi propusnosti (throughput) imaju i "per_second".
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+
+def time_calls(function: Callable[[], object], repeat: int) -> List[float]:
+    """Trajanje svakog od `repeat` poziva u milisekundama"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Medijan, 95. percentil, minimum i prosjek trajanja (ms)"""
+    ordered = sorted(timings)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(ordered[p95_index], 4),
+        "min_ms": round(ordered[0], 4),
+        "mean_ms": round(statistics.fmean(ordered), 4)
+    }
+
+
+def measure(
+    suite: str,
+    case: str,
+    function: Callable[[], object],
+    repeat: int,
+    params: Optional[dict] = None,
+    warmup: int = 1
+) -> dict:
+    """Izmjeri funkciju i vrati rezultat u zajedničkom formatu"""
+    for _ in range(warmup):
+        function()
+    result = {"suite": suite, "case": case, "params": params or {}, "repeat": repeat}
+    result.update(summarize(time_calls(function, repeat)))
+    return result
+
+
+def print_result(result: dict) -> None:
+    """Jedna čitljiva linija za rezultat"""
+    params = " ".join(f"{key}={value}" for key, value in result["params"].items())
+    line = (
+        f"{result['suite']:11s} {result['case']:28s} {params:45s} "
+        f"median {result['median_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms"
+    )
+    if "per_second" in result:
+        line += f"  {result['per_second']:9.1f}/s"
+    print(line)
+
+
+def environment() -> dict:
+    """Opis okruženja uz rezultate (za poređenje kroz vrijeme)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def write_results(path: str, results: List[dict]) -> None:
+    """Snimi rezultate i opis okruženja kao JSON"""
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"environment": environment(), "results": results}, handle, indent=2)
@@ -0,0 +1,59 @@
+"""
+NumPy motor (app.services.amortization) u odnosu na petlju CreditCalculator-a
+
+Redovi i sažeci moraju biti identični (nakon zaokruživanja na cent) za
+svaki iznos, stopu i rok iz mreže, pojedinačno i u grupnom izračunu.
+"""
+from datetime import datetime
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services import amortization
+from app.services.credit_calculator import CreditCalculator
+
+
+START = datetime(2024, 1, 31)
+
+AMOUNTS = [0.01, 1, 999.99, 10000, 123456.78, 460377.3, 1000000]
+RATES = [0, 0.01, 2.5, 5.99, 12, 30.607, 36.172, 100]
+TERMS = [1, 2, 12, 59, 120, 360, 600]
+
+GRID = list(itertools.product(AMOUNTS, RATES, TERMS))
+
+CALCULATE = {
+    "annuity": CreditCalculator.calculate_annuity,
+    "linear": CreditCalculator.calculate_linear
+}
+
+
+@pytest.mark.parametrize("payment_type", list(CALCULATE))
+def test_numpy_engine_matches_loop(payment_type):
+    calculate = CALCULATE[payment_type]
+    for amount, rate, term in GRID:
+        loop_rows, loop_summary = calculate(amount, rate, term, START, engine="loop")
+        numpy_rows, numpy_summary = calculate(amount, rate, term, START, engine="numpy")
+        assert numpy_rows == loop_rows, (amount, rate, term)
+        assert numpy_summary == loop_summary, (amount, rate, term)
+
+
+@pytest.mark.parametrize("payment_type", list(CALCULATE))
+def test_window_matches_full_schedule(payment_type):
+    for amount, rate, term in GRID:
+        full, _ = CALCULATE[payment_type](amount, rate, term, START, engine="loop")
+        for start, end in [(1, 1), (1, term), (term // 2 + 1, term), (max(term - 11, 1), term)]:
+            window = CreditCalculator.calculate_schedule_window(amount, rate, term, payment_type, start, end, START)
+            assert window.to_rows() == full[start - 1:end], (amount, rate, term, start, end)
+
+
+def test_batch_matches_loop():
+    amounts, rates, terms = (np.array(values) for values in zip(*GRID * 2))
+    is_annuity = np.arange(len(amounts)) < len(GRID)
+
+    batch = amortization.batch_schedules(amounts, rates, terms, is_annuity, [START] * len(amounts))
+    for index, (schedule, summary) in enumerate(batch):
+        calculate = CALCULATE["annuity" if is_annuity[index] else "linear"]
+        loop_rows, loop_summary = calculate(float(amounts[index]), float(rates[index]), int(terms[index]), START, engine="loop")
+        assert schedule.to_rows() == loop_rows, index
+        assert summary == loop_summary, index
@@ -0,0 +1,116 @@
+"""
+Svojstva obračuna u cijelim centima (app.services.cents)
+
+Za slučajne iznose, stope i rokove, oba tipa otplate i oba pravila
+zaokruživanja: zbir glavnica je tačno iznos kredita, u svakom redu je
+rata = glavnica + kamata, a preostali dug na kraju je 0. Granični
+slučajevi (nekoliko centi na dug rok, ekstremne stope) su ovdje
+namjerno fiksirani.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app.services.cents import ROUNDING_MODES, annuity_cents, linear_cents, to_cents
+
+
+PLANS = {"annuity": annuity_cents, "linear": linear_cents}
+
+SAMPLES = 300
+
+SEED = 20240601
+
+
+def random_loans(seed: int, count: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        # Iznos log-uniformno od 0.01 do 10 miliona KM
+        amount = round(10 ** rng.uniform(-2, 7), 2) or 0.01
+        rate = round(rng.choice([rng.uniform(0, 20), rng.uniform(0, 100), 0.0]), rng.randint(0, 6))
+        term = rng.choice([rng.randint(1, 12), rng.randint(1, 480), rng.randint(360, 600)])
+        yield amount, rate, term
+
+
+def check_invariants(amount, rate, term, payments, principal, interest, remaining):
+    total = to_cents(amount)
+    assert len(payments) == len(principal) == len(interest) == len(remaining) == term
+    assert int(principal.sum()) == total
+    assert np.array_equal(payments, principal + interest)
+    assert remaining[-1] == 0
+    assert np.array_equal(remaining, total - np.cumsum(principal))
+    # Dug nikad ne raste i nijedna kolona nije negativna
+    assert principal.min() >= 0
+    assert interest.min() >= 0
+    assert remaining.min() >= 0
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+@pytest.mark.parametrize("payment_type", list(PLANS))
+def test_random_loans(payment_type, rounding):
+    calculate = PLANS[payment_type]
+    for amount, rate, term in random_loans(SEED, SAMPLES):
+        columns = calculate(amount, rate, term, rounding)
+        check_invariants(amount, rate, term, *columns)
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+@pytest.mark.parametrize("payment_type", list(PLANS))
+@pytest.mark.parametrize("amount, rate, term", [
+    (0.01, 5, 360),
+    (0.01, 100, 600),
+    (1, 5, 360),
+    (1, 100, 360),
+    (5, 0, 480),
+    (100000, 100, 360),
+    (10000000, 100, 600),
+    (1000, 0.000001, 1),
+])
+def test_degenerate_loans(payment_type, rounding, amount, rate, term):
+    columns = PLANS[payment_type](amount, rate, term, rounding)
+    check_invariants(amount, rate, term, *columns)
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_one_cent_over_long_term(rounding):
+    # Rata se zaokružuje na 0, pa se jedini cent plaća posljednjom ratom
+    payments, principal, interest, remaining = annuity_cents(0.01, 5, 360, rounding)
+    assert payments[:-1].tolist() == [0] * 359
+    assert payments[-1] == principal[-1] == 1
+    assert interest.sum() == 0
+
+    # Linearno: cent glavnice ide u prvi mjesec, ostali redovi su 0
+    payments, principal, interest, remaining = linear_cents(0.01, 5, 360, rounding)
+    assert payments[0] == principal[0] == 1
+    assert payments[1:].tolist() == [0] * 359
+    assert remaining.tolist() == [0] * 360
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_one_km_pays_off_early(rounding):
+    # Rata od 1 centa otplati 1 KM za 100 mjeseci; ostali redovi su 0
+    payments, principal, interest, remaining = annuity_cents(1, 5, 360, rounding)
+    assert payments[:100].tolist() == [1] * 100
+    assert payments[100:].tolist() == [0] * 260
+    assert remaining[99] == 0
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_extreme_rate_interest_only_with_balloon(rounding):
+    # Na 100% godišnje, 30 godina, rata zaokružena na cent je jednaka
+    # kamati: glavnica je 0 do posljednje rate koja plaća cijeli dug
+    payments, principal, interest, remaining = annuity_cents(100000, 100, 360, rounding)
+    assert principal[:-1].tolist() == [0] * 359
+    assert payments[:-1].tolist() == interest[:-1].tolist() == [833333] * 359
+    assert remaining[:-1].tolist() == [10000000] * 359
+    assert payments[-1] == 10000000 + 833333
+    assert principal[-1] == 10000000
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_zero_rate_annuity_balloon(rounding):
+    # Bez kamate rata je iznos / rok zaokružen na cent; razlika ide u posljednju ratu
+    payments, principal, interest, remaining = annuity_cents(5, 0, 480, rounding)
+    assert payments[:-1].tolist() == [1] * 479
+    assert payments[-1] == 21
+    assert interest.sum() == 0
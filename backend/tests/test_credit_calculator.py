@@ -0,0 +1,115 @@
+"""
+Regresija: /calculate (CreditCalculator.calculate_schedule, NumPy motor)
+u odnosu na izvornu petlju kalkulatora
+
+baseline_schedule je kopija izvorne implementacije (prije NumPy motora i
+kalendara datuma), pa odgovor ostaje isti red po red i cent po cent.
+"""
+from datetime import datetime, timedelta
+import itertools
+import math
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.credit_calculator import CreditCalculator
+
+
+START = datetime(2024, 1, 31)
+
+
+def baseline_schedule(amount, annual_rate, term_months, payment_type, start_date):
+    """Izvorni calculate_annuity / calculate_linear"""
+    monthly_rate = (annual_rate / 100) / 12
+    annuity = payment_type == "annuity"
+    if annuity:
+        if monthly_rate == 0:
+            monthly_payment = amount / term_months
+        else:
+            monthly_payment = amount * (
+                monthly_rate * math.pow(1 + monthly_rate, term_months)
+            ) / (math.pow(1 + monthly_rate, term_months) - 1)
+    else:
+        principal_payment = amount / term_months
+
+    schedule = []
+    remaining_balance = amount
+    total_interest = 0
+    total_payments = 0
+
+    for month in range(1, term_months + 1):
+        interest = remaining_balance * monthly_rate
+        if annuity:
+            principal = monthly_payment - interest
+            remaining_balance -= principal
+            if month == term_months:
+                principal += remaining_balance
+                remaining_balance = 0
+        else:
+            principal = principal_payment
+            monthly_payment = principal_payment + interest
+            remaining_balance -= principal_payment
+        total_interest += interest
+        total_payments += monthly_payment
+
+        schedule.append({
+            "month": month,
+            "payment_date": (start_date + timedelta(days=30 * month)).strftime("%Y-%m-%d"),
+            "monthly_payment": round(monthly_payment, 2),
+            "principal": round(principal, 2),
+            "interest": round(interest, 2),
+            "remaining_balance": round(max(0, remaining_balance), 2)
+        })
+
+    summary = {
+        "total_amount": round(amount, 2),
+        "total_interest": round(total_interest, 2),
+        "total_cost": round(amount + total_interest, 2),
+        "monthly_payment_avg": round(monthly_payment if annuity else total_payments / term_months, 2),
+        "payment_type": "Anuitetni" if annuity else "Linearni"
+    }
+    return schedule, summary
+
+
+def random_loans(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        # Dugi rokovi i visoke stope - tu je zatvoreni oblik odstupao za cent
+        yield (
+            round(rng.uniform(100, 1000000), 2),
+            round(rng.choice([rng.uniform(0, 15), rng.uniform(15, 40)]), 3),
+            rng.choice([12, 60, 120, 240, 360, 480, 600]),
+            rng.choice(["annuity", "linear"])
+        )
+
+
+def test_calculate_schedule_matches_baseline():
+    loans = itertools.chain(
+        random_loans(13, 1500),
+        [(460377.3, 30.607, 600, "annuity"), (787748.75, 36.172, 600, "annuity"), (730109.81, 36.94, 600, "annuity")]
+    )
+    for amount, rate, term, payment_type in loans:
+        schedule, summary = CreditCalculator.calculate_schedule(amount, rate, term, payment_type, START)
+        expected_rows, expected_summary = baseline_schedule(amount, rate, term, payment_type, START)
+        assert schedule.to_rows() == expected_rows, (amount, rate, term, payment_type)
+        assert summary == expected_summary, (amount, rate, term, payment_type)
+
+
+@pytest.mark.parametrize("amount, rate, term, payment_type", list(random_loans(17, 20)))
+def test_calculate_endpoint_matches_baseline(amount, rate, term, payment_type):
+    credit = {
+        "amount": amount,
+        "annual_interest_rate": rate,
+        "term_months": term,
+        "payment_type": payment_type,
+        "start_date": START.strftime("%Y-%m-%d")
+    }
+    response = TestClient(app).post("/calculate", json=credit)
+    assert response.status_code == 200
+
+    expected_rows, expected_summary = baseline_schedule(amount, rate, term, payment_type, START)
+    body = response.json()
+    assert body["schedule"] == expected_rows
+    assert {key: body["summary"][key] for key in expected_summary} == expected_summary
@@ -0,0 +1,48 @@
+"""
+NDJSON / CSV stream otplatnog plana u odnosu na JSON odgovor /calculate
+"""
+import csv
+import io
+import random
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+client = TestClient(app)
+
+
+def random_credits(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {
+            "amount": round(rng.uniform(100, 1000000), 2),
+            "annual_interest_rate": round(rng.choice([rng.uniform(0, 15), rng.uniform(15, 40)]), 3),
+            "term_months": rng.choice([1, 12, 120, 360, 600]),
+            "payment_type": rng.choice(["annuity", "linear"]),
+            "start_date": "2024-01-31",
+            "rounding": rng.choice([None, None, "half_up", "half_even"]),
+            "date_rule": rng.choice(["days30", "calendar_eom"])
+        }
+
+
+@pytest.mark.parametrize("credit", list(random_credits(5, 40)))
+def test_stream_matches_json(credit):
+    expected = client.post("/calculate", json=credit).json()
+
+    lines = client.post("/calculate?format=ndjson", json=credit).content.splitlines()
+    assert orjson.loads(lines[0])["summary"] == expected["summary"]
+    assert [orjson.loads(line) for line in lines[1:]] == expected["schedule"]
+
+    rows = list(csv.DictReader(io.StringIO(client.post("/calculate?format=csv", json=credit).text)))
+    assert [{key: str(value) for key, value in row.items()} for row in expected["schedule"]] == rows
+
+
+@pytest.mark.parametrize("output_format", ["ndjson", "csv"])
+def test_stream_rejects_summary_only(output_format):
+    credit = {"amount": 10000, "annual_interest_rate": 5, "term_months": 12, "payment_type": "annuity"}
+    response = client.post(f"/calculate?format={output_format}&summary_only=true", json=credit)
+    assert response.status_code == 422